@@ -229,6 +229,33 @@ app.get("/health", (req, res) => {
   res.send("OK");
 });
 
+// ⏱️ Event-loop lag probe for testsprite_tests/sampler.py; opt-in with ENABLE_LOOP_PROBE=true.
+// Windows close on a timer, so concurrent readers all see the last full window instead of
+// resetting each other's; admin-only because it reports heap usage.
+if (process.env.ENABLE_LOOP_PROBE === "true") {
+  const { monitorEventLoopDelay } = require("perf_hooks");
+  const { protect } = require("./middleware/auth");
+  const { authorize } = require("./middleware/authorize");
+  const windowMs = Number(process.env.LOOP_PROBE_WINDOW_MS) || 250;
+  const loopDelay = monitorEventLoopDelay({ resolution: 10 });
+  const ms = (ns) => Math.round(ns / 1e4) / 100;
+  let lastWindow = { meanMs: 0, p99Ms: 0, maxMs: 0, windowMs };
+  loopDelay.enable();
+  setInterval(() => {
+    lastWindow = {
+      meanMs: ms(loopDelay.mean || 0),
+      p99Ms: ms(loopDelay.percentile(99) || 0),
+      maxMs: ms(loopDelay.max || 0),
+      windowMs,
+    };
+    loopDelay.reset();
+  }, windowMs).unref();
+
+  app.get("/health/loop", protect, authorize(["admin"]), (req, res) => {
+    res.json({ ...lastWindow, heapUsed: process.memoryUsage().heapUsed });
+  });
+}
+
 // 🔐 Auth
 app.get("/oauth/zoho/callback", async (req, res) => {
   const code = req.query.code;
@@ -1,5 +1,9 @@
 const axios = require('axios');
 
+// Zoho endpoints can be pointed at a local mail sink for testing
+const ZOHO_ACCOUNTS_URL = process.env.ZOHO_ACCOUNTS_URL || 'https://accounts.zoho.in';
+const ZOHO_MAIL_API_URL = process.env.ZOHO_MAIL_API_URL || 'https://mail.zoho.in';
+
 // Cache for Account ID to avoid repeated calls
 let cachedAccountId = null;
 
@@ -14,7 +18,7 @@ const getAccessToken = async () => {
     params.append('client_secret', process.env.ZOHO_CLIENT_SECRET);
     params.append('grant_type', 'refresh_token');
 
-    const response = await axios.post('https://accounts.zoho.in/oauth/v2/token', params, {
+    const response = await axios.post(`${ZOHO_ACCOUNTS_URL}/oauth/v2/token`, params, {
       timeout: 15000 // 15s timeout
     });
 
@@ -36,7 +40,7 @@ const getAccountId = async (accessToken) => {
   if (cachedAccountId) return cachedAccountId;
 
   try {
-    const response = await axios.get('https://mail.zoho.in/api/accounts', {
+    const response = await axios.get(`${ZOHO_MAIL_API_URL}/api/accounts`, {
       headers: {
         'Authorization': `Zoho-oauthtoken ${accessToken}`
       },
@@ -70,7 +74,7 @@ const sendEmail = async (to, subject, html) => {
     const accountId = await getAccountId(accessToken);
 
     // 3. Send Email
-    const url = `https://mail.zoho.in/api/accounts/${accountId}/messages`;
+    const url = `${ZOHO_MAIL_API_URL}/api/accounts/${accountId}/messages`;
 
     const emailData = {
       fromAddress: process.env.ZOHO_MAIL,
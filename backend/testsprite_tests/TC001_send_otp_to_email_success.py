@@ -1,7 +1,9 @@
 import requests
 
+import client
+
 def test_send_otp_to_email_success():
-    base_url = "http://localhost:5000"
+    base_url = client.BASE_URL
     endpoint = "/api/auth/send-email-otp"
     url = base_url + endpoint
     headers = {"Content-Type": "application/json"}
@@ -9,7 +11,7 @@ def test_send_otp_to_email_success():
     timeout_seconds = 30
 
     try:
-        response = requests.post(url, json=payload, headers=headers, timeout=timeout_seconds)
+        response = client.post(url, json=payload, headers=headers, timeout=timeout_seconds)
     except requests.Timeout:
         assert False, "Request timed out while sending OTP to email"
     except requests.RequestException as e:
@@ -1,6 +1,8 @@
 import requests
 
-BASE_URL = "http://localhost:5000"
+import client
+
+BASE_URL = client.BASE_URL
 TIMEOUT = 30
 PRODUCTS_ENDPOINT = f"{BASE_URL}/products"
 
@@ -29,7 +31,7 @@ def test_create_product_with_image_upload():
     created_product_id = None
 
     try:
-        response = requests.post(
+        response = client.post(
             PRODUCTS_ENDPOINT,
             data=data,
             files=files,
@@ -63,7 +65,7 @@ def test_create_product_with_image_upload():
         # Cleanup - delete the created product if it exists
         if created_product_id:
             try:
-                del_response = requests.delete(
+                del_response = client.delete(
                     f"{PRODUCTS_ENDPOINT}/{created_product_id}",
                     timeout=TIMEOUT
                 )
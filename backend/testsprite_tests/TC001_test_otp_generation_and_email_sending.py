@@ -1,7 +1,10 @@
-import requests
 import time
 
-BASE_URL = "http://localhost:5000"
+import requests
+
+import client
+
+BASE_URL = client.BASE_URL
 TIMEOUT = 30
 
 def test_otp_generation_and_email_sending():
@@ -17,7 +20,7 @@ def test_otp_generation_and_email_sending():
 
     start_time = time.time()
     try:
-        response = requests.post(endpoint, json=payload, headers=headers, timeout=TIMEOUT)
+        response = client.post(endpoint, json=payload, headers=headers, timeout=TIMEOUT)
     except requests.RequestException as e:
         assert False, f"Request to generate OTP failed: {e}"
     elapsed = time.time() - start_time
@@ -43,7 +46,7 @@ def test_otp_generation_and_email_sending():
     # Verify /health endpoint to check service health (if possible)
     health_endpoint = f"{BASE_URL}/health"
     try:
-        health_resp = requests.get(health_endpoint, timeout=TIMEOUT)
+        health_resp = client.get(health_endpoint, timeout=TIMEOUT)
         assert health_resp.status_code == 200, f"/health endpoint returned status {health_resp.status_code}"
         try:
             health_json = health_resp.json()
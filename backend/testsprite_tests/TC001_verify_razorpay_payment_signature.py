@@ -1,9 +1,12 @@
-import requests
 import hashlib
 import hmac
 import json
 
-BASE_URL = "http://localhost:5000"
+import requests
+
+import client
+
+BASE_URL = client.BASE_URL
 TIMEOUT = 30
 RAZORPAY_KEY_SECRET = "test_secret"
 HEADERS = {"Content-Type": "application/json"}
@@ -29,7 +32,7 @@ def test_verify_razorpay_payment_signature():
         "razorpay_signature": valid_signature
     }
     try:
-        response_valid = requests.post(f"{BASE_URL}/api/order/verify-payment", headers=HEADERS, json=payload_valid, timeout=TIMEOUT)
+        response_valid = client.post(f"{BASE_URL}/api/order/verify-payment", headers=HEADERS, json=payload_valid, timeout=TIMEOUT)
     except requests.RequestException as e:
         assert False, f"Request failed for valid signature test: {e}"
     assert response_valid.status_code == 200, f"Expected 200 for valid signature but got {response_valid.status_code}"
@@ -46,7 +49,7 @@ def test_verify_razorpay_payment_signature():
         "razorpay_signature": "invalid_signature"
     }
     try:
-        response_invalid = requests.post(f"{BASE_URL}/api/order/verify-payment", headers=HEADERS, json=payload_invalid, timeout=TIMEOUT)
+        response_invalid = client.post(f"{BASE_URL}/api/order/verify-payment", headers=HEADERS, json=payload_invalid, timeout=TIMEOUT)
     except requests.RequestException as e:
         assert False, f"Request failed for invalid signature test: {e}"
     assert response_invalid.status_code == 400, f"Expected 400 for invalid signature but got {response_invalid.status_code}"
@@ -64,7 +67,7 @@ def test_verify_razorpay_payment_signature():
         "razorpay_signature": None
     }
     try:
-        response_error = requests.post(f"{BASE_URL}/api/order/verify-payment", headers=HEADERS, json=payload_error, timeout=TIMEOUT)
+        response_error = client.post(f"{BASE_URL}/api/order/verify-payment", headers=HEADERS, json=payload_error, timeout=TIMEOUT)
     except requests.RequestException as e:
         assert False, f"Request failed for server error simulation test: {e}"
     # Allow either 500 or error-like status due to server error
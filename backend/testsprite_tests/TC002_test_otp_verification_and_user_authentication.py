@@ -1,6 +1,7 @@
-import requests
+import client
+import mail_sink
 
-BASE_URL = "http://localhost:5000"
+BASE_URL = client.BASE_URL
 HEADERS = {"Content-Type": "application/json"}
 TIMEOUT = 30
 
@@ -9,31 +10,21 @@ def test_otp_verification_and_user_authentication():
     otp_request_payload = {"email": email}
 
     # Step 1: Request OTP generation
-    otp_gen_resp = requests.post(
+    otp_email = mail_sink.get_sink().expect(email)
+    otp_gen_resp = client.post(
         f"{BASE_URL}/auth/request-otp", json=otp_request_payload, headers=HEADERS, timeout=TIMEOUT
     )
     assert otp_gen_resp.status_code == 200, f"OTP request failed: {otp_gen_resp.text}"
     otp_gen_data = otp_gen_resp.json()
     assert "message" in otp_gen_data and "OTP sent" in otp_gen_data["message"]
 
-    # NOTE: Since this is a test environment, assume OTP can be fetched through an API or a test hook
-    # We'll try to get the OTP via a test endpoint /auth/get-latest-otp for the email
-    # If such an endpoint is not available, this test would require manual OTP input or mocking.
-    try:
-        otp_retrieve_resp = requests.get(
-            f"{BASE_URL}/auth/get-latest-otp", params={"email": email}, headers=HEADERS, timeout=TIMEOUT
-        )
-        assert otp_retrieve_resp.status_code == 200, f"Failed to get OTP: {otp_retrieve_resp.text}"
-        otp_retrieve_data = otp_retrieve_resp.json()
-        assert "otp" in otp_retrieve_data, "OTP not found in response"
-        otp = otp_retrieve_data["otp"]
-    except Exception:
-        # If OTP retrieval endpoint not available, fallback to failure as OTP unknown
-        raise AssertionError("Unable to retrieve OTP for verification test")
+    # The OTP is captured from the outgoing email by the local mail sink
+    otp = otp_email.result(timeout=TIMEOUT).otp
+    assert otp, "OTP email did not contain a 6-digit code"
 
     # Step 2: Verify OTP and authenticate
     otp_verify_payload = {"email": email, "otp": otp}
-    otp_verify_resp = requests.post(
+    otp_verify_resp = client.post(
         f"{BASE_URL}/auth/verify-otp", json=otp_verify_payload, headers=HEADERS, timeout=TIMEOUT
     )
     assert otp_verify_resp.status_code == 200, f"OTP verification failed: {otp_verify_resp.text}"
@@ -46,7 +37,7 @@ def test_otp_verification_and_user_authentication():
 
     # Step 3: Negative test - invalid OTP should return error
     invalid_otp_payload = {"email": email, "otp": "000000"}
-    invalid_otp_resp = requests.post(
+    invalid_otp_resp = client.post(
         f"{BASE_URL}/auth/verify-otp", json=invalid_otp_payload, headers=HEADERS, timeout=TIMEOUT
     )
     assert invalid_otp_resp.status_code in (400, 401), f"Invalid OTP accepted: {invalid_otp_resp.text}"
@@ -1,7 +1,11 @@
+import concurrent.futures
+
 import requests
-import time
 
-BASE_URL = "http://localhost:5000"
+import client
+import mail_sink
+
+BASE_URL = client.BASE_URL
 HEADERS = {"Content-Type": "application/json"}
 TIMEOUT = 30
 
@@ -14,8 +18,9 @@ def test_verify_otp_and_login_success():
     token = None
 
     try:
-        # Step 1: Request OTP to be sent to email
-        send_otp_resp = requests.post(
+        # Step 1: Request OTP to be sent to email; the mail sink hands the code over as soon as it arrives
+        otp_email = mail_sink.get_sink().expect(email)
+        send_otp_resp = client.post(
             f"{BASE_URL}/api/auth/send-email-otp",
             json={"email": email},
             headers=HEADERS,
@@ -23,19 +28,11 @@ def test_verify_otp_and_login_success():
         )
         assert send_otp_resp.status_code == 200, f"Send OTP failed: {send_otp_resp.text}"
 
-        # As the system sends OTP asynchronously via email, wait briefly for OTP to be generated.
-        # No direct access to OTP from the API, so poll or simulate waiting.
-        # In a real test environment, OTP might be fetched from a test mailbox or test hook.
-        # Here, we simulate retry fetching OTP from a hypothetical test endpoint (not in PRD)
-        # since no such endpoint is specified, we wait fixed time to simulate manual OTP.
-
-        # Wait up to 25 seconds to simulate user receiving OTP email
-        # In a real scenario, fetch OTP from DB or mock
-        time.sleep(5)  # wait 5 seconds as placeholder
-
-        # For this test, assume OTP is known or dummy for testing, e.g. "123456"
-        # Normally OTP should be captured dynamically; here we use placeholder:
-        otp = "123456"
+        try:
+            otp = otp_email.result(timeout=TIMEOUT).otp
+        except concurrent.futures.TimeoutError:
+            assert False, f"No OTP email for {email} reached the mail sink"
+        assert otp, "OTP email did not contain a 6-digit code"
 
         verify_payload = {
             "email": email,
@@ -45,7 +42,7 @@ def test_verify_otp_and_login_success():
         }
 
         # Step 2: Verify OTP and login/register user
-        verify_resp = requests.post(
+        verify_resp = client.post(
             f"{BASE_URL}/api/auth/verify-email-otp",
             json=verify_payload,
             headers=HEADERS,
@@ -1,9 +1,12 @@
 import os
-import requests
 import json
 
+import requests
+
+import client
+
 def test_email_service_integration_with_zoho_mail_rest_api():
-    base_url = "http://localhost:5000"
+    base_url = client.BASE_URL
     email_send_endpoint = f"{base_url}/email/send"  # Assuming this endpoint triggers sending email via Zoho Mail REST API
 
     # Prepare email payload
@@ -21,7 +24,7 @@ def test_email_service_integration_with_zoho_mail_rest_api():
 
     try:
         # Send email request to local email service
-        response = requests.post(email_send_endpoint, headers=headers, data=json.dumps(payload), timeout=30)
+        response = client.post(email_send_endpoint, headers=headers, data=json.dumps(payload), timeout=30)
         response.raise_for_status()
     except requests.exceptions.RequestException as e:
         # If network or request error, assert failure and message
@@ -1,7 +1,10 @@
-import requests
 import json
 
-BASE_URL = "http://localhost:5000"
+import requests
+
+import client
+
+BASE_URL = client.BASE_URL
 TIMEOUT = 30
 HEADERS = {'Content-Type': 'application/json'}
 
@@ -17,7 +20,7 @@ def test_email_service_integration_with_zoho_oauth2_smtp():
     }
 
     try:
-        response = requests.post(send_email_endpoint, headers=HEADERS, json=email_payload, timeout=TIMEOUT)
+        response = client.post(send_email_endpoint, headers=HEADERS, json=email_payload, timeout=TIMEOUT)
     except requests.RequestException as e:
         assert False, f"Request to send email failed: {e}"
 
@@ -53,7 +56,7 @@ def test_email_service_integration_with_zoho_oauth2_smtp():
     }
 
     try:
-        fail_response = requests.post(send_email_endpoint, headers=HEADERS, json=invalid_payload, timeout=TIMEOUT)
+        fail_response = client.post(send_email_endpoint, headers=HEADERS, json=invalid_payload, timeout=TIMEOUT)
     except requests.RequestException as e:
         assert False, f"Request to send email with invalid payload failed: {e}"
 
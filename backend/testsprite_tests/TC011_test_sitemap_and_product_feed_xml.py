@@ -0,0 +1,20 @@
+import client
+import feeds
+
+BASE_URL = client.BASE_URL
+
+def test_sitemap_and_product_feed_xml():
+    # Make sure the catalog is not empty; the feeds only list active, published Product documents
+    ids = feeds.seed_products(3)
+    try:
+        for path in feeds.FEEDS:
+            # Streamed and validated record by record, so this stays cheap on a large catalog
+            result = feeds.validate_feed(path)
+            assert result["status"] == 200, f"{path}: expected 200 OK but got {result['status']}"
+            assert "xml" in (result["content_type"] or ""), f"{path}: unexpected Content-Type {result['content_type']}"
+            assert result["records"] > 0, f"{path}: no records listed"
+            assert not result["errors"], f"{path}: {result['invalid']} invalid records, e.g. {result['errors'][:3]}"
+    finally:
+        feeds.delete_products(ids)
+
+test_sitemap_and_product_feed_xml()
@@ -0,0 +1,194 @@
+import base64
+import concurrent.futures
+import fcntl
+import itertools
+import json
+import os
+import threading
+import time
+
+import client
+import mail_sink
+
+CACHE_PATH = os.getenv(
+    "TESTSPRITE_TOKEN_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tmp", "tokens.json")
+)
+POOL_SIZE = int(os.getenv("TESTSPRITE_VIRTUAL_USERS", "8"))
+EMAIL_TEMPLATE = os.getenv("TESTSPRITE_VU_EMAIL", "vu-{n}@example.com")
+SEND_OTP_PATH = "/api/auth/send-email-otp"
+VERIFY_OTP_PATH = "/api/auth/verify-email-otp"
+# Tokens this close to expiry are refreshed before they are handed out
+REFRESH_MARGIN = 300
+OTP_TIMEOUT = 30
+AUTH_TAG = "auth"
+
+
+def token_expiry(token):
+    """The exp claim of a JWT (unverified), or None if it has none or is not a JWT."""
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    except (IndexError, ValueError):
+        return None
+    exp = claims.get("exp") if isinstance(claims, dict) else None
+    return float(exp) if isinstance(exp, (int, float)) else None
+
+
+def login(email, name=None, timeout=OTP_TIMEOUT):
+    """Run the email OTP flow for `email` (registering it if new) and return the response body.
+
+    The OTP is read from the mail sink, so the backend must be mailing through it.
+    """
+    message = mail_sink.get_sink().expect(email)
+    response = client.post(SEND_OTP_PATH, json={"email": email})
+    assert response.status_code == 200, f"Sending an OTP to {email} failed: {response.status_code} {response.text}"
+    try:
+        otp = message.result(timeout=timeout).otp
+    except concurrent.futures.TimeoutError:
+        raise AssertionError(f"No OTP email for {email} reached the mail sink") from None
+    assert otp, f"The OTP email to {email} did not contain a 6-digit code"
+    response = client.post(VERIFY_OTP_PATH, json={"email": email, "otp": otp, "name": name or email.split("@")[0]})
+    assert response.status_code == 200, f"Verifying the OTP for {email} failed: {response.status_code} {response.text}"
+    body = response.json()
+    assert body.get("token"), f"No token in the login response for {email}"
+    return body
+
+
+class TokenPool:
+    """Virtual users logged in once and reused by every case and load run.
+
+    Tokens are cached on disk per backend URL together with their expiry, so later runs skip
+    the OTP flow entirely; a token is only renewed when it is about to expire or a caller
+    reports it rejected. Like fixtures.ProductPool, read-style callers share users round-robin
+    while callers that change per-user state (cart, coupon usage) claim one exclusively.
+    """
+
+    def __init__(self, size=POOL_SIZE, cache_path=CACHE_PATH, email_template=EMAIL_TEMPLATE):
+        self.size = size
+        self.cache_path = cache_path
+        self.email_template = email_template
+        self._lock = threading.Lock()
+        self._user_locks = {}
+        self._entries = None
+        self._cycle = None
+        self._free = None
+        self._claimed = 0
+
+    def email(self, n):
+        return self.email_template.format(n=n)
+
+    # Disk cache
+
+    def _read_cache(self):
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _load(self):
+        if self._entries is None:
+            cached = self._read_cache().get(client.BASE_URL, {}) if self.cache_path else {}
+            self._entries = {email: entry for email, entry in cached.items() if self._fresh(entry)}
+        return self._entries
+
+    def _update_cache(self, update):
+        """Apply update(users of client.BASE_URL) to the file, dropping expired entries on the way."""
+        if not self.cache_path:
+            return
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        # Sharded runs share the file: merge under an exclusive lock and swap it in atomically
+        with open(self.cache_path + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            cache = self._read_cache()
+            now = time.time()
+            for users in cache.values():
+                for stale in [key for key, value in users.items() if (value.get("expires") or now + 1) < now]:
+                    del users[stale]
+            update(cache.setdefault(client.BASE_URL, {}))
+            partial = f"{self.cache_path}.{os.getpid()}"
+            with open(partial, "w", encoding="utf-8") as f:
+                json.dump({url: users for url, users in cache.items() if users}, f, indent=2)
+            os.replace(partial, self.cache_path)
+
+    def _save(self, email, entry):
+        self._update_cache(lambda users: users.update({email: entry}))
+
+    @staticmethod
+    def _fresh(entry):
+        expires = entry.get("expires")
+        return bool(entry.get("token")) and (expires is None or expires - REFRESH_MARGIN > time.time())
+
+    # Tokens
+
+    def _login(self, email):
+        tag = client.current_tag.set(AUTH_TAG)
+        try:
+            body = login(email)
+        finally:
+            client.current_tag.reset(tag)
+        user = body.get("user") or {}
+        entry = {
+            "token": body["token"],
+            "expires": token_expiry(body["token"]),
+            "userId": user.get("id") or user.get("_id"),
+            "obtained": time.time(),
+        }
+        self._save(email, entry)
+        return entry
+
+    def _entry(self, n):
+        email = self.email(n)
+        with self._lock:
+            entries = self._load()
+            user_lock = self._user_locks.setdefault(email, threading.Lock())
+        # One login per user even when many threads find it stale at the same moment
+        with user_lock:
+            entry = entries.get(email)
+            if entry is None or not self._fresh(entry):
+                entry = entries[email] = self._login(email)
+        return dict(entry, email=email)
+
+    def user(self, n=None):
+        """Credentials ({"email", "token", "userId", "expires"}) of user `n`, or the next shared one."""
+        if n is None:
+            with self._lock:
+                if self._cycle is None:
+                    self._cycle = itertools.cycle(range(self.size))
+                n = next(self._cycle)
+        return self._entry(n)
+
+    def token(self, n=None):
+        return self.user(n)["token"]
+
+    def headers(self, n=None):
+        return {"Authorization": f"Bearer {self.token(n)}"}
+
+    def tokens(self, count):
+        """Tokens for users 0..count-1, logging in the missing ones concurrently."""
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(count, 16) or 1, thread_name_prefix="auth") as pool:
+            return list(pool.map(self.token, range(count)))
+
+    def claim(self):
+        """A user no other caller in this process receives; numbered after the shared ones."""
+        with self._lock:
+            n = self.size + self._claimed
+            self._claimed += 1
+        return self._entry(n)
+
+    def invalidate(self, token):
+        """Forget a token the backend rejected (e.g. 401 after a JWT secret rotation), here and on disk."""
+        with self._lock:
+            for entry in self._load().values():
+                if entry["token"] == token:
+                    entry["expires"] = 0
+
+        def drop(users):
+            # Only entries still holding this token; another process may have renewed the user already
+            for email in [email for email, entry in users.items() if entry.get("token") == token]:
+                del users[email]
+
+        self._update_cache(drop)
+
+
+users = TokenPool()
@@ -0,0 +1,266 @@
+import ast
+import hashlib
+import json
+import os
+import re
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND_ROOT = os.getenv("TESTSPRITE_BACKEND_ROOT", os.path.dirname(HERE))
+CACHE_DIR = os.path.join(HERE, "tmp", "result_cache")
+ENTRY_POINT = "server.js"
+# Dependency manifests; the harness modules decide how a result is produced and judged
+BACKEND_GLOBALS = ("package.json", "package-lock.json")
+HARNESS_MODULES = ("runner", "client", "latency", "slo", "contracts")
+# The response contracts the harness judges every case against
+CONTRACTS_PATH = os.path.join(HERE, "standard_prd.json")
+STUB_MODULES = ("stub_server", "mail_sink")
+REQUIRE_RE = re.compile(r"""require\(\s*["'](\.{1,2}/[^"']+)["']\s*\)""")
+MOUNT_RE = re.compile(r"""app\.use\(\s*["']([^"']+)["']\s*,\s*require\(\s*["'](\.{1,2}/[^"']+)["']\s*\)""")
+PATH_RE = re.compile(r"^/[\w\-.~/{}:]*$")
+
+
+@lru_cache(maxsize=None)
+def file_digest(path):
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return "missing"
+
+
+def _digest_text(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# Backend side: which files can answer a given path
+
+def _resolve(base_dir, spec):
+    path = os.path.normpath(os.path.join(base_dir, spec))
+    for candidate in (path, path + ".js", path + ".json", os.path.join(path, "index.js")):
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def _requires(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            source = f.read()
+    except OSError:
+        return []
+    found = (_resolve(os.path.dirname(path), spec) for spec in REQUIRE_RE.findall(source))
+    return [dep for dep in found if dep]
+
+
+@lru_cache(maxsize=None)
+def js_closure(path):
+    """`path` and every local module it requires, transitively (node_modules are covered by the lockfile)."""
+    seen, stack = set(), [path]
+    while stack:
+        current = stack.pop()
+        if current not in seen:
+            seen.add(current)
+            stack.extend(_requires(current))
+    return frozenset(seen)
+
+
+@lru_cache(maxsize=None)
+def mounts(root=BACKEND_ROOT):
+    """[(prefix, route module)] for each router server.js mounts with app.use."""
+    entry = os.path.join(root, ENTRY_POINT)
+    try:
+        with open(entry, encoding="utf-8") as f:
+            source = f.read()
+    except OSError:
+        return ()
+    found = ((prefix, _resolve(root, spec)) for prefix, spec in MOUNT_RE.findall(source))
+    return tuple((prefix, module) for prefix, module in found if module)
+
+
+@lru_cache(maxsize=None)
+def global_files(root=BACKEND_ROOT):
+    """server.js with what it requires outside the mounted routers, plus the dependency manifests."""
+    entry = os.path.join(root, ENTRY_POINT)
+    routers = {module for _, module in mounts(root)}
+    files = {entry}
+    for dep in _requires(entry):
+        if dep not in routers:
+            files |= js_closure(dep)
+    files.update(os.path.join(root, name) for name in BACKEND_GLOBALS if os.path.isfile(os.path.join(root, name)))
+    return frozenset(files)
+
+
+def backend_files(paths, root=BACKEND_ROOT):
+    """Backend files behind request paths: every router whose mount prefix matches, as Express tries them all."""
+    files = set(global_files(root))
+    for path in paths:
+        for prefix, module in mounts(root):
+            if path == prefix or path.startswith(prefix.rstrip("/") + "/"):
+                files |= js_closure(module)
+    return files
+
+
+# Test side: the helper modules a case runs and the paths it names
+
+def _local_imports(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=path)
+    except (OSError, SyntaxError):
+        return set()
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split(".")[0])
+    return {name for name in names if os.path.isfile(os.path.join(HERE, name + ".py"))}
+
+
+@lru_cache(maxsize=None)
+def helper_closure(names):
+    """Local modules (this directory) imported by `names`, transitively, including themselves."""
+    seen, stack = set(), list(names)
+    while stack:
+        name = stack.pop()
+        if name not in seen:
+            seen.add(name)
+            stack.extend(_local_imports(os.path.join(HERE, name + ".py")))
+    return frozenset(seen)
+
+
+def _path_of(text):
+    if text.startswith(("http://", "https://")):
+        text = urlsplit(text).path
+    return text if PATH_RE.match(text) else None
+
+
+def static_paths(code):
+    """Request paths spelled out in `code`: "/api/..." constants and f"{BASE_URL}/products/{pid}" templates."""
+    paths = set()
+    for node in ast.walk(ast.parse(code)):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            path = _path_of(node.value)
+        elif isinstance(node, ast.JoinedStr):
+            text = "".join(part.value if isinstance(part, ast.Constant) else "{}" for part in node.values)
+            path = _path_of(text[2:] if text.startswith("{}/") else text)
+        else:
+            continue
+        if path:
+            paths.add(path)
+    return paths
+
+
+def route_paths(result):
+    """Paths from the route templates ("POST /products/{id}") a previous run recorded for the case."""
+    return {route.partition(" ")[2] for route in result.get("latency", {})}
+
+
+def changed_inputs(old, new, prefix=""):
+    """Dotted names of manifest entries that differ, e.g. ["backend.routes/productRoutes.js"]."""
+    changed = []
+    for key in sorted(set(old) | set(new)):
+        before, after = old.get(key), new.get(key)
+        if isinstance(before, dict) and isinstance(after, dict):
+            changed += changed_inputs(before, after, f"{prefix}{key}.")
+        elif before != after:
+            changed.append(prefix + key)
+    return changed
+
+
+class ResultCache:
+    """Passing results stored under a hash of everything that could change them.
+
+    A case's key covers its code, its plan entry, the helper modules it imports, the harness,
+    and the backend files behind the paths it uses. Those paths come from the code and from
+    the routes its last run actually hit, so a case that reaches /api/order through a helper
+    still depends on routes/orderRoutes.js. Results live under objects/<key>.json; index.json
+    remembers each case's routes and last manifest so a miss can say what changed.
+    """
+
+    def __init__(self, root=CACHE_DIR, target="", backend_root=BACKEND_ROOT):
+        self.root = root
+        self.target = target
+        self.backend_root = backend_root
+        self.stub = target == "stub"
+        self._index = None
+
+    @property
+    def index(self):
+        if self._index is None:
+            try:
+                with open(os.path.join(self.root, "index.json"), encoding="utf-8") as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _object_path(self, key):
+        return os.path.join(self.root, "objects", key[:2], key + ".json")
+
+    def manifest(self, case, repeat, paths):
+        # The harness counts as itself only: what runner.py imports for reporting does not change results
+        helpers = helper_closure(frozenset(_local_imports(case.path))) | frozenset(HARNESS_MODULES)
+        if self.stub:
+            helpers |= helper_closure(frozenset(STUB_MODULES))
+            backend = {}
+        else:
+            backend = {
+                os.path.relpath(path, self.backend_root): file_digest(path)
+                for path in backend_files(paths, self.backend_root)
+            }
+        return {
+            "code": _digest_text(case.code),
+            "function": case.func_name,
+            "plan": {"description": case.description, "performance": case.performance, "faults": case.faults,
+                     "contracts": case.contracts},
+            "repeat": repeat,
+            "target": self.target,
+            "helpers": {name: file_digest(os.path.join(HERE, name + ".py")) for name in sorted(helpers)},
+            "contracts": file_digest(CONTRACTS_PATH),
+            "backend": backend,
+        }
+
+    @staticmethod
+    def key(manifest):
+        return _digest_text(json.dumps(manifest, sort_keys=True))
+
+    def _paths(self, case, case_id):
+        return static_paths(case.code) | set(self.index.get(case_id, {}).get("paths", []))
+
+    def lookup(self, case_id, case, repeat=None):
+        """(cached result or None, why it must run) for one case."""
+        manifest = self.manifest(case, repeat, self._paths(case, case_id))
+        try:
+            with open(self._object_path(self.key(manifest)), encoding="utf-8") as f:
+                return json.load(f)["result"], None
+        except (OSError, ValueError, KeyError):
+            pass
+        previous = self.index.get(case_id, {}).get("manifest")
+        if previous is None:
+            return None, "not cached"
+        changed = changed_inputs(previous, manifest)
+        return None, ("changed: " + ", ".join(changed)) if changed else "last run did not pass"
+
+    def store(self, case_id, case, result, repeat=None):
+        """Cache a passing result; the routes it hit join the case's dependencies for next time."""
+        paths = self._paths(case, case_id) | route_paths(result)
+        manifest = self.manifest(case, repeat, paths)
+        self.index[case_id] = {"paths": sorted(paths), "manifest": manifest}
+        if result["testStatus"] != "PASSED":
+            return
+        key = self.key(manifest)
+        self._write(self._object_path(key), {"key": key, "manifest": manifest, "result": result})
+
+    def save(self):
+        self._write(os.path.join(self.root, "index.json"), self.index)
+
+    @staticmethod
+    def _write(path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        partial = f"{path}.{os.getpid()}"
+        with open(partial, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(partial, path)
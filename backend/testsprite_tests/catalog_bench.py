@@ -0,0 +1,205 @@
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import client
+import latency
+
+REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tmp", "catalog_report.json")
+PRODUCTS = "/api/products"
+GENDERS = ("Men", "Women", "Kids")
+DAYS = (7, 15, 30)
+GLOBAL_DAYS = (1, 7, 15, 30, 90)
+LIMITS = (10, 20, 50)
+
+
+def sweep(categories):
+    """(route template, url) pairs for every parameter combination of the home page reads."""
+    urls = [(f"GET {PRODUCTS}/catalog/summary", f"{PRODUCTS}/catalog/summary")]
+    urls += [(f"GET {PRODUCTS}/trending/global", f"{PRODUCTS}/trending/global?days={days}") for days in GLOBAL_DAYS]
+    urls += [
+        (f"GET {PRODUCTS}/trending/{{gender}}/{{days}}", f"{PRODUCTS}/trending/{gender}/{days}")
+        for gender in GENDERS for days in DAYS
+    ]
+    urls += [
+        (f"GET {PRODUCTS}/trending/category/{{category}}/{{days}}",
+         f"{PRODUCTS}/trending/category/{quote(category)}/{days}")
+        for category in categories for days in DAYS
+    ]
+    urls += [(f"GET {PRODUCTS}/random", f"{PRODUCTS}/random?limit={limit}") for limit in LIMITS]
+    urls += [(f"GET {PRODUCTS}/suggested", f"{PRODUCTS}/suggested?limit={limit}") for limit in LIMITS]
+    urls += [("GET /api/reviews/latest", "/api/reviews/latest")]
+    return urls
+
+
+def discover_categories(limit):
+    """Most populated categories according to /catalog/summary."""
+    response = client.get(f"{PRODUCTS}/catalog/summary")
+    if response.status_code != 200:
+        return []
+    return [row["_id"] for row in response.json().get("summary", []) if row.get("_id")][:limit]
+
+
+def fetch(url, headers):
+    start = time.perf_counter()
+    try:
+        response = client.get(url, headers=headers)
+        return response.status_code, time.perf_counter() - start, len(response.content)
+    except Exception:
+        return None, time.perf_counter() - start, 0
+
+
+class Sample:
+    def __init__(self):
+        self.histogram = latency.Histogram()
+        self.statuses = {}
+        self.bytes = 0
+        self.window = 0.0
+
+    def add(self, status, elapsed, size):
+        self.histogram.record(elapsed)
+        self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+        self.bytes += size
+
+    def summary(self):
+        count = self.histogram.count
+        return dict(
+            self.histogram.summary(),
+            statuses=self.statuses,
+            mean_bytes=self.bytes / count if count else 0,
+            throughput_rps=count / self.window if self.window else None,
+        )
+
+
+def cache_busted(url):
+    """`url` with a query key no earlier request used, so no HTTP cache on the way can answer it."""
+    return f"{url}{'&' if '?' in url else '?'}_cold={uuid.uuid4().hex}"
+
+
+def cold_pass(urls, headers, cold=None):
+    """One request per URL before anything has been repeated, over an already open connection.
+
+    The connection is warmed with /health first, so a cold sample is the server's first sight
+    of the URL and not a TCP connect as well.
+    """
+    cold = {} if cold is None else cold
+    headers = dict(headers, **{"Cache-Control": "no-cache"})
+    fetch("/health", headers)
+    for route, url in urls:
+        cold.setdefault(route, {})[url] = Sample()
+        cold[route][url].add(*fetch(cache_busted(url), headers))
+    return cold
+
+
+def warm_pass(urls, headers, repeat, concurrency):
+    """Each URL `repeat` times with `concurrency` in flight, after one unmeasured warm-up hit."""
+    warm = {}
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="catalog") as pool:
+        for route, url in urls:
+            fetch(url, headers)
+            sample = warm.setdefault(route, {})[url] = Sample()
+            start = time.perf_counter()
+            for outcome in pool.map(lambda _: fetch(url, headers), range(repeat)):
+                sample.add(*outcome)
+            sample.window = time.perf_counter() - start
+    return warm
+
+
+def build_report(cold, serial, warm):
+    endpoints = {}
+    for route in warm:
+        total_cold, total_serial, total_warm = latency.Histogram(), latency.Histogram(), latency.Histogram()
+        urls = {}
+        for url, sample in warm[route].items():
+            total_cold.merge(cold[route][url].histogram)
+            total_serial.merge(serial[route][url].histogram)
+            total_warm.merge(sample.histogram)
+            cold_ms = cold[route][url].histogram.max / 1e3
+            # The cold request ran alone, so it is compared with warm requests that also ran alone
+            serial_summary = serial[route][url].summary()
+            urls[url] = {
+                "cold_ms": cold_ms,
+                "cold_status": next(iter(cold[route][url].statuses)),
+                "cold_bytes": cold[route][url].bytes,
+                "warm_serial": serial_summary,
+                "warm": sample.summary(),
+                "cold_over_warm_p50": cold_ms / serial_summary["p50_ms"] if serial_summary.get("p50_ms") else None,
+            }
+        window = sum(sample.window for sample in warm[route].values())
+        endpoints[route] = {
+            "cold_ms": total_cold.summary(),
+            "warm_serial_ms": total_serial.summary(),
+            "warm_ms": total_warm.summary(),
+            "warm_throughput_rps": total_warm.count / window if window else None,
+            "mean_bytes": sum(s.bytes for s in warm[route].values()) / total_warm.count if total_warm.count else 0,
+            "urls": urls,
+        }
+    return {"endpoints": endpoints}
+
+
+def run_benchmark(repeat=50, concurrency=8, categories=None, category_count=5, token=None):
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    # /catalog/summary is measured cold before discovery reads it, and discovery touches nothing else
+    summary = sweep([])[0]
+    cold = cold_pass([summary], headers)
+    categories = categories or discover_categories(category_count)
+    urls = sweep(categories)
+    cold_pass([entry for entry in urls if entry != summary], headers, cold)
+    serial = warm_pass(urls, headers, repeat, 1)
+    warm = warm_pass(urls, headers, repeat, concurrency)
+    report = build_report(cold, serial, warm)
+    report.update({"repeat": repeat, "concurrency": concurrency, "categories": categories})
+    return report
+
+
+def print_report(report):
+    print(f"warm latency is one request at a time; rps is with {report['concurrency']} in flight")
+    print(f"{'endpoint':<52}{'cold p50':>10}{'warm p50':>10}{'warm p95':>10}{'rps':>9}{'KiB':>9}")
+    for route, row in report["endpoints"].items():
+        cold, serial = row["cold_ms"], row["warm_serial_ms"]
+        print(f"{route:<52}{cold.get('p50_ms', 0):>10.1f}{serial.get('p50_ms', 0):>10.1f}{serial.get('p95_ms', 0):>10.1f}"
+              f"{row['warm_throughput_rps'] or 0:>9.1f}{row['mean_bytes'] / 1024:>9.1f}")
+        for url, detail in row["urls"].items():
+            ratio = detail["cold_over_warm_p50"]
+            errors = {status: n for status, n in detail["warm"]["statuses"].items() if status != "200"}
+            if (ratio and ratio >= 3) or errors or detail["cold_status"] != "200":
+                print(f"  {url}: cold {detail['cold_ms']:.1f}ms ({detail['cold_status']})"
+                      f"{f', {ratio:.1f}x warm p50' if ratio else ''}{f', warm errors {errors}' if errors else ''}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold and warm latency of the catalog read endpoints.")
+    parser.add_argument("-n", "--repeat", type=int, default=50, help="warm requests per URL, per warm pass")
+    parser.add_argument("-c", "--concurrency", type=int, default=8,
+                        help="requests in flight in the throughput pass (the cold/warm ratio uses one at a time)")
+    parser.add_argument("--categories", type=lambda v: [c for c in v.split(",") if c],
+                        help="categories to sweep (default: the largest from /catalog/summary)")
+    parser.add_argument("--category-count", type=int, default=5)
+    parser.add_argument("--token", default=os.getenv("TESTSPRITE_TOKEN"), help="bearer token, e.g. for /suggested")
+    parser.add_argument("-o", "--output", default=REPORT_PATH)
+    parser.add_argument("--stub", action="store_true", help="run against the in-process stub backend")
+    args = parser.parse_args(argv)
+
+    if args.stub:
+        import fixtures
+        from stub_server import StubServer
+
+        client.BASE_URL = StubServer().start_in_thread().url
+        fixtures.products.shared()
+
+    client.configure(pool_size=max(client.POOL_SIZE, args.concurrency), retries=0)
+    report = run_benchmark(args.repeat, args.concurrency, args.categories, args.category_count, args.token)
+    print_report(report)
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
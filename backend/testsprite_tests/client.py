@@ -0,0 +1,237 @@
+import contextvars
+import os
+import socket
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+from urllib3.util.retry import Retry
+
+BASE_URL = os.getenv("TESTSPRITE_BASE_URL", "http://localhost:5000")
+TIMEOUT = float(os.getenv("TESTSPRITE_TIMEOUT", "30"))
+POOL_SIZE = int(os.getenv("TESTSPRITE_POOL_SIZE", "32"))
+RETRIES = int(os.getenv("TESTSPRITE_RETRIES", "3"))
+BACKOFF = float(os.getenv("TESTSPRITE_BACKOFF", "0.2"))
+# 503 means the backend did not process the request, so it is safe to retry any verb
+RETRY_STATUSES = (503,)
+
+# dns/connect are 0.0 when a pooled keep-alive connection was reused; ttfb runs until the
+# response headers are parsed and total until the body has been read
+Timing = namedtuple("Timing", ["method", "url", "status", "elapsed", "started", "dns", "connect", "ttfb", "tag"])
+
+# Set by the runner (or any harness) so timings can be attributed to a case or load phase
+current_tag = contextvars.ContextVar("current_tag", default=None)
+# When set (faultproxy.install does), requests also carry the tag in this header
+TAG_HEADER = None
+
+# Only filled while a harness collects (see collecting()); the load tools keep their own figures
+# and an always-on list would grow by one Timing per request for the whole run
+timings = []
+_collecting = 0
+# Called as listener(timing, response) after every request; response is None when it raised
+listeners = []
+_timings_lock = threading.Lock()
+_local = threading.local()
+_phases = threading.local()
+_adapter = None
+_adapter_lock = threading.Lock()
+
+
+class _TimedConnectMixin:
+    def _new_conn(self):
+        # This is the connection's only lookup: urllib3 is then handed the numeric addresses, in
+        # order, and its own getaddrinfo() on those returns at once without asking the resolver
+        host, start = self._dns_host, time.perf_counter()
+        try:
+            found = socket.getaddrinfo(host.strip("[]"), self.port, allowed_gai_family(), socket.SOCK_STREAM)
+        except OSError:
+            found = []  # super() resolves the name itself and raises urllib3's NameResolutionError
+        resolved = time.perf_counter()
+        addresses = list(dict.fromkeys(sockaddr[0] for *_, sockaddr in found)) or [host]
+        try:
+            for n, address in enumerate(addresses):
+                # _dns_host backs .host too; it is restored before TLS or the Host header read it
+                self._dns_host = address
+                try:
+                    sock = super()._new_conn()
+                    break
+                except NewConnectionError:
+                    if n == len(addresses) - 1:
+                        raise
+        finally:
+            self._dns_host = host
+        _phases.dns = getattr(_phases, "dns", 0.0) + resolved - start
+        _phases.connect = getattr(_phases, "connect", 0.0) + time.perf_counter() - resolved
+        return sock
+
+
+class TimedHTTPConnection(_TimedConnectMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": TimedHTTPConnectionPool, "https": TimedHTTPSConnectionPool}
+
+
+def _build_adapter(pool_size, retries, backoff):
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=0,
+        status=retries,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=None,
+        backoff_factor=backoff,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    return TimedAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry, pool_block=True)
+
+
+def configure(pool_size=POOL_SIZE, retries=RETRIES, backoff=BACKOFF):
+    """Replace the shared connection pool. Sessions created afterwards use the new pool."""
+    global _adapter
+    with _adapter_lock:
+        old = _adapter
+        _adapter = _build_adapter(pool_size, retries, backoff)
+        _local.__dict__.clear()
+    if old is not None:
+        old.close()
+    return _adapter
+
+
+def get_adapter():
+    global _adapter
+    if _adapter is None:
+        with _adapter_lock:
+            if _adapter is None:
+                _adapter = _build_adapter(POOL_SIZE, RETRIES, BACKOFF)
+    return _adapter
+
+
+def get_session():
+    # One Session per thread keeps cookies isolated; all of them share the same keep-alive pool
+    session = getattr(_local, "session", None)
+    if session is None or getattr(_local, "adapter", None) is not get_adapter():
+        session = requests.Session()
+        session.mount("http://", get_adapter())
+        session.mount("https://", get_adapter())
+        _local.session = session
+        _local.adapter = get_adapter()
+    return session
+
+
+def url_for(path):
+    if path.startswith("http://") or path.startswith("https://"):
+        return path
+    return BASE_URL.rstrip("/") + "/" + path.lstrip("/")
+
+
+def record(timing):
+    if not _collecting:
+        return
+    with _timings_lock:
+        timings.append(timing)
+
+
+@contextmanager
+def collecting():
+    """Keep a Timing for every request made while the block runs; read them with drain_timings()."""
+    global _collecting
+    with _timings_lock:
+        _collecting += 1
+    try:
+        yield
+    finally:
+        with _timings_lock:
+            _collecting -= 1
+
+
+def add_listener(listener):
+    listeners.append(listener)
+    return listener
+
+
+def remove_listener(listener):
+    if listener in listeners:
+        listeners.remove(listener)
+
+
+def drain_timings():
+    """Return and clear all timings captured so far."""
+    with _timings_lock:
+        captured = list(timings)
+        timings.clear()
+    return captured
+
+
+def request(method, url, **kwargs):
+    kwargs.setdefault("timeout", TIMEOUT)
+    if TAG_HEADER and current_tag.get() is not None:
+        kwargs["headers"] = dict(kwargs.get("headers") or {}, **{TAG_HEADER: current_tag.get()})
+    url = url_for(url)
+    _phases.dns = _phases.connect = 0.0
+    started = time.time()
+    start = time.perf_counter()
+    response = status = ttfb = None
+    try:
+        response = get_session().request(method, url, **kwargs)
+        status = response.status_code
+        ttfb = response.elapsed.total_seconds()
+        return response
+    finally:
+        elapsed = time.perf_counter() - start
+        timing = Timing(method.upper(), url, status, elapsed, started, _phases.dns, _phases.connect, ttfb, current_tag.get())
+        record(timing)
+        for listener in listeners:
+            listener(timing, response)
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def put(url, **kwargs):
+    return request("PUT", url, **kwargs)
+
+
+def patch(url, **kwargs):
+    return request("PATCH", url, **kwargs)
+
+
+def delete(url, **kwargs):
+    return request("DELETE", url, **kwargs)
+
+
+def close():
+    global _adapter
+    with _adapter_lock:
+        if _adapter is not None:
+            _adapter.close()
+        _adapter = None
+        _local.__dict__.clear()
@@ -0,0 +1,375 @@
+import argparse
+import itertools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+import latency
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PRD_PATH = os.path.join(HERE, "standard_prd.json")
+SECTION = "response_contracts"
+# Violations keep the first few messages of each response; one broken field tends to cascade
+MAX_ERRORS = 3
+# Distinct violation messages a load report keeps per endpoint
+MAX_SAMPLES = 5
+BENCH_ROUNDS = 20000
+
+TYPES = {
+    "object": (dict,),
+    "array": (list,),
+    "string": (str,),
+    "number": (int, float),
+    "integer": (int,),
+    "boolean": (bool,),
+    "null": (type(None),),
+}
+JSON_NAMES = {dict: "object", list: "array", str: "string", int: "integer", float: "number", bool: "boolean",
+              type(None): "null"}
+# Keywords of the JSON Schema subset the compiler understands; anything else is a typo, not a no-op
+KEYWORDS = {"type", "required", "properties", "items", "minItems", "minLength", "minimum", "enum", "pattern",
+            "anyOf", "$ref", "description", "examples"}
+_MISSING = object()
+
+
+class ContractError(ValueError):
+    pass
+
+
+def _json_type(value):
+    return JSON_NAMES.get(type(value), type(value).__name__)
+
+
+class _Compiler:
+    """Turn schemas into Python source: one straight-line function per schema, no interpretation at check time.
+
+    $refs are inlined and error paths are only built on failure, so a valid document costs a
+    handful of type() and dict lookups. Each anyOf alternative becomes its own function whose
+    errors are paths relative to "@", the value being matched.
+    """
+
+    def __init__(self, schemas):
+        self.schemas = schemas
+        self.namespace = {"_MISSING": _MISSING, "_json_type": _json_type}
+        self.blocks = []
+        self.sources = {}
+        self._ids = itertools.count()
+
+    def _constant(self, value):
+        name = f"_c{next(self._ids)}"
+        self.namespace[name] = value
+        return name
+
+    def _var(self, prefix="v"):
+        return f"{prefix}{next(self._ids)}"
+
+    def _define(self, name, schema, root, refs):
+        lines = [f"def {name}(v):", "    e = []"]
+        self.emit(schema, "v", repr(root), 1, lines, refs)
+        lines.append("    return e")
+        self.blocks.append("\n".join(lines))
+        return name
+
+    def compile(self, name):
+        """Validator for one named schema; its anyOf alternatives are defined along with it."""
+        first = len(self.blocks)
+        function = self._define(f"validate_{name}", self.schemas[name], "$", (name,))
+        source = self.sources[name] = "\n\n".join(self.blocks[first:]) + "\n"
+        exec(compile(source, f"<contract {name}>", "exec"), self.namespace)
+        return self.namespace[function]
+
+    def emit(self, schema, var, path, indent, lines, refs):
+        if not isinstance(schema, dict):
+            raise ContractError(f"{'/'.join(refs)}: schema must be an object, got {_json_type(schema)}")
+        if "$ref" in schema:
+            name = schema["$ref"]
+            if name not in self.schemas:
+                raise ContractError(f"{'/'.join(refs)}: unknown $ref {name!r}")
+            if name in refs:
+                raise ContractError(f"{'/'.join(refs)}: recursive $ref {name!r} is not supported")
+            self.emit(self.schemas[name], var, path, indent, lines, refs + (name,))
+            return
+        unknown = set(schema) - KEYWORDS
+        if unknown:
+            raise ContractError(f"{'/'.join(refs)}: unsupported keywords {sorted(unknown)}")
+        pad = "    " * indent
+
+        if "enum" in schema:
+            values = self._constant(frozenset(schema["enum"]))
+            lines += [f"{pad}if {var} not in {values}:",
+                      f"{pad}    e.append({path} + {': not one of ' + json.dumps(schema['enum'])!r})"]
+        if "anyOf" in schema:
+            self._any_of(schema["anyOf"], var, path, indent, lines, refs)
+
+        known = None
+        body = []
+        if "type" in schema:
+            names = [schema["type"]] if isinstance(schema["type"], str) else schema["type"]
+            if any(name not in TYPES for name in names):
+                raise ContractError(f"{'/'.join(refs)}: unknown type in {names}")
+            known = tuple(t for name in names for t in TYPES[name])
+            if known == (type(None),):
+                check = f"{var} is None"
+            elif len(known) == 1:
+                check = f"type({var}) is {known[0].__name__}"
+            else:
+                check = f"type({var}) in {self._constant(known)}"
+            lines += [f"{pad}if not ({check}):",
+                      f"{pad}    e.append({path} + {': expected ' + ' or '.join(names) + ', got '!r} + _json_type({var}))"]
+            self._constraints(schema, var, path, indent + 1, body, refs, known)
+            if body:
+                lines.append(f"{pad}else:")
+                lines += body
+        else:
+            self._constraints(schema, var, path, indent, lines, refs, known)
+
+    def _any_of(self, alternatives, var, path, indent, lines, refs):
+        names = [self._define(f"_alt{next(self._ids)}", alt, "@", refs) for alt in alternatives]
+        results = [self._var("a") for _ in names]
+        for depth, (name, result) in enumerate(zip(names, results)):
+            pad = "    " * (indent + depth)
+            lines += [f"{pad}{result} = {name}({var})", f"{pad}if {result}:"]
+        pad = "    " * (indent + len(names))
+        lines.append(f"{pad}e.append({path} + ': matches no alternative: ' + ' | '.join({' + '.join(results)}))")
+
+    def _guarded(self, kinds, var, indent, lines, known):
+        """Open an `if type(var) ...:` block unless the type check above already settled it."""
+        if known is not None and set(known) <= set(kinds):
+            return indent
+        check = f"type({var}) is {kinds[0].__name__}" if len(kinds) == 1 else f"type({var}) in {self._constant(kinds)}"
+        lines.append(f"{'    ' * indent}if {check}:")
+        return indent + 1
+
+    def _constraints(self, schema, var, path, indent, lines, refs, known):
+        if "required" in schema or "properties" in schema:
+            block = []
+            inner = self._guarded((dict,), var, indent, block, known)
+            pad = "    " * inner
+            for key in schema.get("required", ()):
+                block += [f"{pad}if {key!r} not in {var}:",
+                          f"{pad}    e.append({path} + {'.' + key + ': required'!r})"]
+            for key, sub in schema.get("properties", {}).items():
+                value, nested = self._var(), []
+                self.emit(sub, value, f"{path} + {'.' + key!r}", inner + 1, nested, refs)
+                if nested:
+                    block += [f"{pad}{value} = {var}.get({key!r}, _MISSING)", f"{pad}if {value} is not _MISSING:"]
+                    block += nested
+            if len(block) > (inner > indent):
+                lines += block
+        if "minItems" in schema or "items" in schema:
+            block = []
+            inner = self._guarded((list,), var, indent, block, known)
+            pad = "    " * inner
+            if "minItems" in schema:
+                block += [f"{pad}if len({var}) < {int(schema['minItems'])}:",
+                          f"{pad}    e.append({path} + {': fewer than %d items' % schema['minItems']!r})"]
+            if "items" in schema:
+                index, item, nested = self._var("i"), self._var(), []
+                self.emit(schema["items"], item, f"{path} + '[' + str({index}) + ']'", inner + 1, nested, refs)
+                if nested:
+                    block.append(f"{pad}for {index}, {item} in enumerate({var}):")
+                    block += nested
+            if len(block) > (inner > indent):
+                lines += block
+        if "minLength" in schema or "pattern" in schema:
+            inner = self._guarded((str,), var, indent, lines, known)
+            pad = "    " * inner
+            if "minLength" in schema:
+                lines += [f"{pad}if len({var}) < {int(schema['minLength'])}:",
+                          f"{pad}    e.append({path} + {': shorter than %d characters' % schema['minLength']!r})"]
+            if "pattern" in schema:
+                regex = self._constant(re.compile(schema["pattern"]))
+                lines += [f"{pad}if {regex}.search({var}) is None:",
+                          f"{pad}    e.append({path} + {': does not match /' + schema['pattern'] + '/'!r})"]
+        if "minimum" in schema:
+            inner = self._guarded((int, float), var, indent, lines, known)
+            pad = "    " * inner
+            lines += [f"{pad}if {var} < {schema['minimum']!r}:",
+                      f"{pad}    e.append({path} + {': below %r' % schema['minimum']!r})"]
+
+
+class Contracts:
+    """Named response schemas compiled once, bound to routes per status ("201") or class ("4xx").
+
+    check(route, status, body) returns None when nothing is bound, else a list of error strings
+    such as "$.images[0].url: required", empty when the body conforms.
+    """
+
+    def __init__(self, schemas, routes):
+        compiler = _Compiler(schemas)
+        self.schemas = schemas
+        self.validators = {name: compiler.compile(name) for name in schemas}
+        self.sources = compiler.sources
+        # Exact statuses are keyed by the code, classes by their first digit; the two cannot collide
+        self.routes = {}
+        for route, statuses in routes.items():
+            bound = self.routes[route] = {}
+            for status, name in statuses.items():
+                if name not in self.validators:
+                    raise ContractError(f"{route} {status}: unknown schema {name!r}")
+                if re.fullmatch(r"[1-5]\d\d", status):
+                    bound[int(status)] = name, self.validators[name]
+                elif re.fullmatch(r"[1-5]xx", status):
+                    bound[int(status[0])] = name, self.validators[name]
+                else:
+                    raise ContractError(f"{route}: status {status!r} is neither a code nor a class like 4xx")
+
+    def lookup(self, route, status):
+        """(schema name, validator) bound to `route` for `status`, or None."""
+        bound = self.routes.get(route)
+        if bound is None or status is None:
+            return None
+        return bound.get(status) or bound.get(status // 100)
+
+    def check(self, route, status, body):
+        found = self.lookup(route, status)
+        return None if found is None else found[1](body)
+
+    def check_response(self, route, response):
+        """check() on a requests response, parsing its body only when a schema is bound."""
+        found = self.lookup(route, response.status_code)
+        if found is None:
+            return None
+        try:
+            body = response.json()
+        except ValueError:
+            return ["$: body is not JSON"]
+        return found[1](body)
+
+
+def load(path=PRD_PATH):
+    with open(path, encoding="utf-8") as f:
+        section = json.load(f).get(SECTION)
+    if not section:
+        raise ContractError(f"{path} has no {SECTION!r} section")
+    return Contracts(section.get("schemas", {}), section.get("routes", {}))
+
+
+@lru_cache(maxsize=None)
+def default():
+    return load()
+
+
+def describe(route, status, errors):
+    more = f" (+{len(errors) - MAX_ERRORS} more)" if len(errors) > MAX_ERRORS else ""
+    return f"{route} -> {status}: " + "; ".join(errors[:MAX_ERRORS]) + more
+
+
+class Checker:
+    """Client listener validating every response on a bound route, grouped by the request's tag."""
+
+    def __init__(self, contracts=None):
+        self.contracts = contracts or default()
+        self.checked = defaultdict(Counter)
+        self.violations = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def __call__(self, timing, response):
+        if response is None:
+            return
+        route = latency.route_template(timing.method, timing.url)
+        errors = self.contracts.check_response(route, response)
+        if errors is None:
+            return
+        with self._lock:
+            self.checked[timing.tag][route] += 1
+            if errors:
+                self.violations[timing.tag].append(describe(route, response.status_code, errors))
+
+    def results(self, tag):
+        """({route: responses checked}, [violation, identical ones counted once]) for one tag."""
+        with self._lock:
+            repeated = Counter(self.violations.get(tag, []))
+        return (dict(self.checked.get(tag, {})),
+                [message if n == 1 else f"{message} (x{n})" for message, n in repeated.items()])
+
+
+class Tally:
+    """Checked responses and violations per endpoint, for the load generators' reports."""
+
+    def __init__(self):
+        self.checked = Counter()
+        self.violations = Counter()
+        self.samples = defaultdict(list)
+
+    def add(self, endpoint, status, errors):
+        if errors is None:
+            return
+        self.checked[endpoint] += 1
+        if errors:
+            self.violations[endpoint] += 1
+            message = describe(endpoint, status, errors)
+            samples = self.samples[endpoint]
+            if len(samples) < MAX_SAMPLES and message not in samples:
+                samples.append(message)
+
+    def report(self, endpoint):
+        return {"checked": self.checked[endpoint], "violations": self.violations[endpoint],
+                "samples": list(self.samples.get(endpoint, []))}
+
+
+def benchmark(contracts, rounds=BENCH_ROUNDS):
+    """{schema: {examples, failing, per_second}} validating each schema's examples `rounds` times."""
+    report = {}
+    for name, validator in contracts.validators.items():
+        examples = contracts.schemas[name].get("examples", [])
+        if not examples:
+            continue
+        failing = []
+        for n, example in enumerate(examples):
+            errors = validator(example)
+            if errors:
+                failing.append(f"example {n}: {'; '.join(errors)}")
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for example in examples:
+                validator(example)
+        elapsed = time.perf_counter() - start
+        report[name] = {"examples": len(examples), "failing": failing,
+                        "per_second": rounds * len(examples) / elapsed if elapsed else None}
+    return report
+
+
+def print_bindings(contracts):
+    print(f"{'route':<40}{'status':>8}  schema")
+    for route, bound in contracts.routes.items():
+        for status, (name, _) in sorted(bound.items(), key=lambda item: str(item[0])):
+            print(f"{route:<40}{status if status >= 100 else f'{status}xx':>8}  {name}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile the response contracts in standard_prd.json and check them.")
+    parser.add_argument("--prd", default=PRD_PATH)
+    parser.add_argument("--show", metavar="SCHEMA", nargs="?", const="", help="print the generated source (of one schema)")
+    parser.add_argument("--bench", type=int, nargs="?", const=BENCH_ROUNDS, metavar="ROUNDS",
+                        help="validate each schema's examples ROUNDS times and report validations per second")
+    args = parser.parse_args(argv)
+
+    try:
+        contracts = load(args.prd)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if args.show is not None:
+        if args.show and args.show not in contracts.validators:
+            parser.error(f"unknown schema {args.show!r}; choose from {', '.join(contracts.validators)}")
+        print("\n\n".join(source for name, source in contracts.sources.items() if args.show in ("", name)), end="")
+        return 0
+    print_bindings(contracts)
+    report = benchmark(contracts, args.bench or 1)
+    failing = 0
+    for name, row in report.items():
+        rate = f"{row['per_second']:>12,.0f}/s" if args.bench else ""
+        print(f"{name:<24}{row['examples']:>3} examples {'ok' if not row['failing'] else 'FAILING':<8}{rate}".rstrip())
+        for message in row["failing"]:
+            print(f"{'':>4}{message}")
+        failing += bool(row["failing"])
+    return 1 if failing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
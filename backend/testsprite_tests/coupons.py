@@ -0,0 +1,301 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import client
+import latency
+from payments import BASE_PAYLOAD
+from socket_swarm import read_lines
+
+REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tmp", "coupon_report.json")
+COUPONS_PATH = "/api/coupons"
+APPLY_PATH = "/api/coupons/apply"
+CART_PATH = "/api/cart"
+ORDER_PATH = "/api/order/create"
+DEFAULT_LEVELS = (1, 8, 32, 128)
+CODE_PREFIX = "BENCH"
+# createOrder records coupon usage after it has already responded, so give it a moment
+SETTLE_SECONDS = 1.0
+
+
+def coupon_payload(usage_limit=None, per_user=1, discount=10):
+    """A FLAT coupon valid for a day with a unique code."""
+    now = datetime.now(timezone.utc)
+    payload = {
+        "code": f"{CODE_PREFIX}{uuid.uuid4().hex[:10].upper()}",
+        "type": "FLAT",
+        "discountValue": discount,
+        "usageLimitPerUser": per_user,
+        "startDate": (now - timedelta(minutes=5)).isoformat(),
+        "expiryDate": (now + timedelta(days=1)).isoformat(),
+        "status": "ACTIVE",
+    }
+    if usage_limit is not None:
+        payload["usageLimit"] = usage_limit
+    return payload
+
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+class Coupons:
+    """Admin side: creates the coupons a run needs, reads their usage back and deletes them afterwards."""
+
+    def __init__(self, admin_token):
+        self.headers = bearer(admin_token)
+        self.created = []
+
+    def create(self, **kwargs):
+        response = client.post(COUPONS_PATH, json=coupon_payload(**kwargs), headers=self.headers)
+        if response.status_code != 201:
+            raise RuntimeError(f"creating a coupon failed with {response.status_code}: {response.text[:200]}")
+        coupon = response.json()["data"]
+        self.created.append(coupon["_id"])
+        return coupon
+
+    def usage_count(self, coupon_id):
+        response = client.get(COUPONS_PATH, headers=self.headers)
+        for coupon in response.json()["data"] if response.status_code == 200 else []:
+            if coupon["_id"] == coupon_id:
+                return coupon.get("usageCount", 0)
+        return None
+
+    def teardown(self):
+        for coupon_id in self.created:
+            client.delete(f"{COUPONS_PATH}/{coupon_id}", headers=self.headers)
+        self.created.clear()
+
+
+def fill_carts(tokens, product):
+    """/apply prices the server-side cart, so every user gets one unit of the same product."""
+    for token in tokens:
+        response = client.put(CART_PATH, json={"cart": [{"productId": product["_id"], "quantity": 1}]},
+                              headers=bearer(token))
+        if response.status_code != 200:
+            raise RuntimeError(f"filling a cart failed with {response.status_code}: {response.text[:200]}")
+
+
+def order_payload(product, code):
+    payload = dict(BASE_PAYLOAD, couponCode=code, paymentMethod="COD")
+    price = float(product.get("price", 0))
+    payload["products"] = [{"productId": product["_id"], "quantity": 1, "price": price}]
+    payload.update(subtotal=price, total=price)
+    return payload
+
+
+class Burst:
+    """Results of firing a set of calls together, released by a barrier so they truly overlap."""
+
+    def __init__(self):
+        self.histogram = latency.Histogram()
+        self.statuses = {}
+        self.messages = {}
+        self.wall = 0.0
+
+    def summary(self):
+        count = self.histogram.count
+        return {
+            "requests": count,
+            "wall_s": self.wall,
+            "throughput_rps": count / self.wall if self.wall else None,
+            "latency_ms": self.histogram.summary(),
+            "statuses": self.statuses,
+            "messages": self.messages,
+        }
+
+
+def burst(calls, concurrency):
+    """Run `calls` (method, path, json, headers) in waves of `concurrency`, each wave started at once."""
+    result, lock = Burst(), threading.Lock()
+    barrier = threading.Barrier(concurrency)
+
+    def fire(call):
+        method, path, body, headers = call
+        try:
+            barrier.wait()
+        except threading.BrokenBarrierError:
+            pass
+        start = time.perf_counter()
+        try:
+            response = client.request(method, path, json=body, headers=headers)
+            status, message = response.status_code, None
+            if status >= 400:
+                try:
+                    message = response.json().get("message")
+                except ValueError:
+                    message = response.text[:100]
+        except Exception as e:
+            status, message = None, type(e).__name__
+        elapsed = time.perf_counter() - start
+        with lock:
+            result.histogram.record(elapsed)
+            result.statuses[str(status)] = result.statuses.get(str(status), 0) + 1
+            if message:
+                result.messages[message] = result.messages.get(message, 0) + 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="coupon") as pool:
+        for offset in range(0, len(calls), concurrency):
+            wave = calls[offset:offset + concurrency]
+            if len(wave) < concurrency:
+                barrier = threading.Barrier(len(wave))
+            list(pool.map(fire, wave))
+    result.wall = time.perf_counter() - start
+    return result
+
+
+def apply_level(coupons, tokens, concurrency, waves):
+    """/apply only validates, so with no usage limit every call should be accepted."""
+    coupon = coupons.create()
+    calls = [("POST", APPLY_PATH, {"couponCode": coupon["code"]}, bearer(tokens[i % len(tokens)]))
+             for i in range(concurrency * waves)]
+    result = burst(calls, concurrency).summary()
+    result["concurrency"] = concurrency
+    result["rejected"] = result["requests"] - result["statuses"].get("200", 0)
+    return result
+
+
+def redeem_level(coupons, tokens, product, concurrency, limit):
+    """`concurrency` distinct users check out with one coupon capped at `limit` uses, all at once."""
+    users = tokens[:concurrency]
+    coupon = coupons.create(usage_limit=limit)
+    body = order_payload(product, coupon["code"])
+    result = burst([("POST", ORDER_PATH, body, bearer(token)) for token in users], len(users)).summary()
+    accepted = result["statuses"].get("201", 0)
+    time.sleep(SETTLE_SECONDS)
+    usage = coupons.usage_count(coupon["_id"])
+    violations = []
+    if accepted > limit:
+        violations.append(f"{accepted} checkouts accepted for a coupon limited to {limit}")
+    if usage is not None and usage > limit:
+        violations.append(f"usageCount {usage} exceeds usageLimit {limit}")
+    if usage is not None and usage != accepted:
+        violations.append(f"usageCount {usage} does not match {accepted} accepted checkouts")
+    result.update(concurrency=len(users), usage_limit=limit, accepted=accepted, usage_count=usage,
+                  violations=violations)
+    return result
+
+
+def per_user_check(coupons, token, product, attempts):
+    """One user fires `attempts` checkouts at once with a coupon they may use only once."""
+    coupon = coupons.create(per_user=1)
+    body = order_payload(product, coupon["code"])
+    result = burst([("POST", ORDER_PATH, body, bearer(token))] * attempts, attempts).summary()
+    accepted = result["statuses"].get("201", 0)
+    time.sleep(SETTLE_SECONDS)
+    result.update(attempts=attempts, accepted=accepted, usage_count=coupons.usage_count(coupon["_id"]),
+                  violations=[f"{accepted} checkouts accepted for a once-per-user coupon"] if accepted > 1 else [])
+    return result
+
+
+def run_benchmark(tokens, admin_token, product, levels=DEFAULT_LEVELS, waves=5, limit_ratio=0.25, checkout=True):
+    coupons = Coupons(admin_token)
+    client.configure(pool_size=max(client.POOL_SIZE, max(levels)), retries=0)
+    try:
+        fill_carts(tokens[:max(levels)], product)
+        report = {"levels": list(levels), "users": len(tokens), "apply": [], "redeem": [], "per_user": None}
+        for level in levels:
+            report["apply"].append(apply_level(coupons, tokens, level, waves))
+        if checkout:
+            for level in levels:
+                users = min(level, len(tokens))
+                report["redeem"].append(redeem_level(coupons, tokens, product, users, max(1, int(users * limit_ratio))))
+            report["per_user"] = per_user_check(coupons, tokens[0], product, max(levels))
+    finally:
+        coupons.teardown()
+    return report
+
+
+def violations(report):
+    found = [v for row in report["redeem"] for v in row["violations"]]
+    return found + (report["per_user"]["violations"] if report["per_user"] else [])
+
+
+def print_report(report):
+    print(f"{'POST /apply':<14}{'conc':>6}{'reqs':>7}{'rps':>9}{'p50':>9}{'p99':>9}{'max':>9}{'rejected':>10}")
+    for row in report["apply"]:
+        ms = row["latency_ms"]
+        print(f"{'':<14}{row['concurrency']:>6}{row['requests']:>7}{row['throughput_rps'] or 0:>9.1f}"
+              f"{ms['p50_ms']:>9.1f}{ms['p99_ms']:>9.1f}{ms['max_ms']:>9.1f}{row['rejected']:>10}")
+    if report["redeem"]:
+        print(f"{'checkout':<14}{'conc':>6}{'limit':>7}{'accepted':>9}{'usage':>9}{'p50':>9}{'p99':>9}")
+        for row in report["redeem"]:
+            ms = row["latency_ms"]
+            print(f"{'':<14}{row['concurrency']:>6}{row['usage_limit']:>7}{row['accepted']:>9}"
+                  f"{row['usage_count'] if row['usage_count'] is not None else '?':>9}"
+                  f"{ms['p50_ms']:>9.1f}{ms['p99_ms']:>9.1f}")
+        per_user = report["per_user"]
+        print(f"one user, {per_user['attempts']} simultaneous checkouts with a once-per-user coupon: "
+              f"{per_user['accepted']} accepted")
+    for violation in violations(report):
+        print(f"VIOLATION: {violation}")
+
+
+def stub_users(count):
+    """Tokens the stub accepts: one admin and `count` users, signed with its JWT secret."""
+    from stub_server import sign_jwt
+
+    expires = int(time.time()) + 3600
+    admin = sign_jwt({"id": uuid.uuid4().hex[:24], "role": "admin", "exp": expires})
+    return admin, [sign_jwt({"id": uuid.uuid4().hex[:24], "role": "user", "exp": expires}) for _ in range(count)]
+
+
+def parse_levels(value):
+    return tuple(int(level) for level in value.split(",") if level.strip())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hammer one coupon from many users and check its usage limits hold.")
+    parser.add_argument("-c", "--levels", type=parse_levels, default=DEFAULT_LEVELS, help="concurrency steps, e.g. 1,8,32")
+    parser.add_argument("-w", "--waves", type=int, default=5, help="simultaneous /apply waves per step")
+    parser.add_argument("--limit-ratio", type=float, default=0.25,
+                        help="coupon usageLimit as a fraction of the users checking out at once")
+    parser.add_argument("--no-checkout", action="store_true", help="only time /apply; places no orders")
+    parser.add_argument("--tokens", help="file with one user JWT per line (default: the auth.py token pool)")
+    parser.add_argument("--admin-token", default=os.getenv("TESTSPRITE_ADMIN_TOKEN"), help="JWT that may manage coupons")
+    parser.add_argument("--product", help="product id to put in carts (default: one from the fixture pool)")
+    parser.add_argument("-o", "--output", default=REPORT_PATH)
+    parser.add_argument("--stub", action="store_true", help="run against the in-process stub backend")
+    args = parser.parse_args(argv)
+
+    import fixtures
+
+    if args.stub:
+        from stub_server import StubServer
+
+        client.BASE_URL = StubServer().start_in_thread().url
+        args.admin_token, tokens = stub_users(max(args.levels))
+    elif not args.admin_token:
+        parser.error("--admin-token (or TESTSPRITE_ADMIN_TOKEN) is required outside --stub")
+    elif args.tokens:
+        tokens = read_lines(args.tokens)
+    else:
+        import auth
+
+        tokens = auth.users.tokens(max(args.levels))
+    if not args.no_checkout and len(tokens) < max(args.levels):
+        print(f"only {len(tokens)} users: checkout steps are capped at that many concurrent users", file=sys.stderr)
+
+    if args.product:
+        response = client.get(f"/products/{args.product}")
+        product = response.json() if response.status_code == 200 else {"_id": args.product}
+    else:
+        product = fixtures.products.shared()
+    report = run_benchmark(tokens, args.admin_token, product, args.levels, args.waves, args.limit_ratio,
+                           checkout=not args.no_checkout)
+    print_report(report)
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return 1 if violations(report) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
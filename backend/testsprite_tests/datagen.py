@@ -0,0 +1,567 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+
+import client
+
+try:
+    import numpy as np
+except ImportError:  # only the dataset generator needs it
+    np = None
+try:
+    import pymongo
+    from bson import ObjectId
+except ImportError:  # only the mongo sink needs it
+    pymongo = None
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPORT_PATH = os.path.join(HERE, "tmp", "datagen_report.json")
+JSONL_DIR = os.path.join(HERE, "tmp", "dataset")
+BATCH_SIZE = 10000
+COLLECTIONS = ("products", "users", "orders", "reviews")
+# First byte after the timestamp in generated ObjectIds, so ids never collide across collections
+KIND_BYTE = {name: n + 1 for n, name in enumerate(COLLECTIONS)}
+IMAGE_URL = "https://cdn.example.com/catalog/{id}.jpg"
+# The backend creates products one request at a time; the http sink keeps this many in flight
+HTTP_CONCURRENCY = 16
+
+# name, genderCategory, price range in INR
+CATEGORIES = [
+    ("Men's T-Shirts", "Men", 199, 1499),
+    ("Women's Kurtas", "Women", 399, 3999),
+    ("Smartphones", None, 6999, 89999),
+    ("Footwear", None, 299, 5999),
+    ("Home Decor", None, 199, 4999),
+    ("Kitchen", None, 149, 7999),
+    ("Headphones", None, 499, 14999),
+    ("Women's Sarees", "Women", 599, 9999),
+    ("Men's Jeans", "Men", 499, 2999),
+    ("Kids' Toys", "Kids", 149, 2999),
+    ("Beauty", None, 99, 1999),
+    ("Books", None, 99, 999),
+]
+ADJECTIVES = ["Classic", "Premium", "Everyday", "Slim", "Vintage", "Urban", "Eco", "Pro", "Essential", "Deluxe"]
+MATERIALS = ["Cotton", "Linen", "Steel", "Bamboo", "Leather", "Ceramic", "Silk", "Denim", "Wooden", "Matte"]
+FIRST_NAMES = ["Aarav", "Vivaan", "Aditya", "Diya", "Ananya", "Ishaan", "Kavya", "Rohan", "Saanvi", "Arjun",
+               "Meera", "Kabir", "Nisha", "Vikram", "Priya", "Rahul", "Sneha", "Karan", "Pooja", "Aman"]
+LAST_NAMES = ["Sharma", "Verma", "Iyer", "Reddy", "Patel", "Nair", "Gupta", "Singh", "Das", "Menon",
+              "Khan", "Joshi", "Rao", "Kapoor", "Bose", "Mehta", "Pillai", "Chopra", "Saxena", "Kulkarni"]
+# city, state, pincode prefix
+CITIES = [
+    ("Bengaluru", "Karnataka", "560"), ("Mumbai", "Maharashtra", "400"), ("Delhi", "Delhi", "110"),
+    ("Chennai", "Tamil Nadu", "600"), ("Hyderabad", "Telangana", "500"), ("Kolkata", "West Bengal", "700"),
+    ("Pune", "Maharashtra", "411"), ("Ahmedabad", "Gujarat", "380"), ("Jaipur", "Rajasthan", "302"),
+    ("Lucknow", "Uttar Pradesh", "226"), ("Kochi", "Kerala", "682"), ("Indore", "Madhya Pradesh", "452"),
+]
+LOCALITIES = ["MG Road", "Station Road", "Gandhi Nagar", "Park Street", "Lake View", "Civil Lines", "Sector 12"]
+ORDER_STATUSES = ["Delivered", "Shipped", "Out for Delivery", "Processing", "Pending", "Cancelled"]
+RATING_WEIGHTS = [0.05, 0.07, 0.13, 0.30, 0.45]
+REVIEW_COMMENTS = {
+    1: ["Stopped working within a week.", "Not as described, returning it."],
+    2: ["Quality could be better.", "Delivery was late and the box was damaged."],
+    3: ["Okay for the price.", "Average, does the job."],
+    4: ["Good quality, would buy again.", "Nice product, fits well."],
+    5: ["Excellent, exactly as shown!", "Superb quality and fast delivery."],
+}
+GST_RATE = 18
+FREE_DELIVERY_ABOVE = 500
+DELIVERY_CHARGE = 40
+
+
+def zipf_weights(n, skew, rng):
+    """Probabilities proportional to 1/rank**skew, assigned to items in random order (skew 0 = uniform)."""
+    weights = 1.0 / np.arange(1, n + 1) ** skew
+    rng.shuffle(weights)
+    return weights / weights.sum()
+
+
+def object_ids(kind, seconds, seed):
+    """Deterministic ObjectId hex strings: creation time, collection byte, 3 seed bytes, 4-byte index."""
+    n = len(seconds)
+    raw = np.empty((n, 12), dtype=np.uint8)
+    raw[:, 0:4] = seconds.astype(">u4").view(np.uint8).reshape(n, 4)
+    raw[:, 4] = KIND_BYTE[kind]
+    raw[:, 5:8] = np.frombuffer((seed & 0xFFFFFF).to_bytes(3, "big"), dtype=np.uint8)
+    raw[:, 8:12] = np.arange(n, dtype=">u4").view(np.uint8).reshape(n, 4)
+    flat = raw.tobytes()
+    return [flat[i:i + 12].hex() for i in range(0, 12 * n, 12)]
+
+
+class Dataset:
+    """All random draws for a dataset, made up front as arrays; records are built batch by batch.
+
+    Drawing order lines and reviews before any product is emitted lets products carry their
+    real totalOrders, rating and reviewsCount, so trending and analytics queries see
+    consistent data.
+    """
+
+    def __init__(self, products, users, orders, reviews, seed=0, category_skew=1.1, product_skew=1.0,
+                 order_skew=1.2, days=365, now=None):
+        rng = np.random.default_rng(seed)
+        self.counts = {"products": products, "users": users, "orders": orders, "reviews": reviews}
+        self.seed = seed
+        now_s = int(now or time.time())
+        span = days * 86400
+
+        # Products: category by Zipf rank, log-uniform price inside the category range, charm pricing
+        self.category = rng.choice(len(CATEGORIES), size=products, p=zipf_weights(len(CATEGORIES), category_skew, rng))
+        low = np.array([c[2] for c in CATEGORIES], dtype=float)[self.category]
+        high = np.array([c[3] for c in CATEGORIES], dtype=float)[self.category]
+        price = np.exp(rng.uniform(np.log(low), np.log(high)))
+        self.price = np.maximum(np.round(price / 50) * 50 - 1, 49).astype(np.int64)
+        self.mrp = (self.price * rng.uniform(1.1, 1.8, size=products)).round(-1).astype(np.int64) - 1
+        self.stock = np.where(rng.random(products) < 0.05, 0, rng.integers(1, 500, size=products))
+        self.product_created = now_s - (span * rng.random(products)).astype(np.int64) - span
+        self.adjective = rng.integers(len(ADJECTIVES), size=products)
+        self.material = rng.integers(len(MATERIALS), size=products)
+        self.product_ids = object_ids("products", self.product_created, seed)
+
+        # Users
+        self.first = rng.integers(len(FIRST_NAMES), size=users)
+        self.last = rng.integers(len(LAST_NAMES), size=users)
+        self.city = rng.integers(len(CITIES), size=users)
+        self.locality = rng.integers(len(LOCALITIES), size=users)
+        self.pincode = rng.integers(0, 1000, size=users)
+        self.phone = rng.integers(6_000_000_000, 9_999_999_999, size=users)
+        self.user_created = now_s - (2 * span * rng.random(users)).astype(np.int64)
+        self.user_ids = object_ids("users", self.user_created, seed)
+
+        # Orders: owners follow a power law (few heavy buyers, a long tail with none), recent-skewed dates
+        self.owner = rng.choice(users, size=orders, p=zipf_weights(users, order_skew, rng))
+        self.order_created = now_s - (span * rng.beta(1.0, 2.5, size=orders)).astype(np.int64)
+        self.lines = np.minimum(1 + rng.poisson(0.6, size=orders), 5)
+        self.line_start = np.concatenate(([0], np.cumsum(self.lines)))
+        total_lines = int(self.line_start[-1])
+        self.line_product = rng.choice(products, size=total_lines, p=zipf_weights(products, product_skew, rng))
+        self.quantity = np.minimum(rng.geometric(0.7, size=total_lines), 5)
+        age_days = (now_s - self.order_created) / 86400
+        self.status = np.select([age_days > 10, age_days > 5, age_days > 3, age_days > 1],
+                                [0, 1, 2, 3], default=4)
+        self.status[rng.random(orders) < 0.04] = 5
+        self.order_ids = object_ids("orders", self.order_created, seed)
+
+        # Reviews come from order lines that were delivered
+        delivered_lines = np.flatnonzero(np.repeat(self.status == 0, self.lines))
+        picked = rng.choice(delivered_lines, size=min(reviews, len(delivered_lines)), replace=False) \
+            if len(delivered_lines) else np.empty(0, dtype=np.int64)
+        line_order = np.repeat(np.arange(orders), self.lines)
+        self.review_user = self.owner[line_order[picked]]
+        self.review_product = self.line_product[picked]
+        self.rating = rng.choice(5, size=len(picked), p=RATING_WEIGHTS) + 1
+        self.review_created = self.order_created[line_order[picked]] + rng.integers(86400, 20 * 86400, size=len(picked))
+        self.review_created = np.minimum(self.review_created, now_s)
+        self.review_comment = rng.integers(2, size=len(picked))
+        self.approved = rng.random(len(picked)) < 0.9
+        self.review_ids = object_ids("reviews", self.review_created, seed)
+        self.counts["reviews"] = len(picked)
+
+        # Denormalised product counters, as the backend keeps them
+        self.total_orders = np.bincount(self.line_product, weights=self.quantity, minlength=products).astype(np.int64)
+        self.reviews_count = np.bincount(self.review_product, minlength=products)
+        rating_sum = np.bincount(self.review_product, weights=self.rating, minlength=products)
+        self.product_rating = np.round(np.divide(rating_sum, self.reviews_count, out=np.zeros(products),
+                                                 where=self.reviews_count > 0), 1)
+
+    @staticmethod
+    def _dates(seconds):
+        # Naive UTC datetimes, converted in one vectorised step
+        return seconds.astype("datetime64[s]").astype(object).tolist()
+
+    def _lookups(self):
+        """Per-product values as plain lists; indexing NumPy scalars one by one is far slower."""
+        if not hasattr(self, "_product_names"):
+            names = [f"{ADJECTIVES[a]} {MATERIALS[m]} {CATEGORIES[c][0]} {i}" for i, (a, m, c) in
+                     enumerate(zip(self.adjective.tolist(), self.material.tolist(), self.category.tolist()))]
+            self._product_names = names
+            self._product_prices = self.price.tolist()
+            self._product_mrps = self.mrp.tolist()
+        return self._product_names, self._product_prices, self._product_mrps
+
+    def _addresses(self, users):
+        users = users.tolist()
+        return [
+            {
+                "fullName": f"{FIRST_NAMES[first]} {LAST_NAMES[last]}",
+                "phone": str(phone),
+                "address": f"{u % 500 + 1}, {LOCALITIES[locality]}",
+                "locality": LOCALITIES[locality],
+                "city": CITIES[city][0],
+                "state": CITIES[city][1],
+                "pincode": f"{CITIES[city][2]}{pincode:03d}",
+                "type": "Home",
+            }
+            for u, first, last, phone, locality, city, pincode in zip(
+                users, self.first[users].tolist(), self.last[users].tolist(), self.phone[users].tolist(),
+                self.locality[users].tolist(), self.city[users].tolist(), self.pincode[users].tolist())
+        ]
+
+    def products(self, oid, date, start, stop):
+        names, prices, mrps = self._lookups()
+        batch = []
+        for i, category, stock, rating, reviews, orders, created in zip(
+                range(start, stop), self.category[start:stop].tolist(), self.stock[start:stop].tolist(),
+                self.product_rating[start:stop].tolist(), self.reviews_count[start:stop].tolist(),
+                self.total_orders[start:stop].tolist(), self._dates(self.product_created[start:stop])):
+            pid, created = self.product_ids[i], date(created)
+            category, gender = CATEGORIES[category][0], CATEGORIES[category][1]
+            image = IMAGE_URL.format(id=pid)
+            batch.append({
+                "_id": oid(pid),
+                "name": names[i],
+                "description": f"{names[i].rsplit(' ', 1)[0]}, picked from our {category} range.",
+                "price": prices[i],
+                "originalPrice": mrps[i],
+                "category": category,
+                "genderCategory": gender,
+                "countInStock": stock,
+                "image": image,
+                "images": [image],
+                "rating": rating,
+                "reviewsCount": reviews,
+                "totalOrders": orders,
+                "isActive": True,
+                "published": True,
+                "isDeleted": False,
+                "status": "approved",
+                "createdAt": created,
+                "updatedAt": created,
+            })
+        return batch
+
+    def users(self, oid, date, start, stop):
+        batch = []
+        for u, address, created in zip(range(start, stop), self._addresses(np.arange(start, stop)),
+                                       self._dates(self.user_created[start:stop])):
+            created = date(created)
+            batch.append({
+                "_id": oid(self.user_ids[u]),
+                "name": address["fullName"],
+                "email": f"{address['fullName'].replace(' ', '.')}.{u}.{self.seed}@example.com".lower(),
+                "phone": address["phone"],
+                "role": "user",
+                "status": "Active",
+                "cart": [],
+                "addresses": [address],
+                "createdAt": created,
+                "updatedAt": created,
+            })
+        return batch
+
+    def orders(self, oid, date, start, stop):
+        names, prices, mrps = self._lookups()
+        first, last = int(self.line_start[start]), int(self.line_start[stop])
+        line_products, quantities = self.line_product[first:last].tolist(), self.quantity[first:last].tolist()
+        bounds = (self.line_start[start:stop + 1] - first).tolist()
+        owners = self.owner[start:stop]
+        batch = []
+        for o, owner, address, status, created, lo, hi in zip(
+                range(start, stop), owners.tolist(), self._addresses(owners), self.status[start:stop].tolist(),
+                self._dates(self.order_created[start:stop]), bounds, bounds[1:]):
+            items, subtotal, gst, mrp = [], 0, 0.0, 0
+            for p, quantity in zip(line_products[lo:hi], quantities[lo:hi]):
+                unit = prices[p]
+                base = unit * quantity
+                tax = round(base * GST_RATE / 100, 2)
+                items.append({
+                    "productId": oid(self.product_ids[p]),
+                    "productName": names[p],
+                    "image": IMAGE_URL.format(id=self.product_ids[p]),
+                    "price": unit,
+                    "quantity": quantity,
+                    "unitPrice": unit,
+                    "baseAmount": base,
+                    "gstRate": GST_RATE,
+                    "cgst": tax / 2,
+                    "sgst": tax / 2,
+                    "totalGST": tax,
+                    "finalAmount": base + tax,
+                })
+                subtotal, gst, mrp = subtotal + base, gst + tax, mrp + mrps[p] * quantity
+            delivery = 0 if subtotal >= FREE_DELIVERY_ABOVE else DELIVERY_CHARGE
+            total = round(subtotal + gst + delivery, 2)
+            status, created = ORDER_STATUSES[status], date(created)
+            batch.append({
+                "_id": oid(self.order_ids[o]),
+                "user": oid(self.user_ids[owner]),
+                "products": items,
+                "shippingAddress": address,
+                "status": status,
+                "paymentMethod": "COD",
+                "paymentStatus": "PAID" if status == "Delivered" else "PENDING",
+                "itemsPrice": subtotal,
+                "subtotal": subtotal,
+                "tax": gst,
+                "totalGST": gst,
+                "cgst": gst / 2,
+                "sgst": gst / 2,
+                "deliveryCharges": delivery,
+                "mrp": mrp,
+                "total": total,
+                "finalAmount": total,
+                "grandTotal": total,
+                "statusHistory": [{"status": status, "timestamp": created, "note": "generated"}],
+                "createdAt": created,
+                "updatedAt": created,
+            })
+        return batch
+
+    def reviews(self, oid, date, start, stop):
+        batch = []
+        for r, user, product, rating, comment, approved, created in zip(
+                range(start, stop), self.review_user[start:stop].tolist(), self.review_product[start:stop].tolist(),
+                self.rating[start:stop].tolist(), self.review_comment[start:stop].tolist(),
+                self.approved[start:stop].tolist(), self._dates(self.review_created[start:stop])):
+            created = date(created)
+            batch.append({
+                "_id": oid(self.review_ids[r]),
+                "user": oid(self.user_ids[user]),
+                "product": oid(self.product_ids[product]),
+                "rating": rating,
+                "comment": REVIEW_COMMENTS[rating][comment],
+                "images": [],
+                "likes": [],
+                "dislikes": [],
+                "comments": [],
+                "isApproved": approved,
+                "createdAt": created,
+                "updatedAt": created,
+            })
+        return batch
+
+# Sinks. encode() runs in the worker that built the batch and does the expensive part (JSON
+# encoding, inserts, uploads); write() runs in the parent in batch order.
+
+class JsonlSink:
+    """MongoDB Extended JSON, one file per collection, ready for `mongoimport --file`."""
+
+    collections = COLLECTIONS
+    parallel = True
+
+    def __init__(self, directory=JSONL_DIR):
+        self.directory = directory
+        self.files = {}
+
+    @staticmethod
+    def oid(hex_id):
+        return {"$oid": hex_id}
+
+    @staticmethod
+    def date(value):
+        return {"$date": value.isoformat() + "Z"}
+
+    def encode(self, collection, batch):
+        return "".join(json.dumps(doc, separators=(",", ":")) + "\n" for doc in batch)
+
+    def write(self, collection, encoded):
+        if collection not in self.files:
+            os.makedirs(self.directory, exist_ok=True)
+            self.files[collection] = open(os.path.join(self.directory, f"{collection}.jsonl"), "w", encoding="utf-8")
+        self.files[collection].write(encoded)
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+
+class MongoSink:
+    """Unordered insert_many batches straight into the backend's database, one client per process."""
+
+    collections = COLLECTIONS
+    parallel = True
+
+    def __init__(self, uri, drop=False):
+        self.uri = uri
+        self.drop = drop
+        self._db = None
+
+    def __getstate__(self):
+        return {"uri": self.uri, "drop": False, "_db": None}
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = pymongo.MongoClient(self.uri).get_default_database()
+        return self._db
+
+    def prepare(self):
+        if self.drop:
+            for collection in COLLECTIONS:
+                self.db[collection].drop()
+
+    oid = staticmethod(lambda hex_id: ObjectId(hex_id))
+    date = staticmethod(lambda value: value)
+
+    def encode(self, collection, batch):
+        self.db[collection].insert_many(batch, ordered=False)
+
+    def write(self, collection, encoded):
+        pass
+
+    def close(self):
+        if self._db is not None:
+            self._db.client.close()
+
+
+class HttpSink:
+    """Products as they are, through POST /api/products; other collections have no create route to use."""
+
+    collections = ("products",)
+    parallel = False
+
+    oid = staticmethod(lambda hex_id: hex_id)
+    date = staticmethod(lambda value: value.isoformat() + "Z")
+
+    @staticmethod
+    def _create(product):
+        response = client.post("/api/products", json=product)
+        if response.status_code != 201:
+            raise RuntimeError(f"product import failed with {response.status_code}: {response.text[:200]}")
+
+    def encode(self, collection, batch):
+        with ThreadPoolExecutor(max_workers=HTTP_CONCURRENCY, thread_name_prefix="datagen-http") as pool:
+            list(pool.map(self._create, batch))
+
+    def write(self, collection, encoded):
+        pass
+
+    def close(self):
+        pass
+
+
+class NullSink:
+    """Build records only, to time the generator itself."""
+
+    collections = COLLECTIONS
+    parallel = True
+    oid = staticmethod(lambda hex_id: hex_id)
+    date = staticmethod(lambda value: value)
+
+    def encode(self, collection, batch):
+        pass
+
+    def write(self, collection, encoded):
+        pass
+
+    def close(self):
+        pass
+
+
+_job = None  # (dataset, sink) of this process
+
+
+def _init_worker(params, sink):
+    # Same parameters and seed, so every worker redraws exactly the parent's arrays
+    global _job
+    _job = (Dataset(**params), sink)
+
+
+def _build(task):
+    collection, start, stop = task
+    dataset, sink = _job
+    batch = getattr(dataset, collection)(sink.oid, sink.date, start, stop)
+    return stop - start, sink.encode(collection, batch)
+
+
+def generate(params, sink, batch_size=BATCH_SIZE, workers=1):
+    """Build every batch (in `workers` processes when the sink allows it) and hand them to the sink in order."""
+    report = {"counts": {}, "seconds": {}}
+    start = time.perf_counter()
+    _init_worker(params, sink)
+    report["plan_s"] = time.perf_counter() - start
+    dataset = _job[0]
+    pool = None
+    if workers > 1 and sink.parallel:
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"),
+                                   initializer=_init_worker, initargs=(params, sink))
+    try:
+        if hasattr(sink, "prepare"):
+            sink.prepare()
+        for collection in sink.collections:
+            start, count, total = time.perf_counter(), 0, dataset.counts[collection]
+            tasks = [(collection, offset, min(offset + batch_size, total)) for offset in range(0, total, batch_size)]
+            for built, encoded in (pool.map(_build, tasks) if pool else map(_build, tasks)):
+                sink.write(collection, encoded)
+                count += built
+            report["counts"][collection] = count
+            report["seconds"][collection] = time.perf_counter() - start
+    finally:
+        if pool:
+            pool.shutdown()
+        sink.close()
+    return report
+
+
+def print_report(report):
+    print(f"arrays drawn in {report['plan_s']:.2f}s (seed {report['seed']}, sink {report['sink']}, "
+          f"{report['workers']} workers)")
+    print(f"{'collection':<12}{'records':>11}{'seconds':>10}{'records/s':>12}")
+    for collection, count in report["counts"].items():
+        seconds = report["seconds"][collection]
+        print(f"{collection:<12}{count:>11}{seconds:>10.2f}{count / seconds if seconds else 0:>12.0f}")
+
+
+def count(value):
+    return int(float(value))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate production-sized products, users, orders and reviews.")
+    parser.add_argument("--products", type=count, default=10000, help="e.g. 1e6")
+    parser.add_argument("--users", type=count, default=5000)
+    parser.add_argument("--orders", type=count, default=20000)
+    parser.add_argument("--reviews", type=count, default=5000, help="at most one per delivered order line")
+    parser.add_argument("--category-skew", type=float, default=1.1, help="Zipf exponent over categories; 0 = uniform")
+    parser.add_argument("--product-skew", type=float, default=1.0, help="Zipf exponent of product popularity in orders")
+    parser.add_argument("--order-skew", type=float, default=1.2, help="power-law exponent of orders per user")
+    parser.add_argument("--days", type=int, default=365, help="order history window")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sink", choices=("jsonl", "mongo", "http", "none"), default="jsonl",
+                        help="http: products only, one POST /api/products each; use mongo for large catalogs")
+    parser.add_argument("--out", default=JSONL_DIR, help="directory for the jsonl sink")
+    parser.add_argument("--mongo-uri", default=os.getenv("MONGO_URI"), help="database URI for the mongo sink")
+    parser.add_argument("--drop", action="store_true", help="mongo sink: drop the four collections first")
+    parser.add_argument("-b", "--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="processes building batches (the http sink always uses one)")
+    parser.add_argument("-o", "--output", default=REPORT_PATH)
+    parser.add_argument("--stub", action="store_true", help="http sink: import into the in-process stub backend")
+    args = parser.parse_args(argv)
+
+    if np is None:
+        parser.error("the dataset generator needs NumPy: pip install numpy")
+    if args.sink == "mongo":
+        if pymongo is None:
+            parser.error("the mongo sink needs pymongo: pip install pymongo")
+        if not args.mongo_uri:
+            parser.error("--mongo-uri (or MONGO_URI) is required for the mongo sink")
+    if args.stub:
+        from stub_server import StubServer
+
+        client.BASE_URL = StubServer().start_in_thread().url
+
+    params = {
+        "products": args.products, "users": args.users, "orders": args.orders, "reviews": args.reviews,
+        "seed": args.seed, "category_skew": args.category_skew, "product_skew": args.product_skew,
+        "order_skew": args.order_skew, "days": args.days, "now": int(time.time()),
+    }
+    sink = {
+        "jsonl": lambda: JsonlSink(args.out),
+        "mongo": lambda: MongoSink(args.mongo_uri, args.drop),
+        "http": HttpSink,
+        "none": NullSink,
+    }[args.sink]()
+    report = generate(params, sink, args.batch_size, args.workers)
+    report.update({"seed": args.seed, "sink": args.sink, "workers": args.workers, "params": params})
+    print_report(report)
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
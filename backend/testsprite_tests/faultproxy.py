@@ -0,0 +1,348 @@
+import argparse
+import asyncio
+import fnmatch
+import json
+import random
+import socket
+import struct
+import sys
+from collections import defaultdict, namedtuple
+from urllib.parse import urlsplit
+
+import client
+import latency
+from stub_server import LoopThread
+
+# Requests carry their case title in this header (see client.TAG_HEADER) so rules can target
+# one case while others run concurrently; the proxy strips it before forwarding
+CASE_HEADER = "x-testsprite-case"
+CONTROL_PATH = "/__faults"
+MAX_HEAD_BYTES = 64 * 1024
+CHUNK_SIZE = 16 * 1024
+# How much of the body a "partial" response delivers before the connection drops
+PARTIAL_FRACTION = 0.5
+PARTIAL_UNKNOWN_BYTES = 1024
+NO_BODY_STATUSES = {204, 304}
+FAULTS = ("delayed", "throttled", "errors", "resets", "partial")
+
+Rule = namedtuple(
+    "Rule",
+    ["match", "case", "latency", "jitter", "bandwidth", "reset", "partial", "error", "error_status"],
+    defaults=("*", None, 0.0, 0.0, None, 0.0, 0.0, 0.0, 503),
+)
+Rule.__doc__ = """One fault profile; the first rule whose patterns match a request applies.
+
+match: glob over "METHOD /path", e.g. "POST /api/order/*" or "* /products/*"
+case: glob over the case title, e.g. "TC002-*" (None matches requests from any case or none)
+latency, jitter: seconds added before the request goes upstream, latency + uniform(0, jitter)
+bandwidth: bytes/s each way for bodies, like a slow mobile link
+reset: probability of an RST to the client after the backend has handled the request
+partial: probability of sending the headers and only part of the body before disconnecting
+error: probability of answering error_status without reaching the backend (503 is retried)
+"""
+
+
+def parse_rules(entries, case=None):
+    """Rules from JSON-style dicts; `case` pins rules that do not name one (plan entries)."""
+    rules = []
+    for entry in entries:
+        try:
+            rule = Rule(**entry)
+        except TypeError as e:
+            raise ValueError(f"bad fault rule {entry!r}: {e}") from None
+        rules.append(rule._replace(case=rule.case or case))
+    return rules
+
+
+def load_rules(path):
+    with open(path, encoding="utf-8") as f:
+        return parse_rules(json.load(f))
+
+
+class _Cut(Exception):
+    """The partial-response budget ran out."""
+
+
+class _Link:
+    """Writes to one side of the proxy, throttled to `bandwidth` bytes/s and cut after `budget` bytes."""
+
+    def __init__(self, writer, bandwidth=None, budget=None):
+        self.writer = writer
+        self.bandwidth = bandwidth
+        self.budget = budget
+
+    async def send(self, data):
+        cut = self.budget is not None and len(data) >= self.budget
+        if cut:
+            data = data[:self.budget]
+        elif self.budget is not None:
+            self.budget -= len(data)
+        for start in range(0, len(data), CHUNK_SIZE if self.bandwidth else len(data) or 1):
+            piece = data[start:start + CHUNK_SIZE] if self.bandwidth else data
+            self.writer.write(piece)
+            await self.writer.drain()
+            if self.bandwidth:
+                await asyncio.sleep(len(piece) / self.bandwidth)
+        if cut:
+            raise _Cut()
+
+
+class _Discard:
+    async def send(self, data):
+        pass
+
+
+async def read_head(reader):
+    """(start line parts, [(name, value)]) of the next message, or None at EOF."""
+    try:
+        raw = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError:
+        return None
+    lines = raw.decode("latin-1").split("\r\n")[:-2]
+    headers = []
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers.append((name.strip(), value.strip()))
+    return lines[0].split(" ", 2), headers
+
+
+def _header(headers, name):
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _render_head(start, headers):
+    lines = [" ".join(start)] + [f"{name}: {value}" for name, value in headers]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+def _json_response(version, status, reason, payload):
+    data = json.dumps(payload).encode()
+    headers = [("Content-Type", "application/json"), ("Content-Length", len(data))]
+    return _render_head([version, str(status), reason], headers) + data
+
+
+async def relay_body(reader, link, headers, until_eof=False):
+    """Copy one message body (Content-Length, chunked or, for responses, up to EOF) to `link`."""
+    if (_header(headers, "transfer-encoding") or "").lower().endswith("chunked"):
+        while True:
+            size_line = await reader.readuntil(b"\r\n")
+            size = int(size_line.split(b";")[0], 16)
+            await link.send(size_line + (await reader.readexactly(size + 2) if size else b""))
+            if not size:
+                break
+        while True:  # trailers, ending with an empty line
+            line = await reader.readuntil(b"\r\n")
+            await link.send(line)
+            if line == b"\r\n":
+                return
+    length = _header(headers, "content-length")
+    if length is not None:
+        remaining = int(length)
+        while remaining:
+            data = await reader.read(min(CHUNK_SIZE, remaining))
+            if not data:
+                raise asyncio.IncompleteReadError(b"", remaining)
+            remaining -= len(data)
+            await link.send(data)
+    elif until_eof:
+        while data := await reader.read(CHUNK_SIZE):
+            await link.send(data)
+
+
+def _reset(writer):
+    # SO_LINGER 0 makes close() send an RST instead of a FIN, like a dropped mobile connection
+    sock = writer.get_extra_info("socket")
+    if sock is not None:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+    writer.transport.abort()
+
+
+class FaultProxy(LoopThread):
+    """HTTP/1.1 proxy in front of one upstream that degrades traffic according to rules.
+
+    Each client connection gets its own upstream connection, so keep-alive and connection
+    counts behave as they would without the proxy. Rules can be swapped while running, from
+    Python (`proxy.rules = ...`) or over HTTP with PUT /__faults (GET shows rules and stats).
+    """
+
+    thread_name = "fault-proxy"
+
+    def __init__(self, upstream, rules=(), host="127.0.0.1", port=0, seed=None):
+        parts = urlsplit(upstream)
+        if parts.scheme != "http":
+            raise ValueError(f"only http:// upstreams can be proxied, not {upstream!r}")
+        self.upstream = parts.hostname, parts.port or 80
+        self.rules = list(rules)
+        self.host = host
+        self.port = port
+        self.rng = random.Random(seed)
+        self.stats = defaultdict(lambda: dict.fromkeys(("requests", "forwarded") + FAULTS, 0))
+        self.server = None
+        self._loop = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def rule_for(self, method, path, case):
+        request = f"{method} {path}"
+        for rule in self.rules:
+            if not fnmatch.fnmatchcase(request, rule.match):
+                continue
+            if rule.case is None or fnmatch.fnmatchcase(case or "", rule.case):
+                return rule
+        return Rule()
+
+    def _roll(self, probability):
+        return probability > 0 and self.rng.random() < probability
+
+    def report(self):
+        return {
+            "rules": [rule._asdict() for rule in self.rules],
+            "stats": {route: dict(row) for route, row in sorted(self.stats.items())},
+        }
+
+    async def _control(self, method, reader, headers, writer):
+        body = await reader.readexactly(int(_header(headers, "content-length") or 0))
+        status, payload = 200, None
+        if method == "PUT":
+            try:
+                self.rules = parse_rules(json.loads(body or b"[]"))
+            except ValueError as e:
+                status, payload = 400, {"message": str(e)}
+        elif method != "GET":
+            status, payload = 405, {"message": "GET or PUT"}
+        writer.write(_json_response("HTTP/1.1", status, "OK" if status == 200 else "Error", payload or self.report()))
+        await writer.drain()
+
+    async def handle(self, reader, writer):
+        upstream = None
+        try:
+            while True:
+                head = await read_head(reader)
+                if head is None:
+                    return
+                (method, target, version), headers = head
+                path = urlsplit(target).path
+                if path == CONTROL_PATH:
+                    await self._control(method, reader, headers, writer)
+                    continue
+                case = _header(headers, CASE_HEADER)
+                headers = [(name, value) for name, value in headers if name.lower() != CASE_HEADER]
+                rule = self.rule_for(method, path, case)
+                stats = self.stats[latency.route_template(method, path)]
+                stats["requests"] += 1
+                if rule.latency or rule.jitter:
+                    stats["delayed"] += 1
+                    await asyncio.sleep(rule.latency + self.rng.uniform(0, rule.jitter))
+                if rule.bandwidth:
+                    stats["throttled"] += 1
+                if self._roll(rule.error):
+                    stats["errors"] += 1
+                    await relay_body(reader, _Discard(), headers)
+                    writer.write(_json_response(version, rule.error_status, "Injected", {"message": "injected by faultproxy"}))
+                    await writer.drain()
+                    continue
+                if upstream is None:
+                    upstream = await asyncio.open_connection(*self.upstream, limit=MAX_HEAD_BYTES)
+                up_reader, up_writer = upstream
+                up_link = _Link(up_writer, rule.bandwidth)
+                await up_link.send(_render_head([method, target, version], headers))
+                await relay_body(reader, up_link, headers)
+                stats["forwarded"] += 1
+
+                response = await read_head(up_reader)
+                if response is None:
+                    _reset(writer)
+                    return
+                start, response_headers = response
+                if self._roll(rule.reset):
+                    stats["resets"] += 1
+                    _reset(writer)
+                    return
+                budget = None
+                if self._roll(rule.partial):
+                    stats["partial"] += 1
+                    length = _header(response_headers, "content-length")
+                    budget = int(int(length) * PARTIAL_FRACTION) if length else PARTIAL_UNKNOWN_BYTES
+                link = _Link(writer, rule.bandwidth)
+                await link.send(_render_head(start, response_headers))
+                link.budget = budget
+                closing = (_header(response_headers, "connection") or "").lower() == "close"
+                has_body = method != "HEAD" and int(start[1]) not in NO_BODY_STATUSES and not start[1].startswith("1")
+                if has_body:
+                    await relay_body(up_reader, link, response_headers, until_eof=True)
+                    # Without Content-Length or chunking the body ran to EOF, so the upstream is gone
+                    unframed = not any(_header(response_headers, name) for name in ("content-length", "transfer-encoding"))
+                    closing = closing or unframed
+                if budget is not None:
+                    # The body was shorter than the cut; drop the connection anyway
+                    raise _Cut()
+                if closing or (_header(headers, "connection") or "").lower() == "close":
+                    return
+        except _Cut:
+            _reset(writer)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError, OSError):
+            pass
+        finally:
+            if upstream is not None:
+                upstream[1].close()
+            writer.close()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, self.host, self.port, limit=MAX_HEAD_BYTES, backlog=1024)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+def install(rules, seed=None):
+    """Put a proxy in front of client.BASE_URL in this process and route the client through it."""
+    proxy = FaultProxy(client.BASE_URL, rules, seed=seed).start_in_thread()
+    client.BASE_URL = proxy.url
+    client.TAG_HEADER = CASE_HEADER
+    return proxy
+
+
+def print_report(report):
+    print(f"{'route':<44}{'requests':>9}{'upstream':>9}" + "".join(f"{fault:>10}" for fault in FAULTS))
+    for route, row in report["stats"].items():
+        counts = "".join(f"{row[fault]:>10}" for fault in FAULTS)
+        print(f"{route[:43]:<44}{row['requests']:>9}{row['forwarded']:>9}{counts}")
+
+
+async def _serve_forever(proxy):
+    await proxy.start()
+    print(f"Fault proxy on {proxy.url} -> http://{proxy.upstream[0]}:{proxy.upstream[1]} ({len(proxy.rules)} rules)")
+    async with proxy.server:
+        await proxy.server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP proxy that injects latency, throttling, resets and errors.")
+    parser.add_argument("--upstream", default=client.BASE_URL)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5050)
+    parser.add_argument("--rules", help="JSON list of rules, e.g. [{\"match\": \"GET /products/*\", \"latency\": 0.3}]")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+    try:
+        proxy = FaultProxy(args.upstream, load_rules(args.rules) if args.rules else (), args.host, args.port, args.seed)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    try:
+        asyncio.run(_serve_forever(proxy))
+    except KeyboardInterrupt:
+        print_report(proxy.report())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+import argparse
+import json
+import os
+import re
+import resource
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from xml.etree.ElementTree import ParseError, XMLPullParser
+
+import client
+from fixtures import product_id
+
+REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tmp", "feed_report.json")
+CHUNK_SIZE = 64 * 1024
+SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+IMAGE_NS = "{http://www.google.com/schemas/sitemap-image/1.1}"
+GOOGLE_NS = "{http://base.google.com/ns/1.0}"
+# sitemaps.org protocol: at most 50,000 URLs and 50 MB uncompressed per sitemap file
+SITEMAP_MAX_URLS = 50000
+SITEMAP_MAX_BYTES = 50 * 1024 * 1024
+CHANGEFREQ = {"always", "hourly", "daily", "weekly", "monthly", "yearly", "never"}
+AVAILABILITY = {"in_stock", "out_of_stock", "preorder", "backorder"}
+CONDITION = {"new", "refurbished", "used"}
+PRICE_RE = re.compile(r"^\d+(\.\d+)? [A-Z]{3}$")
+MAX_ERROR_SAMPLES = 20
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+PRODUCTS = "/api/products"
+# The backend creates products one at a time, so seeding keeps this many creates in flight
+SEED_CONCURRENCY = 16
+
+
+def _absolute(url):
+    return bool(url) and url.startswith(("http://", "https://")) and len(url) <= 2048
+
+
+def _text(element, tag):
+    child = element.find(tag)
+    return (child.text or "").strip() if child is not None else ""
+
+
+def check_sitemap_url(url):
+    errors = []
+    if not _absolute(_text(url, f"{SITEMAP_NS}loc")):
+        errors.append("loc missing or not an absolute URL")
+    lastmod = _text(url, f"{SITEMAP_NS}lastmod")
+    if lastmod:
+        try:
+            datetime.fromisoformat(lastmod.replace("Z", "+00:00"))
+        except ValueError:
+            errors.append(f"lastmod {lastmod!r} is not W3C datetime")
+    changefreq = _text(url, f"{SITEMAP_NS}changefreq")
+    if changefreq and changefreq not in CHANGEFREQ:
+        errors.append(f"changefreq {changefreq!r} not allowed")
+    priority = _text(url, f"{SITEMAP_NS}priority")
+    if priority:
+        try:
+            if not 0.0 <= float(priority) <= 1.0:
+                errors.append(f"priority {priority} outside 0.0-1.0")
+        except ValueError:
+            errors.append(f"priority {priority!r} is not a number")
+    return errors
+
+
+def check_image_url(url):
+    errors = []
+    if not _absolute(_text(url, f"{SITEMAP_NS}loc")):
+        errors.append("loc missing or not an absolute URL")
+    images = url.findall(f"{IMAGE_NS}image")
+    if not images:
+        errors.append("url without image:image")
+    if len(images) > 1000:
+        errors.append(f"{len(images)} images exceed 1000 per page")
+    for image in images:
+        if not _absolute(_text(image, f"{IMAGE_NS}loc")):
+            errors.append("image:loc missing or not an absolute URL")
+    return errors
+
+
+def check_feed_item(item):
+    errors = []
+    for field in ("id", "title", "description"):
+        if not _text(item, f"{GOOGLE_NS}{field}"):
+            errors.append(f"g:{field} missing")
+    for field in ("link", "image_link"):
+        if not _absolute(_text(item, f"{GOOGLE_NS}{field}")):
+            errors.append(f"g:{field} missing or not an absolute URL")
+    if _text(item, f"{GOOGLE_NS}availability") not in AVAILABILITY:
+        errors.append("g:availability not one of " + ", ".join(sorted(AVAILABILITY)))
+    if _text(item, f"{GOOGLE_NS}condition") not in CONDITION:
+        errors.append("g:condition not one of " + ", ".join(sorted(CONDITION)))
+    price = _text(item, f"{GOOGLE_NS}price")
+    if not PRICE_RE.match(price):
+        errors.append(f"g:price {price!r} is not '<amount> <ISO 4217 currency>'")
+    return errors
+
+
+# path -> (record tag, validator, whether sitemap protocol limits apply)
+FEEDS = {
+    "/sitemap.xml": (f"{SITEMAP_NS}url", check_sitemap_url, True),
+    "/image-sitemap.xml": (f"{SITEMAP_NS}url", check_image_url, True),
+    "/product-feed.xml": ("item", check_feed_item, False),
+}
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def validate_feed(path, chunk_size=CHUNK_SIZE):
+    """Stream one feed through an incremental parser, validating each record as it completes.
+
+    Finished records are detached from their parent straight away, so memory stays flat
+    however large the feed is. Returns a dict of timings, counts and sample errors.
+    """
+    tag, check, sitemap_limits = FEEDS[path]
+    parser = XMLPullParser(events=("start", "end"))
+    stack, records, invalid, size, samples = [], 0, 0, 0, []
+    ttfb = first_chunk = None
+    start = time.perf_counter()
+    response = client.get(path, stream=True)
+    headers_at = time.perf_counter()
+    try:
+        if response.status_code != 200:
+            return {"path": path, "status": response.status_code, "ttfb_ms": (headers_at - start) * 1e3,
+                    "errors": [f"HTTP {response.status_code}"]}
+        for chunk in response.iter_content(chunk_size):
+            if first_chunk is None:
+                first_chunk = time.perf_counter()
+                ttfb = first_chunk - start
+            size += len(chunk)
+            parser.feed(chunk)
+            for event, element in parser.read_events():
+                if event == "start":
+                    stack.append(element)
+                    continue
+                stack.pop()
+                if element.tag != tag:
+                    continue
+                records += 1
+                errors = check(element)
+                if errors:
+                    invalid += 1
+                    if len(samples) < MAX_ERROR_SAMPLES:
+                        samples.append(f"record {records}: {'; '.join(errors)}")
+                if stack:
+                    stack[-1].remove(element)
+        parser.close()
+    except ParseError as e:
+        samples.append(f"XML not well-formed: {e}")
+    finally:
+        response.close()
+    end = time.perf_counter()
+    transfer = end - (first_chunk or headers_at)
+    if sitemap_limits and records > SITEMAP_MAX_URLS:
+        samples.append(f"{records} URLs exceed the {SITEMAP_MAX_URLS} per-sitemap limit; split into a sitemap index")
+    if sitemap_limits and size > SITEMAP_MAX_BYTES:
+        samples.append(f"{size} bytes exceed the {SITEMAP_MAX_BYTES} byte per-sitemap limit")
+    return {
+        "path": path,
+        "status": response.status_code,
+        "content_type": response.headers.get("Content-Type"),
+        "ttfb_ms": (ttfb if ttfb is not None else headers_at - start) * 1e3,
+        "transfer_ms": transfer * 1e3,
+        "total_ms": (end - start) * 1e3,
+        "bytes": size,
+        "bytes_per_s": size / transfer if transfer else None,
+        "records": records,
+        "invalid": invalid,
+        "errors": samples,
+        "client_peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def catalog_size():
+    response = client.get(f"{PRODUCTS}/catalog/summary")
+    if response.status_code != 200:
+        return None
+    return response.json().get("totalProducts")
+
+
+def feed_product(n):
+    """A Product document (models/Product.js fields) that every feed lists."""
+    image = f"https://cdn.example.com/feed/{n}.jpg"
+    return {
+        "name": f"Feed Product {n}",
+        "description": f"Synthetic product {n} for feed scaling runs & <escaping> checks.",
+        "price": 100 + n % 900,
+        "category": f"Feed Category {n % 20}",
+        "countInStock": n % 7,
+        "image": image,
+        "images": [image, f"/uploads/feed/{n}-side.jpg"],
+        "isActive": True,
+        "published": True,
+    }
+
+
+def _create_one(payload, headers=None):
+    response = client.post(PRODUCTS, json=payload, headers=headers)
+    if response.status_code != 201:
+        raise RuntimeError(f"seeding failed with {response.status_code}: {response.text[:200]}")
+    return product_id(response.json())
+
+
+def seed_products(count, start=0, token=None):
+    """Create products start..start+count through POST /api/products and return their ids.
+
+    The backend has no bulk create, so this is SEED_CONCURRENCY single creates at a time; for
+    catalogs in the millions, load datagen.py's mongo sink first and run with --no-seed.
+    """
+    headers = {"Authorization": f"Bearer {token}"} if token else None
+    with ThreadPoolExecutor(max_workers=SEED_CONCURRENCY, thread_name_prefix="feed-seed") as pool:
+        return list(pool.map(lambda n: _create_one(feed_product(n), headers), range(start, start + count)))
+
+
+def delete_products(ids, token=None):
+    headers = {"Authorization": f"Bearer {token}"} if token else None
+    with ThreadPoolExecutor(max_workers=SEED_CONCURRENCY, thread_name_prefix="feed-seed") as pool:
+        list(pool.map(lambda pid: client.delete(f"{PRODUCTS}/{pid}", headers=headers), ids))
+
+
+def run_benchmark(sizes, seed=True, token=None):
+    runs = []
+    for target in sizes:
+        current = catalog_size()
+        if seed and current is not None and current < target:
+            seed_products(target - current, current, token)
+            current = catalog_size()
+        runs.append({"catalog_size": current, "target": target, "feeds": [validate_feed(path) for path in FEEDS]})
+    return {"chunk_size": CHUNK_SIZE, "runs": runs}
+
+
+def print_report(report):
+    print(f"{'products':>9}  {'feed':<20}{'status':>7}{'ttfb ms':>10}{'xfer ms':>10}{'MB':>8}{'MB/s':>8}"
+          f"{'records':>9}{'invalid':>9}")
+    for run in report["runs"]:
+        for feed in run["feeds"]:
+            rate = feed.get("bytes_per_s")
+            print(f"{run['catalog_size'] or 0:>9}  {feed['path']:<20}{feed['status']:>7}{feed['ttfb_ms']:>10.1f}"
+                  f"{feed.get('transfer_ms', 0):>10.1f}{feed.get('bytes', 0) / 2**20:>8.1f}"
+                  f"{(rate or 0) / 2**20:>8.1f}{feed.get('records', 0):>9}{feed.get('invalid', 0):>9}")
+            for error in feed["errors"][:3]:
+                print(f"{'':>11}{error}")
+
+
+def parse_sizes(value):
+    return tuple(int(float(size)) for size in value.split(",") if size.strip())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream and validate the SEO feeds as the catalog grows.")
+    parser.add_argument("-s", "--sizes", type=parse_sizes, default=DEFAULT_SIZES, help="catalog sizes, e.g. 1e3,1e4")
+    parser.add_argument("--no-seed", action="store_true", help="measure the catalog as it is at each step")
+    parser.add_argument("--token", default=os.getenv("TESTSPRITE_TOKEN"), help="bearer token sent with the seeding creates")
+    parser.add_argument("-o", "--output", default=REPORT_PATH)
+    parser.add_argument("--stub", action="store_true", help="run against the in-process stub backend")
+    args = parser.parse_args(argv)
+
+    if args.stub:
+        from stub_server import StubServer
+
+        client.BASE_URL = StubServer().start_in_thread().url
+
+    report = run_benchmark(args.sizes, seed=not args.no_seed, token=args.token)
+    print_report(report)
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return 1 if any(feed["errors"] for run in report["runs"] for feed in run["feeds"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+import atexit
+import itertools
+import os
+import threading
+
+import client
+
+SEED_SIZE = int(os.getenv("TESTSPRITE_FIXTURE_PRODUCTS", "32"))
+SHARED_PRODUCTS = 4
+BULK_CREATE_PATH = "/products/bulk"
+BULK_DELETE_PATH = "/products/bulk-delete"
+# Backends without the bulk routes answer these; we then fall back to one request per product
+BULK_UNSUPPORTED = (404, 405, 501)
+FIXTURE_TAG = "fixtures"
+
+
+def product_id(body):
+    # The backend wraps created/updated products as {"data": {"product": {...}}}
+    if not isinstance(body, dict):
+        return None
+    data = body.get("data")
+    product = data.get("product", body) if isinstance(data, dict) else body
+    return product.get("_id") or product.get("id")
+
+
+def product_payload(n):
+    return {
+        "name": f"Fixture Product {n}",
+        "description": "A product seeded once per test session.",
+        "price": 19.99,
+        "images": [{"url": f"http://example.com/fixture-{n}.jpg", "altText": f"Fixture Image {n}"}],
+        "category": "Test Category",
+        "stock": 10,
+    }
+
+
+class ProductPool:
+    """Products seeded in bulk once per process and handed out to cases.
+
+    Read-only cases share a few products; cases that mutate a product claim one exclusively.
+    Everything is deleted in one bulk call by teardown(), which also runs at interpreter exit.
+    """
+
+    def __init__(self, seed_size=SEED_SIZE):
+        self.seed_size = seed_size
+        self._lock = threading.Lock()
+        self._serial = itertools.count(1)
+        self._shared = []
+        self._shared_cycle = None
+        self._free = []
+        self._created = []
+        self._bulk = None
+        self._registered = False
+
+    def _create_one(self, payload):
+        response = client.post("/products", json=payload)
+        assert response.status_code == 201, f"Fixture product creation failed: {response.status_code} {response.text}"
+        return dict(payload, _id=product_id(response.json()))
+
+    def _seed(self, count):
+        # Seeding is shared setup, so keep it out of whichever case happened to trigger it
+        token = client.current_tag.set(FIXTURE_TAG)
+        try:
+            products = self._create(count)
+        finally:
+            client.current_tag.reset(token)
+        self._created.extend(product["_id"] for product in products)
+        if not self._registered:
+            atexit.register(self.teardown)
+            self._registered = True
+        return products
+
+    def _create(self, count):
+        payloads = [product_payload(next(self._serial)) for _ in range(count)]
+        products = None
+        if self._bulk is not False:
+            response = client.post(BULK_CREATE_PATH, json={"products": payloads})
+            if response.status_code in BULK_UNSUPPORTED:
+                self._bulk = False
+            else:
+                assert response.status_code in (200, 201), f"Bulk fixture seeding failed: {response.status_code} {response.text}"
+                self._bulk = True
+                products = [dict(payload, _id=product_id(created)) for payload, created in zip(payloads, response.json()["products"])]
+        if products is None:
+            products = [self._create_one(payload) for payload in payloads]
+        return products
+
+    def shared(self):
+        """A product for read-only checks; several cases may receive the same one."""
+        with self._lock:
+            if self._shared_cycle is None:
+                seeded = self._seed(self.seed_size)
+                self._shared, self._free = seeded[:SHARED_PRODUCTS], seeded[SHARED_PRODUCTS:]
+                self._shared_cycle = itertools.cycle(self._shared)
+            return dict(next(self._shared_cycle))
+
+    def claim(self):
+        """A product no other case will touch; the caller may update it freely."""
+        with self._lock:
+            if not self._free:
+                self._free = self._seed(self.seed_size)
+            return dict(self._free.pop())
+
+    def teardown(self):
+        """Delete every seeded product. Returns the ids that could not be deleted."""
+        with self._lock:
+            ids, self._created = self._created, []
+            self._shared, self._free, self._shared_cycle = [], [], None
+        if not ids:
+            return []
+        token = client.current_tag.set(FIXTURE_TAG)
+        try:
+            if self._bulk:
+                response = client.post(BULK_DELETE_PATH, json={"ids": ids})
+                if response.status_code in (200, 204):
+                    return []
+            return [pid for pid in ids if client.delete(f"/products/{pid}").status_code not in (200, 204, 404)]
+        except Exception:
+            return ids
+        finally:
+            client.current_tag.reset(token)
+
+
+products = ProductPool()
@@ -0,0 +1,284 @@
+import argparse
+import json
+import math
+import os
+import sqlite3
+import subprocess
+import sys
+from contextlib import closing
+from datetime import datetime, timezone
+
+import latency
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.getenv("TESTSPRITE_HISTORY", os.path.join(HERE, "tmp", "history.sqlite"))
+REPORT_PATH = os.path.join(HERE, "tmp", "history_compare.json")
+# A route regresses when the later run is slower with p < ALPHA *and* its median moved by at
+# least MIN_CHANGE; with thousands of samples tiny shifts are "significant" but not interesting
+ALPHA = 0.01
+MIN_CHANGE = 0.10
+MIN_SAMPLES = 8
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started TEXT NOT NULL,
+    git_rev TEXT,
+    git_dirty INTEGER,
+    target TEXT,
+    config TEXT
+);
+CREATE TABLE IF NOT EXISTS cases (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    test_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    status TEXT NOT NULL,
+    cached INTEGER NOT NULL,
+    PRIMARY KEY (run_id, test_id)
+);
+CREATE TABLE IF NOT EXISTS latency (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    test_id TEXT NOT NULL,
+    route TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    histogram TEXT NOT NULL,
+    PRIMARY KEY (run_id, route, phase, test_id)
+);
+"""
+
+
+def connect(path=DB_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    db = sqlite3.connect(path)
+    db.executescript(SCHEMA)
+    return db
+
+
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], cwd=HERE, capture_output=True, text=True, timeout=10,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def git_state():
+    """(HEAD commit, whether the tree has uncommitted changes), or (None, None) outside a checkout."""
+    rev = _git("rev-parse", "HEAD")
+    return rev, (None if rev is None else bool(_git("status", "--porcelain", "--untracked-files=no")))
+
+
+def record_run(results, target=None, config=None, path=DB_PATH):
+    """Append one run's case statuses and latency histograms; returns the new run id.
+
+    Results reused from the incremental cache are recorded by status only, so their old
+    timings are not counted a second time.
+    """
+    rev, dirty = git_state()
+    with closing(connect(path)) as db, db:
+        run_id = db.execute(
+            "INSERT INTO runs (started, git_rev, git_dirty, target, config) VALUES (?, ?, ?, ?, ?)",
+            (datetime.now(timezone.utc).isoformat(timespec="seconds"), rev, dirty, target,
+             json.dumps(config or {}, sort_keys=True)),
+        ).lastrowid
+        for result in results:
+            cached = "cache" in result
+            db.execute("INSERT OR REPLACE INTO cases VALUES (?, ?, ?, ?, ?)",
+                       (run_id, result["testId"], result["title"], result["testStatus"], cached))
+            if cached:
+                continue
+            db.executemany(
+                "INSERT OR REPLACE INTO latency VALUES (?, ?, ?, ?, ?)",
+                [(run_id, result["testId"], route, phase, json.dumps(histogram))
+                 for route, phases in result.get("latency", {}).items()
+                 for phase, histogram in phases.items() if histogram.get("count")],
+            )
+    return run_id
+
+
+def resolve(db, spec, target=None):
+    """Run ids for a spec: a run id, "last" / "last~N", or a git revision (all runs recorded at it).
+
+    With `target`, only runs against that target ("stub" or a base URL) are considered.
+    """
+    where, args = ("target = ?", (target,)) if target else ("1", ())
+    if spec.isdigit():
+        rows = db.execute(f"SELECT id FROM runs WHERE id = ? AND {where}", (int(spec), *args)).fetchall()
+    elif spec == "last" or spec.startswith("last~"):
+        back = int(spec.partition("~")[2] or 0)
+        rows = db.execute(f"SELECT id FROM runs WHERE {where} ORDER BY id DESC LIMIT 1 OFFSET ?",
+                          (*args, back)).fetchall()
+    else:
+        rev = _git("rev-parse", "--verify", "--quiet", spec + "^{commit}")
+        if rev is None:
+            raise ValueError(f"{spec!r} is neither a run id, last~N, nor a git revision")
+        rows = db.execute(f"SELECT id FROM runs WHERE git_rev = ? AND {where} ORDER BY id", (rev, *args)).fetchall()
+    if not rows:
+        raise ValueError(f"no recorded runs match {spec!r}" + (f" against {target}" if target else ""))
+    return [row[0] for row in rows]
+
+
+def environments(db, run_ids):
+    """{(target, injected faults): [run id]}; latency is only comparable within one of them."""
+    marks = ",".join("?" * len(run_ids))
+    found = {}
+    for run_id, target, config in db.execute(f"SELECT id, target, config FROM runs WHERE id IN ({marks})", run_ids):
+        faults = json.loads(config or "{}").get("faults")
+        found.setdefault((target, json.dumps(faults, sort_keys=True)), []).append(run_id)
+    return found
+
+
+def check_comparable(db, before_ids, after_ids):
+    """Raise ValueError unless every run on both sides hit the same target with the same faults."""
+    found = environments(db, before_ids + after_ids)
+    if len(found) > 1:
+        described = "; ".join(f"runs {ids} against {target} with faults {faults}"
+                              for (target, faults), ids in found.items())
+        raise ValueError(f"runs differ in target or injected faults ({described}); narrow them with --target "
+                         "or compare run ids")
+
+
+def load_routes(db, run_ids, phase="total"):
+    """{route: Histogram} merged over every case (and every run) in `run_ids`."""
+    marks = ",".join("?" * len(run_ids))
+    routes = {}
+    for route, data in db.execute(
+        f"SELECT route, histogram FROM latency WHERE phase = ? AND run_id IN ({marks})", (phase, *run_ids)
+    ):
+        routes.setdefault(route, latency.Histogram()).merge(latency.Histogram.from_dict(json.loads(data)))
+    return routes
+
+
+def load_statuses(db, run_ids):
+    """{title: status} where a title failing in any of the runs counts as failed."""
+    marks = ",".join("?" * len(run_ids))
+    statuses = {}
+    for title, status in db.execute(f"SELECT title, status FROM cases WHERE run_id IN ({marks})", run_ids):
+        statuses[title] = status if statuses.get(title, "PASSED") == "PASSED" else statuses[title]
+    return statuses
+
+
+def mann_whitney(before, after):
+    """One-sided Mann-Whitney U test that `after` tends to be slower, on two Histograms.
+
+    Samples in the same bucket are ties, so ranks come straight from the merged bucket counts
+    with the usual tie correction and a normal approximation. Returns (p value, P(after > before)).
+    """
+    n1, n2 = before.count, after.count
+    rank, rank_sum, ties = 0, 0.0, 0
+    for index in sorted(set(before.counts) | set(after.counts)):
+        a, b = before.counts.get(index, 0), after.counts.get(index, 0)
+        tied = a + b
+        rank_sum += b * (rank + (tied + 1) / 2)
+        rank += tied
+        ties += tied ** 3 - tied
+    u = rank_sum - n2 * (n2 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0, u / (n1 * n2)
+    z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2)), u / (n1 * n2)
+
+
+def compare(before_ids, after_ids, phase="total", alpha=ALPHA, min_change=MIN_CHANGE, path=DB_PATH):
+    with closing(connect(path)) as db:
+        check_comparable(db, before_ids, after_ids)
+        before, after = load_routes(db, before_ids, phase), load_routes(db, after_ids, phase)
+        statuses = load_statuses(db, before_ids), load_statuses(db, after_ids)
+    routes = {}
+    for route in sorted(set(before) & set(after)):
+        old, new = before[route], after[route]
+        row = {"before_ms": old.summary(), "after_ms": new.summary()}
+        if min(old.count, new.count) < MIN_SAMPLES:
+            row["verdict"] = "too few samples"
+        else:
+            p, superiority = mann_whitney(old, new)
+            change = new.percentile(50) / old.percentile(50) - 1 if old.percentile(50) else 0.0
+            row.update(p_value=p, p_slower=superiority, median_change=change,
+                       verdict="regressed" if p < alpha and change >= min_change else "ok")
+        routes[route] = row
+    newly_failing = sorted(title for title, status in statuses[1].items()
+                           if status != "PASSED" and statuses[0].get(title) == "PASSED")
+    return {
+        "before": before_ids,
+        "after": after_ids,
+        "phase": phase,
+        "alpha": alpha,
+        "min_change": min_change,
+        "routes": routes,
+        "only_before": sorted(set(before) - set(after)),
+        "only_after": sorted(set(after) - set(before)),
+        "newly_failing": newly_failing,
+    }
+
+
+def print_report(report):
+    print(f"runs {report['before']} -> {report['after']} ({report['phase']} latency, "
+          f"regression = p < {report['alpha']:g} and median +{report['min_change']:.0%})")
+    print(f"{'route':<44}{'n':>7}{'n':>7}{'p50':>9}{'p50':>9}{'change':>8}{'p':>10}  verdict")
+    for route, row in report["routes"].items():
+        old, new = row["before_ms"], row["after_ms"]
+        change = f"{row['median_change']:+.0%}" if "median_change" in row else ""
+        p = f"{row['p_value']:.2g}" if "p_value" in row else ""
+        print(f"{route[:43]:<44}{old['count']:>7}{new['count']:>7}{old['p50_ms']:>9.1f}{new['p50_ms']:>9.1f}"
+              f"{change:>8}{p:>10}  {row['verdict']}")
+    for title in report["newly_failing"]:
+        print(f"newly failing: {title}")
+
+
+def print_runs(path=DB_PATH, limit=20):
+    with closing(connect(path)) as db:
+        rows = db.execute(
+            "SELECT r.id, r.started, r.git_rev, r.git_dirty, r.target, COUNT(c.test_id),"
+            " SUM(c.status = 'PASSED'), SUM(c.cached) FROM runs r LEFT JOIN cases c ON c.run_id = r.id"
+            " GROUP BY r.id ORDER BY r.id DESC LIMIT ?", (limit,),
+        ).fetchall()
+    print(f"{'run':>5}  {'started':<26}{'revision':<12}{'passed':>9}{'cached':>8}  target")
+    for run_id, started, rev, dirty, target, total, passed, cached in rows:
+        revision = (rev or "-")[:10] + ("+" if dirty else "")
+        print(f"{run_id:>5}  {started:<26}{revision:<12}{f'{passed or 0}/{total}':>9}{cached or 0:>8}  {target or ''}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run history: list recorded runs or compare their latency.")
+    parser.add_argument("--db", default=DB_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+    runs = commands.add_parser("runs", help="list recorded runs")
+    runs.add_argument("-n", "--limit", type=int, default=20)
+    record = commands.add_parser("record", help="append an existing results file (e.g. tmp/test_results.json)")
+    record.add_argument("results")
+    record.add_argument("--target")
+    diff = commands.add_parser("compare", help="flag latency regressions from BEFORE to AFTER")
+    diff.add_argument("before", help="run id, last~N, or git revision (pools every run recorded at it)")
+    diff.add_argument("after", nargs="?", default="last")
+    diff.add_argument("--target", help="only runs against this target (\"stub\" or a base URL)")
+    diff.add_argument("--phase", choices=latency.PHASES, default="total")
+    diff.add_argument("--alpha", type=float, default=ALPHA)
+    diff.add_argument("--min-change", type=float, default=MIN_CHANGE, help="smallest median slowdown, 0.1 = 10%%")
+    diff.add_argument("-o", "--output", default=REPORT_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == "runs":
+        print_runs(args.db, args.limit)
+        return 0
+    if args.command == "record":
+        with open(args.results, encoding="utf-8") as f:
+            print(f"recorded run {record_run(json.load(f), args.target, path=args.db)}")
+        return 0
+    try:
+        with closing(connect(args.db)) as db:
+            before, after = resolve(db, args.before, args.target), resolve(db, args.after, args.target)
+        report = compare(before, after, args.phase, args.alpha, args.min_change, args.db)
+    except ValueError as e:
+        parser.error(str(e))
+    print_report(report)
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    regressed = any(row["verdict"] == "regressed" for row in report["routes"].values())
+    return 1 if regressed or report["newly_failing"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
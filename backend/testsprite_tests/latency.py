@@ -0,0 +1,134 @@
+import re
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+PHASES = ("dns", "connect", "ttfb", "total")
+PERCENTILES = (50, 90, 95, 99, 99.9)
+SUB_BUCKET_BITS = 7  # 128 sub-buckets per power of two: values are kept to within ~1%
+ID_SEGMENT_RE = re.compile(
+    r"^(?:[0-9a-fA-F]{24}|[0-9a-fA-F]{32}|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|\d+)$"
+)
+
+
+def route_template(method, url):
+    """Collapse ids in a URL so "GET /products/65f0...e1" is reported as "GET /products/{id}"."""
+    path = urlsplit(url).path or "/"
+    segments = ["{id}" if ID_SEGMENT_RE.match(segment) else segment for segment in path.split("/")]
+    return f"{method.upper()} {'/'.join(segments)}"
+
+
+class Histogram:
+    """Log-linear histogram of durations in microseconds, in the spirit of HdrHistogram.
+
+    Counts are kept sparsely so histograms stay small in the JSON report and can be merged
+    across cases, shards and runs without losing percentile accuracy.
+    """
+
+    def __init__(self, sub_bucket_bits=SUB_BUCKET_BITS):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.counts = defaultdict(int)
+        self.count = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        exponent = max(0, value.bit_length() - self.sub_bucket_bits)
+        return (exponent << self.sub_bucket_bits) + (value >> exponent)
+
+    def _value(self, index):
+        exponent = index >> self.sub_bucket_bits
+        mantissa = index & ((1 << self.sub_bucket_bits) - 1)
+        low = mantissa << exponent
+        return low + ((1 << exponent) >> 1)
+
+    def record(self, seconds, count=1):
+        value = max(0, int(round(seconds * 1e6)))
+        self.counts[self._index(value)] += count
+        self.count += count
+        self.sum += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        for index, count in other.counts.items():
+            self.counts[index] += count
+        self.count += other.count
+        self.sum += other.sum
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def percentile(self, pct):
+        """Value in seconds at the given percentile, or None if empty."""
+        if not self.count:
+            return None
+        target = max(1, -(-self.count * pct // 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(max(self._value(index), self.min), self.max) / 1e6
+        return self.max / 1e6
+
+    def summary(self):
+        if not self.count:
+            return {"count": 0}
+        summary = {
+            "count": self.count,
+            "min_ms": self.min / 1e3,
+            "mean_ms": self.sum / self.count / 1e3,
+            "max_ms": self.max / 1e3,
+        }
+        for pct in PERCENTILES:
+            summary[f"p{pct:g}_ms"] = self.percentile(pct) * 1e3
+        return summary
+
+    def to_dict(self):
+        return dict(
+            self.summary(),
+            sub_bucket_bits=self.sub_bucket_bits,
+            sum_us=self.sum,
+            buckets={str(index): count for index, count in sorted(self.counts.items())},
+        )
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(data.get("sub_bucket_bits", SUB_BUCKET_BITS))
+        for index, count in data.get("buckets", {}).items():
+            histogram.counts[int(index)] = count
+        histogram.count = data.get("count", 0)
+        histogram.sum = data.get("sum_us", 0)
+        if histogram.count:
+            histogram.min = int(round(data["min_ms"] * 1e3))
+            histogram.max = int(round(data["max_ms"] * 1e3))
+        return histogram
+
+
+def histograms_from_timings(timings):
+    """Group client Timings into {route template: {phase: Histogram}}."""
+    routes = defaultdict(lambda: {phase: Histogram() for phase in PHASES})
+    for timing in timings:
+        phases = routes[route_template(timing.method, timing.url)]
+        for phase in PHASES:
+            value = timing.elapsed if phase == "total" else getattr(timing, phase)
+            if value is not None:
+                phases[phase].record(value)
+    return dict(routes)
+
+
+def merge_routes(into, other):
+    for route, phases in other.items():
+        target = into.setdefault(route, {phase: Histogram() for phase in PHASES})
+        for phase, histogram in phases.items():
+            target[phase].merge(histogram)
+    return into
+
+
+def routes_to_dict(routes):
+    return {route: {phase: h.to_dict() for phase, h in phases.items()} for route, phases in sorted(routes.items())}
+
+
+def routes_from_dict(data):
+    return {route: {phase: Histogram.from_dict(h) for phase, h in phases.items()} for route, phases in data.items()}
@@ -0,0 +1,267 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import client
+import contracts
+from fixtures import product_id
+
+REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tmp", "load_report.json")
+IMAGE_CONTENT = b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00"
+PRODUCT_DATA = {
+    "name": "Load Test Product",
+    "description": "A product created by the load generator.",
+    "price": "19.99",
+    "category": "Test Category",
+}
+UPDATED_PRODUCT_DATA = {
+    "name": "Updated Load Test Product",
+    "description": "Updated by the load generator.",
+    "price": "15.99",
+    "category": "Updated Category",
+}
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Pacer:
+    """Spaces request starts evenly so all virtual users together stay at the target rate."""
+
+    def __init__(self, rps):
+        self.interval = 1.0 / rps if rps else 0.0
+        self.next_slot = time.perf_counter()
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self.lock:
+            now = time.perf_counter()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.contracts = contracts.Tally()
+
+    def add(self, endpoint, status, elapsed, violations=None):
+        self.latencies[endpoint].append(elapsed)
+        self.statuses[endpoint][str(status)] += 1
+        self.contracts.add(endpoint, status, violations)
+        if status is None or status >= 400:
+            self.errors[endpoint] += 1
+
+    def report(self, duration):
+        endpoints = {}
+        for endpoint in sorted(self.latencies):
+            values = sorted(self.latencies[endpoint])
+            count = len(values)
+            endpoints[endpoint] = {
+                "requests": count,
+                "throughput_rps": count / duration if duration else 0.0,
+                "error_rate": self.errors[endpoint] / count if count else 0.0,
+                "p50_ms": percentile(values, 50) * 1000,
+                "p95_ms": percentile(values, 95) * 1000,
+                "p99_ms": percentile(values, 99) * 1000,
+                "max_ms": values[-1] * 1000,
+                "statuses": dict(self.statuses[endpoint]),
+                "contract": self.contracts.report(endpoint),
+            }
+        total = sum(len(v) for v in self.latencies.values())
+        return {
+            "duration_s": duration,
+            "requests": total,
+            "throughput_rps": total / duration if duration else 0.0,
+            "error_rate": sum(self.errors.values()) / total if total else 0.0,
+            "contract_violations": sum(self.contracts.violations.values()),
+            "endpoints": endpoints,
+        }
+
+
+def _call(method, path, route, checker, kwargs):
+    # Validated in the worker thread, so parsing bodies never holds up the event loop's pacing
+    response = client.request(method, path, **kwargs)
+    return response, checker.check_response(route, response) if checker else None
+
+
+class VirtualUser:
+    def __init__(self, number, pacer, stats, token=None, checker=None):
+        self.number = number
+        self.pacer = pacer
+        self.stats = stats
+        self.checker = checker
+        self.headers = {"Authorization": f"Bearer {token}"} if token else {}
+        self.product_id = None
+
+    async def send(self, method, endpoint, path, **kwargs):
+        if self.headers:
+            kwargs["headers"] = dict(self.headers, **kwargs.get("headers", {}))
+        await self.pacer.wait()
+        route = f"{method} {endpoint}"
+        start = time.perf_counter()
+        try:
+            response, violations = await asyncio.to_thread(_call, method, path, route, self.checker, kwargs)
+        except Exception:
+            self.stats.add(route, None, time.perf_counter() - start)
+            return None
+        self.stats.add(route, response.status_code, time.perf_counter() - start, violations)
+        return response
+
+    async def create_product(self):
+        files = {"image": ("test_image.png", IMAGE_CONTENT, "image/png")}
+        response = await self.send("POST", "/products", "/products", data=PRODUCT_DATA, files=files)
+        if response is None or response.status_code >= 400:
+            return None
+        try:
+            return product_id(response.json())
+        except ValueError:
+            return None
+
+
+async def lifecycle(vu):
+    """TC001 -> TC002 -> TC003 -> cleanup: create, read, update, delete one product."""
+    pid = await vu.create_product()
+    if not pid:
+        return
+    await vu.send("GET", "/products/{id}", f"/products/{pid}")
+    files = {"images": ("updated_image.jpg", b"updated image content", "image/jpeg")}
+    await vu.send("PUT", "/products/{id}", f"/products/{pid}", data=UPDATED_PRODUCT_DATA, files=files)
+    await vu.send("DELETE", "/products/{id}", f"/products/{pid}")
+
+
+async def browse(vu):
+    """TC002 as a read-heavy flow: each virtual user reads back its own product."""
+    if not vu.product_id:
+        vu.product_id = await vu.create_product()
+        if not vu.product_id:
+            return
+    await vu.send("GET", "/products/{id}", f"/products/{vu.product_id}")
+
+
+async def create_delete(vu):
+    pid = await vu.create_product()
+    if pid:
+        await vu.send("DELETE", "/products/{id}", f"/products/{pid}")
+
+
+SCENARIOS = {
+    "lifecycle": lifecycle,
+    "browse": browse,
+    "create_delete": create_delete,
+}
+DEFAULT_MIX = {"lifecycle": 1, "browse": 4}
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def _user_loop(vu, mix, deadline, rng):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    while time.perf_counter() < deadline:
+        await SCENARIOS[rng.choices(names, weights)[0]](vu)
+    if vu.product_id:
+        await asyncio.to_thread(client.delete, f"/products/{vu.product_id}")
+
+
+async def run_load(users, rps, duration, mix=None, seed=None, tokens=None, checker=None):
+    mix = mix or DEFAULT_MIX
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=users, thread_name_prefix="vu"))
+    pacer = Pacer(rps)
+    stats = Stats()
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    deadline = start + duration
+    vus = [VirtualUser(n, pacer, stats, tokens[n % len(tokens)] if tokens else None, checker) for n in range(users)]
+    await asyncio.gather(*(_user_loop(vu, mix, deadline, random.Random(rng.random())) for vu in vus))
+    report = stats.report(time.perf_counter() - start)
+    report.update({"users": users, "target_rps": rps, "mix": mix})
+    return report
+
+
+def print_report(report):
+    print(f"{report['requests']} requests in {report['duration_s']:.1f}s "
+          f"({report['throughput_rps']:.1f} req/s, {report['error_rate']:.1%} errors, "
+          f"{report['contract_violations']} contract violations)")
+    print(f"{'endpoint':<24}{'reqs':>8}{'rps':>9}{'err':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'contract':>10}")
+    for endpoint, row in report["endpoints"].items():
+        contract = row["contract"]
+        broken = f"{contract['violations']}/{contract['checked']}" if contract["checked"] else "-"
+        print(f"{endpoint:<24}{row['requests']:>8}{row['throughput_rps']:>9.1f}{row['error_rate']:>8.1%}"
+              f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}{broken:>10}")
+        for message in contract["samples"]:
+            print(f"{'':>4}{message}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay the product CRUD cases as a sustained workload.")
+    parser.add_argument("-u", "--users", type=int, default=10)
+    parser.add_argument("-r", "--rps", type=float, default=50.0, help="target request rate; 0 = unthrottled")
+    parser.add_argument("-d", "--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="e.g. lifecycle=1,browse=4")
+    parser.add_argument("--retries", type=int, default=0, help="client retries on 503 (0 keeps them visible)")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("-o", "--output", default=REPORT_PATH)
+    parser.add_argument("--stub", action="store_true", help="run against the in-process stub backend")
+    parser.add_argument("--capture", metavar="LOG", help="append every request to LOG for traffic.py replay")
+    parser.add_argument("--auth", action="store_true",
+                        help="give every virtual user its own bearer token from the auth.py token pool")
+    parser.add_argument("--no-contracts", action="store_true",
+                        help="skip validating responses against the contracts in standard_prd.json")
+    args = parser.parse_args(argv)
+
+    if args.stub:
+        from runner import start_stub
+
+        start_stub()
+    if args.capture:
+        from traffic import Recorder
+
+        Recorder(args.capture).install()
+
+    client.configure(pool_size=max(args.users, client.POOL_SIZE), retries=args.retries)
+    tokens = None
+    if args.auth:
+        import auth
+
+        # Logins happen here, before the clock starts, and only for users without a cached token
+        tokens = auth.users.tokens(args.users)
+    checker = None if args.no_contracts else contracts.default()
+    report = asyncio.run(run_load(args.users, args.rps, args.duration, args.mix, args.seed, tokens, checker))
+    print_report(report)
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+import asyncio
+import concurrent.futures
+import html
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict, deque, namedtuple
+from email import message_from_bytes, policy
+
+from stub_server import LoopThread, read_request, render_response
+
+SMTP_PORT = int(os.getenv("TESTSPRITE_SMTP_PORT", "2525"))
+MAIL_API_PORT = int(os.getenv("TESTSPRITE_MAIL_API_PORT", "2580"))
+OTP_RE = re.compile(r"(?<!\d)(\d{6})(?!\d)")
+TAG_RE = re.compile(r"<[^>]+>")
+MAILBOX_SIZE = 32
+
+Message = namedtuple("Message", ["recipients", "subject", "body", "otp", "received"])
+
+
+def extract_otp(body):
+    text = html.unescape(TAG_RE.sub(" ", body or ""))
+    match = OTP_RE.search(text)
+    return match.group(1) if match else None
+
+
+def _addresses(value):
+    return [address.strip().lower() for address in re.split(r"[,;]", value or "") if address.strip()]
+
+
+class MailSink(LoopThread):
+    """Local SMTP + Zoho-compatible REST mail sink that hands OTP emails to waiting tests.
+
+    Point the backend at it with ZOHO_ACCOUNTS_URL / ZOHO_MAIL_API_URL (REST) or an SMTP
+    transport on localhost:TESTSPRITE_SMTP_PORT. Tests call expect(email) before triggering
+    the email and block on (or await) the returned future; nothing polls.
+    """
+
+    thread_name = "mail-sink"
+
+    def __init__(self, host="127.0.0.1", smtp_port=SMTP_PORT, api_port=MAIL_API_PORT):
+        self.host = host
+        self.smtp_port = smtp_port
+        self.api_port = api_port
+        self._lock = threading.Lock()
+        self._waiters = defaultdict(list)
+        self._mailboxes = defaultdict(lambda: deque(maxlen=MAILBOX_SIZE))
+        self._servers = []
+        self._loop = None
+        self._thread = None
+
+    @property
+    def api_url(self):
+        return f"http://{self.host}:{self.api_port}"
+
+    # Delivery
+
+    def deliver(self, recipients, subject, body):
+        message = Message(tuple(_addresses(",".join(recipients))), subject, body, extract_otp(body), time.time())
+        for recipient in message.recipients:
+            with self._lock:
+                waiters = self._waiters.pop(recipient, [])
+                if not waiters:
+                    self._mailboxes[recipient].append(message)
+            for future in waiters:
+                if not future.done():
+                    future.set_result(message)
+        return message
+
+    def expect(self, email):
+        """Return a concurrent.futures.Future resolved by the next message to `email`.
+
+        Messages already sitting in the mailbox are discarded so a stale OTP is never returned.
+        """
+        future = concurrent.futures.Future()
+        email = email.lower()
+        with self._lock:
+            self._mailboxes.pop(email, None)
+            self._waiters[email].append(future)
+        return future
+
+    def next_message(self, email, timeout=30):
+        """Block until a message for `email` arrives (or take one already received)."""
+        email = email.lower()
+        with self._lock:
+            mailbox = self._mailboxes.get(email)
+            if mailbox:
+                return mailbox.popleft()
+            future = concurrent.futures.Future()
+            self._waiters[email].append(future)
+        return future.result(timeout)
+
+    def wait_for_otp(self, email, timeout=30):
+        return self.next_message(email, timeout).otp
+
+    async def next_otp(self, email, timeout=30):
+        with self._lock:
+            mailbox = self._mailboxes.get(email.lower())
+            if mailbox:
+                return mailbox.popleft().otp
+        future = self.expect(email)
+        message = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        return message.otp
+
+    # SMTP
+
+    async def _smtp_session(self, reader, writer):
+        def reply(line):
+            writer.write((line + "\r\n").encode())
+
+        reply("220 testsprite mail sink ESMTP")
+        recipients = []
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode("latin-1").strip()
+                verb = command.split(" ", 1)[0].upper()
+                if verb in ("EHLO", "HELO"):
+                    reply("250-testsprite\r\n250-AUTH PLAIN LOGIN XOAUTH2\r\n250 8BITMIME" if verb == "EHLO" else "250 testsprite")
+                elif verb == "AUTH":
+                    reply("235 2.7.0 Authentication successful")
+                elif verb == "MAIL":
+                    recipients = []
+                    reply("250 OK")
+                elif verb == "RCPT":
+                    recipients.append(command.split(":", 1)[1].strip().strip("<>"))
+                    reply("250 OK")
+                elif verb == "DATA":
+                    reply("354 End data with <CR><LF>.<CR><LF>")
+                    await writer.drain()
+                    lines = []
+                    while True:
+                        data_line = await reader.readline()
+                        if data_line in (b".\r\n", b".\n", b""):
+                            break
+                        lines.append(data_line[1:] if data_line.startswith(b"..") else data_line)
+                    parsed = message_from_bytes(b"".join(lines), policy=policy.default)
+                    part = parsed.get_body(preferencelist=("html", "plain"))
+                    self.deliver(recipients, str(parsed.get("Subject", "")), part.get_content() if part else "")
+                    reply("250 OK: queued")
+                elif verb == "QUIT":
+                    reply("221 Bye")
+                    break
+                else:
+                    reply("250 OK")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    # Zoho Mail REST API
+
+    def _api_dispatch(self, request):
+        if request.method == "POST" and request.path == "/oauth/v2/token":
+            return 200, {"access_token": "mail-sink-token", "expires_in": 3600, "token_type": "Bearer"}
+        if request.method == "GET" and request.path == "/api/accounts":
+            return 200, {"data": [{"accountId": "sink", "incomingUserName": os.getenv("ZOHO_MAIL", "")}]}
+        if request.method == "POST" and re.match(r"^/api/accounts/[^/]+/messages$", request.path):
+            body = request.json()
+            self.deliver([body.get("toAddress", "")], body.get("subject", ""), body.get("content", ""))
+            return 200, {"status": {"code": 200, "description": "success"}, "data": {"messageId": str(time.time_ns())}}
+        return 404, {"status": {"code": 404, "description": "Not found"}}
+
+    async def _api_session(self, reader, writer):
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                try:
+                    status, payload = self._api_dispatch(request)
+                except json.JSONDecodeError:
+                    status, payload = 400, {"status": {"code": 400, "description": "Malformed JSON"}}
+                writer.write(render_response(status, payload, True))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    # Lifecycle
+
+    async def start(self):
+        smtp = await asyncio.start_server(self._smtp_session, self.host, self.smtp_port)
+        try:
+            api = await asyncio.start_server(self._api_session, self.host, self.api_port)
+        except BaseException:
+            smtp.close()
+            await smtp.wait_closed()
+            raise
+        self.smtp_port = smtp.sockets[0].getsockname()[1]
+        self.api_port = api.sockets[0].getsockname()[1]
+        self._servers = [smtp, api]
+        return self
+
+    async def stop(self):
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def get_sink(smtp_port=SMTP_PORT, api_port=MAIL_API_PORT):
+    """Process-wide sink, started on first use (later calls ignore the ports)."""
+    global _sink
+    with _sink_lock:
+        if _sink is None:
+            _sink = MailSink(smtp_port=smtp_port, api_port=api_port).start_in_thread()
+    return _sink
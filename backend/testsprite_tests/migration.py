@@ -0,0 +1,373 @@
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import client
+import latency
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPORT_PATH = os.path.join(HERE, "tmp", "migration_report.json")
+EXPORT_DIR = os.path.join(HERE, "tmp", "exports")
+EXPORT_PATH = "/api/content/admin/export"
+IMPORT_PATH = "/api/content/admin/import"
+DELETE_PATHS = {
+    "banners": "/api/content/admin/banners/{id}",
+    "homeCategories": "/api/content/admin/home-categories/{id}",
+}
+CHUNK_SIZE = 64 * 1024
+DEFAULT_SIZES = (100, 1000, 10000, 50000)
+# None sends the whole export back in one request, as the admin UI does today
+DEFAULT_BATCHES = (100, 1000, None)
+CATEGORY_EVERY = 10  # one home category icon per ten banners
+SEED_BATCH = 1000
+CLEANUP_WORKERS = 8
+MAX_BUFFER = 64 * 1024 * 1024
+WHITESPACE = " \t\r\n"
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+def rss_mb():
+    with open("/proc/self/statm", encoding="ascii") as f:
+        return int(f.read().split()[1]) * PAGE_SIZE / 2**20
+
+
+class MemoryWatch:
+    """Peak growth of this process's RSS over a phase, sampled whenever `sample` is called."""
+
+    def __init__(self):
+        self.start = self.peak = rss_mb()
+
+    def sample(self):
+        self.peak = max(self.peak, rss_mb())
+
+    @property
+    def growth(self):
+        return self.peak - self.start
+
+
+def synthetic_content(tag, start, stop):
+    """(section, item) pairs numbered start..stop-1; every CATEGORY_EVERY-th is a category icon."""
+    for n in range(start, stop):
+        if n % CATEGORY_EVERY == CATEGORY_EVERY - 1:
+            yield "homeCategories", {
+                "categoryName": f"{tag} category {n}",
+                "iconUrl": f"https://cdn.example.com/{tag}/icon-{n}.png",
+                "redirectUrl": f"/category/{tag}-{n}",
+                "isActive": True,
+                "position": n,
+            }
+        else:
+            yield "banners", {
+                "title": f"{tag} banner {n}",
+                "subtitle": f"Synthetic banner {n} for export/import scaling runs",
+                "imageUrl": f"https://cdn.example.com/{tag}/banner-{n}.jpg",
+                "mobileImageUrl": f"https://cdn.example.com/{tag}/banner-{n}-m.jpg",
+                "redirectUrl": f"/shop?promo={tag}-{n}",
+                "ctaText": "Shop now",
+                "isActive": n % 3 != 0,
+                "position": n,
+            }
+
+
+def batches(items, size):
+    """Import bodies of at most `size` items each (all of them when size is None)."""
+    body, count = {}, 0
+    for section, item in items:
+        body.setdefault(section, []).append(item)
+        count += 1
+        if size and count == size:
+            yield body, count
+            body, count = {}, 0
+    if count:
+        yield body, count
+
+
+def seed_content(headers, tag, start, stop, timeout=client.TIMEOUT):
+    for body, _ in batches(synthetic_content(tag, start, stop), SEED_BATCH):
+        response = client.post(IMPORT_PATH, json=body, headers=headers, timeout=timeout)
+        if response.status_code != 200:
+            raise RuntimeError(f"seeding content failed with {response.status_code}: {response.text[:200]}")
+
+
+def iter_items(path, chunk_size=CHUNK_SIZE):
+    """Yield (section, item) from an export file one array element at a time.
+
+    The file is read in chunks and each element is decoded as soon as it is complete, so
+    memory stays bounded by the largest single item rather than the size of the export.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buffer, pos = "", 0
+
+        def peek(skip=WHITESPACE):
+            nonlocal buffer, pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in skip:
+                    pos += 1
+                if pos < len(buffer):
+                    return buffer[pos]
+                buffer, pos = f.read(chunk_size), 0
+                if not buffer:
+                    return ""
+
+        def value():
+            nonlocal buffer, pos
+            while True:
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                    # A number at the very end of the buffer may continue in the next chunk
+                    if end < len(buffer) or isinstance(item, (dict, list, str)):
+                        pos = end
+                        return item
+                except json.JSONDecodeError:
+                    pass
+                more = f.read(chunk_size)
+                if not more:
+                    raise ValueError(f"{path} ends in the middle of a value")
+                buffer, pos = buffer[pos:] + more, 0
+                if len(buffer) > MAX_BUFFER:
+                    raise ValueError(f"an item in {path} exceeds {MAX_BUFFER} bytes")
+
+        if peek() != "{":
+            raise ValueError(f"{path} is not a JSON object")
+        pos += 1
+        while True:
+            char = peek(WHITESPACE + ",")
+            if char == "}":
+                return
+            if char == "":
+                raise ValueError(f"{path} is truncated")
+            section = value()
+            if peek() != ":":
+                raise ValueError(f"{path}: expected ':' after {section!r}")
+            pos += 1
+            if peek() != "[":
+                value()
+                continue
+            pos += 1
+            while True:
+                char = peek(WHITESPACE + ",")
+                if char == "]":
+                    pos += 1
+                    break
+                if char == "":
+                    raise ValueError(f"{path} is truncated inside {section!r}")
+                yield section, value()
+
+
+def export_to_file(headers, path, timeout=client.TIMEOUT):
+    """Stream GET /admin/export?type=all to `path` in CHUNK_SIZE pieces and time each stage."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    memory = MemoryWatch()
+    size = 0
+    first_chunk = None
+    start = time.perf_counter()
+    try:
+        response = client.get(EXPORT_PATH, params={"type": "all"}, headers=headers, stream=True, timeout=timeout)
+    except requests.RequestException as e:
+        return {"status": None, "error": f"{type(e).__name__} after {time.perf_counter() - start:.1f}s"}
+    headers_at = time.perf_counter()
+    try:
+        if response.status_code != 200:
+            return {"status": response.status_code, "error": response.text[:200]}
+        with open(path, "wb") as f:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                if first_chunk is None:
+                    first_chunk = time.perf_counter()
+                size += len(chunk)
+                f.write(chunk)
+                memory.sample()
+    except requests.RequestException as e:
+        return {"status": response.status_code, "bytes": size, "error": f"{type(e).__name__} mid-transfer"}
+    finally:
+        response.close()
+    end = time.perf_counter()
+    transfer = end - (first_chunk or headers_at)
+    counts = {}
+    for section, _ in iter_items(path):
+        counts[section] = counts.get(section, 0) + 1
+        if sum(counts.values()) % 1000 == 0:
+            memory.sample()
+    memory.sample()
+    return {
+        "status": response.status_code,
+        "ttfb_ms": ((first_chunk or headers_at) - start) * 1e3,
+        "transfer_ms": transfer * 1e3,
+        "total_ms": (end - start) * 1e3,
+        "parse_ms": (time.perf_counter() - end) * 1e3,
+        "bytes": size,
+        "bytes_per_s": size / transfer if transfer else None,
+        "items": counts,
+        "client_rss_growth_mb": memory.growth,
+    }
+
+
+def renamed(items, copy_tag):
+    """Items made distinct from the originals, so the import's duplicate checks let them through."""
+    for section, item in items:
+        item = dict(item)
+        item.pop("_id", None)
+        if section == "banners":
+            item["title"] = f"{copy_tag} {item.get('title')}"
+            item["imageUrl"] = f"{item.get('imageUrl')}?copy={copy_tag}"
+        elif section == "homeCategories":
+            item["categoryName"] = f"{copy_tag} {item.get('categoryName')}"
+        yield section, item
+
+
+def import_file(headers, path, batch_size, copy_tag, timeout=client.TIMEOUT):
+    """Re-import an export as renamed copies through POST /admin/import, `batch_size` items per request."""
+    memory = MemoryWatch()
+    histogram = latency.Histogram()
+    created = {"banners": 0, "homeCategories": 0}
+    sent = items = requests_made = 0
+    errors = []
+    start = time.perf_counter()
+    for body, count in batches(renamed(iter_items(path), copy_tag), batch_size):
+        data = json.dumps(body).encode()
+        memory.sample()
+        requests_made += 1
+        began = time.perf_counter()
+        try:
+            response = client.post(IMPORT_PATH, data=data, timeout=timeout,
+                                   headers=dict(headers, **{"Content-Type": "application/json"}))
+        except requests.RequestException as e:
+            errors.append(f"batch {requests_made} ({count} items): {type(e).__name__} after "
+                          f"{time.perf_counter() - began:.1f}s")
+            continue
+        histogram.record(time.perf_counter() - began)
+        sent += len(data)
+        items += count
+        if response.status_code != 200:
+            errors.append(f"batch {requests_made} ({count} items): HTTP {response.status_code}")
+            continue
+        results = response.json().get("results", {})
+        for section in created:
+            created[section] += results.get(section, 0)
+    seconds = time.perf_counter() - start
+    return {
+        "batch_size": batch_size or "all",
+        "requests": requests_made,
+        "items": items,
+        "created": created,
+        "seconds": seconds,
+        "items_per_s": items / seconds if seconds else None,
+        "request_bytes": sent,
+        "batch_ms": histogram.summary(),
+        "errors": errors,
+        "client_rss_growth_mb": memory.growth,
+    }
+
+
+def cleanup(headers, prefix, timeout=client.TIMEOUT):
+    """Delete every banner and category icon whose title or name starts with `prefix`."""
+    path = os.path.join(EXPORT_DIR, f"cleanup-{uuid.uuid4().hex[:8]}.json")
+    if export_to_file(headers, path, timeout).get("status") != 200:
+        return 0
+    try:
+        doomed = [
+            DELETE_PATHS[section].format(id=item["_id"])
+            for section, item in iter_items(path)
+            if section in DELETE_PATHS and str(item.get("title") or item.get("categoryName") or "").startswith(prefix)
+        ]
+    finally:
+        os.remove(path)
+    with ThreadPoolExecutor(max_workers=CLEANUP_WORKERS, thread_name_prefix="migration-cleanup") as pool:
+        statuses = list(pool.map(lambda url: client.delete(url, headers=headers, timeout=timeout).status_code, doomed))
+    return sum(status == 200 for status in statuses)
+
+
+def run_benchmark(headers, sizes, batch_sizes, timeout=client.TIMEOUT, keep_exports=False):
+    tag = f"migration-{uuid.uuid4().hex[:6]}"
+    runs, seeded = [], 0
+    try:
+        for size in sizes:
+            if size > seeded:
+                seed_content(headers, tag, seeded, size, timeout)
+                seeded = size
+            path = os.path.join(EXPORT_DIR, f"{tag}-{size}.json")
+            export = export_to_file(headers, path, timeout)
+            imports = []
+            if export.get("status") == 200:
+                for batch_size in batch_sizes:
+                    copy_tag = f"{tag}-copy{batch_size or 'all'}"
+                    imports.append(import_file(headers, path, batch_size, copy_tag, timeout))
+                    # Copies would inflate the next step's catalog and duplicate checks
+                    imports[-1]["removed"] = cleanup(headers, copy_tag, timeout)
+                if not keep_exports:
+                    os.remove(path)
+            runs.append({"seeded": size, "export": export, "imports": imports})
+    finally:
+        cleanup(headers, tag, timeout)
+    return {"chunk_size": CHUNK_SIZE, "timeout_s": timeout, "runs": runs}
+
+
+def print_report(report):
+    print(f"{'seeded':>8}  {'export':<8}{'items':>8}{'MB':>8}{'ttfb ms':>9}{'xfer ms':>9}{'MB/s':>7}{'rss Δ':>7}")
+    for run in report["runs"]:
+        export = run["export"]
+        if export.get("status") != 200:
+            print(f"{run['seeded']:>8}  {'FAILED':<8}{export.get('error', '')}")
+            continue
+        items = sum(export["items"].values())
+        print(f"{run['seeded']:>8}  {'':<8}{items:>8}{export['bytes'] / 2**20:>8.1f}{export['ttfb_ms']:>9.0f}"
+              f"{export['transfer_ms']:>9.0f}{(export['bytes_per_s'] or 0) / 2**20:>7.1f}"
+              f"{export['client_rss_growth_mb']:>7.1f}")
+        for result in run["imports"]:
+            batch = result["batch_ms"]
+            print(f"{'':>10}import {str(result['batch_size']):>5} x{result['requests']:<5}{result['items']:>7} items"
+                  f"{result['seconds']:>8.1f}s{result['items_per_s'] or 0:>9.0f}/s  p99 batch "
+                  f"{batch.get('p99_ms', 0):>8.0f}ms  rss Δ {result['client_rss_growth_mb']:.1f} MB")
+            for error in result["errors"][:3]:
+                print(f"{'':>12}{error}")
+
+
+def parse_sizes(value):
+    return tuple(int(float(size)) for size in value.split(",") if size.strip())
+
+
+def parse_batches(value):
+    return tuple(None if size.strip() == "all" else int(float(size)) for size in value.split(",") if size.strip())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time content export to disk and batched re-import as content grows.")
+    parser.add_argument("-s", "--sizes", type=parse_sizes, default=DEFAULT_SIZES,
+                        help="synthetic banners + category icons to hold at each step, e.g. 1e3,1e4")
+    parser.add_argument("-b", "--batch-sizes", type=parse_batches, default=DEFAULT_BATCHES,
+                        help="items per import request; 'all' sends the whole export at once, e.g. 100,1000,all")
+    parser.add_argument("--timeout", type=float, default=client.TIMEOUT, help="per-request timeout in seconds")
+    parser.add_argument("--keep-exports", action="store_true", help=f"leave the export files in {EXPORT_DIR}")
+    parser.add_argument("--admin-token", default=os.getenv("TESTSPRITE_ADMIN_TOKEN"), help="JWT with the admin role")
+    parser.add_argument("-o", "--output", default=REPORT_PATH)
+    parser.add_argument("--stub", action="store_true", help="run against the in-process stub backend")
+    args = parser.parse_args(argv)
+
+    if args.stub:
+        from coupons import stub_users
+        from stub_server import StubServer
+
+        client.BASE_URL = StubServer().start_in_thread().url
+        args.admin_token = stub_users(0)[0]
+    elif not args.admin_token:
+        parser.error("--admin-token (or TESTSPRITE_ADMIN_TOKEN) is required outside --stub")
+
+    headers = {"Authorization": f"Bearer {args.admin_token}"}
+    report = run_benchmark(headers, args.sizes, args.batch_sizes, args.timeout, args.keep_exports)
+    print_report(report)
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    failed = any(run["export"].get("status") != 200 or any(result["errors"] for result in run["imports"])
+                 for run in report["runs"])
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
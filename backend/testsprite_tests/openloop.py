@@ -0,0 +1,327 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import client
+import contracts
+import faultproxy
+import fixtures
+import latency
+import sampler
+from payments import BASE_PAYLOAD
+
+REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tmp", "openloop_report.json")
+MAX_IN_FLIGHT = 512
+DEFAULT_MIX = {"product_read": 6, "product_create": 1, "order_create": 2, "auth_otp": 1}
+OTP_EMAIL = "openloop-{n}@example.com"
+
+
+# Arrival schedules: offsets in seconds from the start at which a request is due
+
+def constant(rate, duration, rng=None):
+    return [i / rate for i in range(int(rate * duration))]
+
+
+def poisson(rate, duration, rng):
+    offsets, t = [], rng.expovariate(rate)
+    while t < duration:
+        offsets.append(t)
+        t += rng.expovariate(rate)
+    return offsets
+
+
+def step(rates, duration, rng=None):
+    """Equal-length steps at each rate in turn, e.g. 10,50,100 over 30s is 10s at each."""
+    width, offsets = duration / len(rates), []
+    for n, rate in enumerate(rates):
+        offsets += [n * width + i / rate for i in range(int(rate * width))]
+    return offsets
+
+
+def ramp(start_rate, end_rate, duration, rng=None):
+    """Rate changing linearly from start_rate to end_rate; the k-th arrival solves N(t) = k."""
+    slope = (end_rate - start_rate) / duration
+    total = int(start_rate * duration + slope * duration ** 2 / 2)
+    if not slope:
+        return constant(start_rate, duration)
+    return [(-start_rate + math.sqrt(start_rate ** 2 + 2 * slope * k)) / slope for k in range(total)]
+
+
+def parse_profile(text):
+    """constant:50, poisson:50, step:10/50/100 or ramp:10-200 -> (name, schedule function)."""
+    name, _, spec = text.partition(":")
+    try:
+        if name in ("constant", "poisson"):
+            rate = float(spec)
+            return text, lambda duration, rng: (constant if name == "constant" else poisson)(rate, duration, rng)
+        if name == "step":
+            rates = [float(rate) for rate in spec.split("/")]
+            return text, lambda duration, rng: step(rates, duration)
+        if name == "ramp":
+            start, end = (float(rate) for rate in spec.split("-"))
+            return text, lambda duration, rng: ramp(start, end, duration)
+    except ValueError:
+        pass
+    raise argparse.ArgumentTypeError(f"bad profile {text!r}; e.g. constant:50, poisson:50, step:10/50/100, ramp:10-200")
+
+
+# Scenarios: one request each, built from state prepared before the clock starts
+
+class Context:
+    def __init__(self, tokens, products):
+        self.tokens = tokens
+        self.products = products
+        self.created = []
+
+
+def product_read(ctx, n):
+    product = ctx.products[n % len(ctx.products)]
+    return "GET /products/{id}", "GET", f"/products/{product['_id']}", {}
+
+
+def product_create(ctx, n):
+    return "POST /products", "POST", "/products", {"json": fixtures.product_payload(f"openloop-{n}")}
+
+
+def order_create(ctx, n):
+    product = ctx.products[n % len(ctx.products)]
+    price = float(product.get("price", 0))
+    body = dict(BASE_PAYLOAD, products=[{"productId": product["_id"], "quantity": 1, "price": price}],
+                subtotal=price, total=price, paymentMethod="COD")
+    headers = {"Authorization": f"Bearer {ctx.tokens[n % len(ctx.tokens)]}"}
+    return "POST /api/order/create", "POST", "/api/order/create", {"json": body, "headers": headers}
+
+
+def auth_otp(ctx, n):
+    return "POST /api/auth/send-email-otp", "POST", "/api/auth/send-email-otp", {"json": {"email": OTP_EMAIL.format(n=n)}}
+
+
+SCENARIOS = {
+    "product_read": product_read,
+    "product_create": product_create,
+    "order_create": order_create,
+    "auth_otp": auth_otp,
+}
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name.strip()!r}; choose from {', '.join(SCENARIOS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+class Recorder:
+    """Latency from the intended send time (corrected) next to the usual service time."""
+
+    def __init__(self):
+        self.corrected = defaultdict(latency.Histogram)
+        self.service = defaultdict(latency.Histogram)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.contracts = contracts.Tally()
+        self.send_lag = latency.Histogram()
+        self.seconds = defaultdict(lambda: {"due": 0, "errors": 0, "unavailable": 0, "latency": latency.Histogram()})
+        self.in_flight = self.peak_in_flight = 0
+
+    def add(self, endpoint, status, due, sent, done, offset, violations=None):
+        self.corrected[endpoint].record(done - due)
+        self.service[endpoint].record(done - sent)
+        self.send_lag.record(max(0.0, sent - due))
+        self.statuses[endpoint][str(status)] += 1
+        self.contracts.add(endpoint, status, violations)
+        second = self.seconds[int(offset)]
+        second["latency"].record(done - due)
+        if status is None or status >= 400:
+            second["errors"] += 1
+        if status == 503:
+            second["unavailable"] += 1
+
+    def report(self):
+        endpoints = {}
+        for endpoint, histogram in sorted(self.corrected.items()):
+            endpoints[endpoint] = {
+                "corrected_ms": histogram.summary(),
+                "service_ms": self.service[endpoint].summary(),
+                "statuses": dict(self.statuses[endpoint]),
+                "contract": self.contracts.report(endpoint),
+            }
+        timeline = [
+            {"second": s, "due": row["due"], "completed": row["latency"].count, "errors": row["errors"],
+             "503": row["unavailable"], "p99_ms": row["latency"].summary().get("p99_ms")}
+            for s, row in sorted(self.seconds.items())
+        ]
+        return {"endpoints": endpoints, "contract_violations": sum(self.contracts.violations.values()),
+                "send_lag_ms": self.send_lag.summary(),
+                "peak_in_flight": self.peak_in_flight, "timeline": timeline}
+
+
+async def run_open_loop(schedule, mix, ctx, max_in_flight=MAX_IN_FLIGHT, seed=None, checker=None):
+    """Issue one request per scheduled offset whether or not earlier ones have answered.
+
+    A request that cannot start on time (no free worker, or the loop fell behind) still has
+    its latency measured from when it was due, so a stalled backend shows up as queueing
+    delay instead of quietly lowering the offered load (coordinated omission).
+    """
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    recorder = Recorder()
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="openloop"))
+
+    def call(endpoint, method, path, kwargs):
+        sent = time.perf_counter()
+        violations = None
+        try:
+            with sampler.phase(endpoint):
+                response = client.request(method, path, **kwargs)
+            done = time.perf_counter()
+            status = response.status_code
+            # Checked off the clock in the worker thread: validation must not show up as latency
+            if checker:
+                violations = checker.check_response(endpoint, response)
+            if status == 201 and path == "/products":
+                ctx.created.append(fixtures.product_id(response.json()))
+        except Exception:
+            status, done = None, time.perf_counter()
+        return status, sent, done, violations
+
+    async def fire(endpoint, method, path, kwargs, due, offset):
+        recorder.in_flight += 1
+        recorder.peak_in_flight = max(recorder.peak_in_flight, recorder.in_flight)
+        status, sent, done, violations = await asyncio.to_thread(call, endpoint, method, path, kwargs)
+        recorder.in_flight -= 1
+        recorder.add(endpoint, status, due, sent, done, offset, violations)
+
+    tasks = []
+    start = time.perf_counter()
+    with sampler.phase("dispatch"):
+        for n, offset in enumerate(schedule):
+            due = start + offset
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            endpoint, method, path, kwargs = SCENARIOS[rng.choices(names, weights)[0]](ctx, n)
+            recorder.seconds[int(offset)]["due"] += 1
+            tasks.append(asyncio.create_task(fire(endpoint, method, path, kwargs, due, offset)))
+    dispatched = time.perf_counter() - start
+    # Past the schedule only stragglers remain; a backend still busy here is working off a backlog
+    with sampler.phase("drain"):
+        await asyncio.gather(*tasks)
+    report = recorder.report()
+    report.update({"scheduled": len(schedule), "dispatch_s": dispatched, "duration_s": time.perf_counter() - start})
+    return report
+
+
+def cleanup(ctx):
+    ids = [pid for pid in ctx.created if pid]
+    if ids and client.post(fixtures.BULK_DELETE_PATH, json={"ids": ids}).status_code not in (200, 204):
+        for pid in ids:
+            client.delete(f"/products/{pid}")
+
+
+def print_report(report):
+    duration = report["duration_s"]
+    print(f"{report['profile']}: {report['scheduled']} requests over {report['target_duration_s']:.0f}s "
+          f"(offered {report['scheduled'] / report['target_duration_s']:.1f}/s, done in {duration:.1f}s, "
+          f"peak {report['peak_in_flight']} in flight, send lag p99 {report['send_lag_ms'].get('p99_ms', 0):.1f}ms)")
+    print(f"{'endpoint':<32}{'reqs':>7}{'p50':>9}{'p99':>9}{'p99.9':>9}{'svc p99':>9}{'errors':>8}{'contract':>10}")
+    for endpoint, row in report["endpoints"].items():
+        corrected, service, contract = row["corrected_ms"], row["service_ms"], row["contract"]
+        errors = sum(n for status, n in row["statuses"].items() if status == "None" or int(status) >= 400)
+        broken = f"{contract['violations']}/{contract['checked']}" if contract["checked"] else "-"
+        print(f"{endpoint:<32}{corrected['count']:>7}{corrected['p50_ms']:>9.1f}{corrected['p99_ms']:>9.1f}"
+              f"{corrected['p99.9_ms']:>9.1f}{service['p99_ms']:>9.1f}{errors:>8}{broken:>10}")
+        for message in contract["samples"]:
+            print(f"{'':>4}{message}")
+    unavailable = [row["second"] for row in report["timeline"] if row["503"]]
+    if unavailable:
+        print(f"503s during seconds {unavailable[0]}-{unavailable[-1]} "
+              f"({sum(row['503'] for row in report['timeline'])} responses)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Open-loop load: requests go out on schedule, answered or not.")
+    parser.add_argument("-p", "--profile", type=parse_profile, default=parse_profile("constant:20"),
+                        help="constant:RATE, poisson:RATE, step:R1/R2/..., ramp:FROM-TO (requests per second)")
+    parser.add_argument("-d", "--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help=f"scenario weights, e.g. product_read=4,order_create=1 ({', '.join(SCENARIOS)})")
+    parser.add_argument("--max-in-flight", type=int, default=MAX_IN_FLIGHT,
+                        help="worker threads; requests beyond this wait, and the wait counts as latency")
+    parser.add_argument("--users", type=int, default=8, help="token pool users for authenticated scenarios")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--faults", metavar="RULES", help="send the load through faultproxy with these rules")
+    parser.add_argument("--sample-pid", type=sampler.parse_pid, metavar="PID",
+                        help="sample this backend process (\"self\" with --stub) per scenario and phase")
+    parser.add_argument("-o", "--output", default=REPORT_PATH)
+    parser.add_argument("--stub", action="store_true", help="run against the in-process stub backend")
+    parser.add_argument("--no-contracts", action="store_true",
+                        help="skip validating responses against the contracts in standard_prd.json")
+    args = parser.parse_args(argv)
+
+    if args.stub:
+        from runner import start_stub
+
+        start_stub()
+    client.configure(pool_size=max(client.POOL_SIZE, args.max_in_flight), retries=0)
+
+    # Everything that is not the measured traffic happens before the clock starts
+    label, schedule_for = args.profile
+    schedule = schedule_for(args.duration, random.Random(args.seed))
+    tokens = []
+    if "order_create" in args.mix:
+        import auth
+
+        tokens = auth.users.tokens(args.users)
+    ctx = Context(tokens, [fixtures.products.shared() for _ in range(fixtures.SHARED_PRODUCTS)])
+    proxy = None
+    if args.faults:
+        # Installed after setup so logins and shared products are not subject to the faults
+        try:
+            proxy = faultproxy.install(faultproxy.load_rules(args.faults), args.seed)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+
+    monitor = None
+    if args.sample_pid:
+        try:
+            monitor = sampler.Sampler(args.sample_pid).start()
+        except RuntimeError as e:
+            parser.error(str(e))
+    try:
+        checker = None if args.no_contracts else contracts.default()
+        report = asyncio.run(run_open_loop(schedule, args.mix, ctx, args.max_in_flight, args.seed, checker))
+    finally:
+        with sampler.phase("cleanup"):
+            cleanup(ctx)
+        if monitor:
+            monitor.stop()
+    report.update({"profile": label, "target_duration_s": args.duration, "mix": args.mix})
+    print_report(report)
+    if proxy:
+        report["faults"] = proxy.report()
+        faultproxy.print_report(report["faults"])
+    if monitor:
+        resources = monitor.report()
+        report["resources"] = {key: resources[key] for key in ("overall", "phases")}
+        sampler.write_report(resources)
+        sampler.print_report(resources)
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,326 @@
+import argparse
+import asyncio
+import hashlib
+import hmac
+import itertools
+import json
+import os
+import random
+import string
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+
+import client
+import latency
+from loadgen import Pacer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CORPUS_PATH = os.path.join(HERE, "tmp", "payment_corpus.jsonl")
+REPORT_PATH = os.path.join(HERE, "tmp", "payment_report.json")
+VERIFY_PATH = "/api/order/verify-payment"
+RAZORPAY_KEY_SECRET = os.getenv("RAZORPAY_KEY_SECRET", "test_secret")
+BATCH_SIZE = 10000
+DEFAULT_MIX = {"valid": 8, "tampered": 1, "malformed": 1}
+# verifyPayment rejects a request without an address before it looks at the signature
+BASE_PAYLOAD = {
+    "address": {
+        "fullName": "Payment Benchmark",
+        "phone": "9999999999",
+        "street": "1 Benchmark Street",
+        "city": "Bengaluru",
+        "state": "Karnataka",
+        "pincode": "560001",
+    },
+    "products": [],
+}
+_ID_ALPHABET = string.ascii_letters + string.digits
+
+
+def sign(order_id, payment_id, secret=RAZORPAY_KEY_SECRET):
+    """Razorpay checkout signature: hex HMAC-SHA256 of "order_id|payment_id"."""
+    return hmac.new(secret.encode(), f"{order_id}|{payment_id}".encode(), hashlib.sha256).hexdigest()
+
+
+def _razorpay_id(prefix, rng):
+    return prefix + "".join(rng.choices(_ID_ALPHABET, k=14))
+
+
+def _flip_hex(signature, rng):
+    i = rng.randrange(len(signature))
+    return signature[:i] + rng.choice([c for c in "0123456789abcdef" if c != signature[i]]) + signature[i + 1:]
+
+
+def _tampered(order_id, payment_id, secret, rng):
+    signature = sign(order_id, payment_id, secret)
+    variant = rng.choice(("flipped_char", "swapped_payment", "swapped_order", "wrong_secret", "uppercase"))
+    if variant == "flipped_char":
+        signature = _flip_hex(signature, rng)
+    elif variant == "swapped_payment":
+        payment_id = _razorpay_id("pay_", rng)
+    elif variant == "swapped_order":
+        order_id = _razorpay_id("order_", rng)
+    elif variant == "wrong_secret":
+        signature = sign(order_id, payment_id, secret + "x")
+    else:
+        signature = signature.upper()
+    return variant, {"razorpay_order_id": order_id, "razorpay_payment_id": payment_id, "razorpay_signature": signature}
+
+
+def _malformed(order_id, payment_id, secret, rng):
+    signature = sign(order_id, payment_id, secret)
+    payload = {"razorpay_order_id": order_id, "razorpay_payment_id": payment_id, "razorpay_signature": signature}
+    variant = rng.choice(("missing_field", "null_fields", "empty_signature", "truncated", "non_hex", "numeric"))
+    if variant == "missing_field":
+        del payload[rng.choice(list(payload))]
+    elif variant == "null_fields":
+        payload = dict.fromkeys(payload)
+    elif variant == "empty_signature":
+        payload["razorpay_signature"] = ""
+    elif variant == "truncated":
+        payload["razorpay_signature"] = signature[:rng.randrange(1, len(signature))]
+    elif variant == "non_hex":
+        payload["razorpay_signature"] = "".join(rng.choices("ghijklmnopqrstuvwxyz!@#", k=len(signature)))
+    else:
+        payload["razorpay_signature"] = rng.randrange(10 ** 12)
+    return variant, payload
+
+
+def generate_batch(seed, count, secret=RAZORPAY_KEY_SECRET, mix=None):
+    """Return `count` corpus entries: {"kind", "variant", "payload"}. Deterministic per seed."""
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    kinds, weights = list(mix), list(mix.values())
+    entries = []
+    for kind in rng.choices(kinds, weights, k=count):
+        order_id, payment_id = _razorpay_id("order_", rng), _razorpay_id("pay_", rng)
+        if kind == "valid":
+            variant = "valid"
+            payload = {"razorpay_order_id": order_id, "razorpay_payment_id": payment_id,
+                       "razorpay_signature": sign(order_id, payment_id, secret)}
+        elif kind == "tampered":
+            variant, payload = _tampered(order_id, payment_id, secret, rng)
+        else:
+            variant, payload = _malformed(order_id, payment_id, secret, rng)
+        entries.append({"kind": kind, "variant": variant, "payload": payload})
+    return entries
+
+
+def generate_corpus(count, workers=None, secret=RAZORPAY_KEY_SECRET, mix=None, seed=0):
+    """Build `count` entries in BATCH_SIZE batches spread over worker processes."""
+    sizes = [min(BATCH_SIZE, count - start) for start in range(0, count, BATCH_SIZE)]
+    seeds = [seed * 1_000_003 + n for n in range(len(sizes))]
+    if workers == 1 or len(sizes) == 1:
+        batches = map(generate_batch, seeds, sizes, itertools.repeat(secret), itertools.repeat(mix))
+        return [entry for batch in batches for entry in batch]
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool:
+        batches = pool.map(generate_batch, seeds, sizes, itertools.repeat(secret), itertools.repeat(mix))
+        return [entry for batch in batches for entry in batch]
+
+
+def write_corpus(entries, path=CORPUS_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+
+def load_corpus(path=CORPUS_PATH):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class Tally:
+    """Accept/reject counts and latency per corpus kind; mergeable across processes."""
+
+    def __init__(self):
+        self.kinds = {}
+
+    def _row(self, kind):
+        return self.kinds.setdefault(kind, {"count": 0, "accepted": 0, "rejected": 0, "errors": 0, "statuses": {},
+                                            "unexpected": {}, "latency": latency.Histogram()})
+
+    def add(self, entry, status, elapsed):
+        row = self._row(entry["kind"])
+        row["count"] += 1
+        row["statuses"][str(status)] = row["statuses"].get(str(status), 0) + 1
+        if status is None:
+            row["errors"] += 1
+            return
+        row["latency"].record(elapsed)
+        accepted = status == 200
+        row["accepted" if accepted else "rejected"] += 1
+        if accepted != (entry["kind"] == "valid"):
+            row["unexpected"][entry["variant"]] = row["unexpected"].get(entry["variant"], 0) + 1
+
+    def to_dict(self):
+        return {kind: dict(row, latency=row["latency"].to_dict()) for kind, row in self.kinds.items()}
+
+    @classmethod
+    def from_dict(cls, data):
+        tally = cls()
+        for kind, row in data.items():
+            tally.kinds[kind] = dict(row, latency=latency.Histogram.from_dict(row["latency"]))
+        return tally
+
+    def merge(self, other):
+        for kind, row in other.kinds.items():
+            target = self._row(kind)
+            for key in ("count", "accepted", "rejected", "errors"):
+                target[key] += row[key]
+            for key in ("statuses", "unexpected"):
+                for name, count in row[key].items():
+                    target[key][name] = target[key].get(name, 0) + count
+            target["latency"].merge(row["latency"])
+        return self
+
+
+async def _verifier(entries, tally, pacer, headers):
+    for entry in entries:
+        await pacer.wait()
+        start = time.perf_counter()
+        try:
+            response = await asyncio.to_thread(client.post, VERIFY_PATH, json=dict(BASE_PAYLOAD, **entry["payload"]),
+                                               headers=headers)
+            status = response.status_code
+        except Exception:
+            status = None
+        tally.add(entry, status, time.perf_counter() - start)
+
+
+async def drive(entries, concurrency, rps=0, token=None):
+    """Post every entry with `concurrency` in-flight requests; returns (Tally, seconds)."""
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="verify"))
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    tally, pacer, shared = Tally(), Pacer(rps), iter(entries)
+    start = time.perf_counter()
+    await asyncio.gather(*(_verifier(shared, tally, pacer, headers) for _ in range(concurrency)))
+    return tally, time.perf_counter() - start
+
+
+def _drive_slice(base_url, entries, concurrency, rps, token):
+    client.BASE_URL = base_url
+    client.configure(pool_size=concurrency, retries=0)
+    tally, seconds = asyncio.run(drive(entries, concurrency, rps, token))
+    return tally.to_dict(), seconds
+
+
+def run_benchmark(entries, concurrency=64, processes=1, rps=0, token=None):
+    """Split the corpus across processes (each with its own pool) and merge their tallies."""
+    if processes <= 1:
+        tally, seconds = asyncio.run(drive(entries, concurrency, rps, token))
+    else:
+        slices = [entries[n::processes] for n in range(processes)]
+        with ProcessPoolExecutor(max_workers=processes, mp_context=get_context("spawn")) as pool:
+            start = time.perf_counter()
+            futures = [pool.submit(_drive_slice, client.BASE_URL, part, concurrency, rps / processes, token)
+                       for part in slices]
+            tally = Tally()
+            for future in futures:
+                tally.merge(Tally.from_dict(future.result()[0]))
+            seconds = time.perf_counter() - start
+    return report(tally, seconds, concurrency * max(1, processes))
+
+
+def report(tally, seconds, in_flight):
+    overall = latency.Histogram()
+    for row in tally.kinds.values():
+        overall.merge(row["latency"])
+    kinds = {kind: dict(row, latency_ms=row["latency"].summary()) for kind, row in tally.kinds.items()}
+    for row in kinds.values():
+        del row["latency"]
+    answered = overall.count
+    return {
+        "duration_s": seconds,
+        "in_flight": in_flight,
+        "requests": sum(row["count"] for row in kinds.values()),
+        "verifications_per_s": answered / seconds if seconds else 0.0,
+        "accepted": sum(row["accepted"] for row in kinds.values()),
+        "rejected": sum(row["rejected"] for row in kinds.values()),
+        "errors": sum(row["errors"] for row in kinds.values()),
+        "unexpected": sum(sum(row["unexpected"].values()) for row in kinds.values()),
+        "latency_ms": overall.summary(),
+        "kinds": kinds,
+    }
+
+
+def print_report(report):
+    print(f"{report['requests']} verifications in {report['duration_s']:.1f}s "
+          f"({report['verifications_per_s']:.1f}/s, {report['in_flight']} in flight)")
+    print(f"accepted {report['accepted']}  rejected {report['rejected']}  errors {report['errors']}  "
+          f"unexpected {report['unexpected']}")
+    print(f"{'kind':<12}{'count':>8}{'accept':>8}{'reject':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for kind, row in sorted(report["kinds"].items()):
+        ms = row["latency_ms"]
+        print(f"{kind:<12}{row['count']:>8}{row['accepted']:>8}{row['rejected']:>8}"
+              f"{ms.get('p50_ms', 0):>9.1f}{ms.get('p95_ms', 0):>9.1f}{ms.get('p99_ms', 0):>9.1f}{ms.get('max_ms', 0):>9.1f}")
+    for kind, row in sorted(report["kinds"].items()):
+        if row["unexpected"]:
+            print(f"UNEXPECTED {kind}: {row['unexpected']}")
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"unknown kind {name!r}; choose from {', '.join(DEFAULT_MIX)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Generate Razorpay signature corpora and drive /api/order/verify-payment with them. "
+                    "Valid signatures create orders on the real backend: point it at a disposable database."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    generate = commands.add_parser("generate", help="write a signature corpus as JSON lines")
+    generate.add_argument("-n", "--count", type=int, default=100000)
+    generate.add_argument("-o", "--output", default=CORPUS_PATH)
+    bench = commands.add_parser("bench", help="verify a corpus against the backend")
+    bench.add_argument("--corpus", help="JSON lines from `generate`; built in memory when omitted")
+    bench.add_argument("-n", "--count", type=int, default=100000, help="entries to build without --corpus")
+    bench.add_argument("-c", "--concurrency", type=int, default=64, help="in-flight requests per process")
+    bench.add_argument("-p", "--processes", type=int, default=1, help="client processes sharing the corpus")
+    bench.add_argument("-r", "--rps", type=float, default=0.0, help="target total rate; 0 = unthrottled")
+    bench.add_argument("--token", default=os.getenv("TESTSPRITE_TOKEN"), help="JWT for the protect middleware")
+    bench.add_argument("-o", "--output", default=REPORT_PATH)
+    bench.add_argument("--stub", action="store_true", help="run against the in-process stub backend")
+    for sub in (generate, bench):
+        sub.add_argument("-w", "--workers", type=int, default=os.cpu_count(), help="corpus generator processes")
+        sub.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="e.g. valid=8,tampered=1,malformed=1")
+        sub.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.command == "generate" or not args.corpus:
+        start = time.perf_counter()
+        entries = generate_corpus(args.count, args.workers, RAZORPAY_KEY_SECRET, args.mix, args.seed)
+        print(f"generated {len(entries)} signatures in {time.perf_counter() - start:.1f}s")
+        if args.command == "generate":
+            write_corpus(entries, args.output)
+            return 0
+    else:
+        entries = load_corpus(args.corpus)
+
+    if args.stub:
+        if args.processes > 1:
+            parser.error("--stub runs in this process; use -c rather than -p to add load")
+        from stub_server import StubServer
+
+        client.BASE_URL = StubServer().start_in_thread().url
+
+    client.configure(pool_size=args.concurrency, retries=0)
+    result = run_benchmark(entries, args.concurrency, args.processes, args.rps, args.token)
+    print_report(result)
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    return 1 if result["unexpected"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
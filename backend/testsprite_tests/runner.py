@@ -0,0 +1,435 @@
+import argparse
+import ast
+import asyncio
+import glob
+import json
+import os
+import re
+import sys
+import time
+import traceback
+import uuid
+from collections import defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+from datetime import datetime, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+import cache  # noqa: E402
+import client  # noqa: E402
+import contracts  # noqa: E402
+import faultproxy  # noqa: E402
+import fixtures  # noqa: E402
+import history  # noqa: E402
+import latency  # noqa: E402
+import sampler  # noqa: E402
+import slo  # noqa: E402
+import traffic  # noqa: E402
+
+PLAN_PATH = os.path.join(HERE, "testsprite_backend_test_plan.json")
+RESULTS_PATH = os.path.join(HERE, "tmp", "test_results.json")
+CONFIG_PATH = os.path.join(HERE, "tmp", "config.json")
+CASE_PATTERN = "TC*.py"
+CONCURRENCY = int(os.getenv("TESTSPRITE_CONCURRENCY", "8"))
+WORKERS = int(os.getenv("TESTSPRITE_WORKERS", "1"))
+# Process-wide singletons that can only live in one shard when running against a real backend,
+# keyed by the modules that use them (auth logs virtual users in through the mail sink)
+SHARD_AFFINITY_MODULES = {"mail_sink": "mail_sink", "auth": "mail_sink"}
+EMAIL_RE = re.compile(r"^[\w.+-]+@[\w-]+(\.[\w-]+)+$")
+
+Case = namedtuple(
+    "Case",
+    ["test_id", "title", "description", "path", "func_name", "fixtures", "code", "performance", "affinity", "faults",
+     "contracts"],
+)
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def load_plan(path=PLAN_PATH):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _plan_index(plan):
+    return {(entry["id"], entry["title"].strip().lower()): entry for entry in plan}
+
+
+def _is_top_level_test_call(node):
+    return (
+        isinstance(node, ast.Expr)
+        and isinstance(node.value, ast.Call)
+        and isinstance(node.value.func, ast.Name)
+        and node.value.func.id.startswith("test_")
+    )
+
+
+def _shared_fixtures(tree):
+    # Hard-coded accounts (e.g. "testuser@example.com") are shared server-side state
+    return frozenset(
+        node.value
+        for node in ast.walk(tree)
+        if isinstance(node, ast.Constant) and isinstance(node.value, str) and EMAIL_RE.match(node.value)
+    )
+
+
+def _affinity(tree, fixtures):
+    imported = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imported.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            imported.add(node.module)
+    return fixtures | frozenset(key for name, key in SHARD_AFFINITY_MODULES.items() if name in imported)
+
+
+def discover(root=HERE, pattern=CASE_PATTERN, plan=None):
+    """Find test_* functions in the TC scripts without running their module-level calls."""
+    plan_index = _plan_index(plan if plan is not None else load_plan())
+    cases = []
+    for path in sorted(glob.glob(os.path.join(root, pattern))):
+        with open(path, encoding="utf-8") as f:
+            code = f.read()
+        tree = ast.parse(code, filename=path)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        test_id, _, rest = stem.partition("_")
+        title = rest.replace("_", " ")
+        entry = plan_index.get((test_id, title.lower()), {})
+        fixtures = _shared_fixtures(tree)
+        for node in tree.body:
+            if isinstance(node, ast.FunctionDef) and node.name.startswith("test_"):
+                cases.append(Case(
+                    test_id, f"{test_id}-{title}", entry.get("description", ""), path, node.name, fixtures, code,
+                    entry.get("performance"), _affinity(tree, fixtures), entry.get("faults", []),
+                    entry.get("contracts", []),
+                ))
+    return cases
+
+
+def load_case(case):
+    tree = ast.parse(case.code, filename=case.path)
+    tree.body = [node for node in tree.body if not _is_top_level_test_call(node)]
+    namespace = {"__name__": "testsprite_" + os.path.splitext(os.path.basename(case.path))[0], "__file__": case.path}
+    exec(compile(tree, case.path, "exec"), namespace)
+    return namespace[case.func_name]
+
+
+def run_case(case, repeat=1):
+    """Run one case synchronously `repeat` times and return (status, error, durations)."""
+    client.current_tag.set(case.title)
+    durations = []
+    try:
+        test = load_case(case)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            test()
+            durations.append(time.perf_counter() - start)
+    except Exception:
+        return "FAILED", traceback.format_exc(), durations
+    return "PASSED", None, durations
+
+
+def _project_id():
+    try:
+        with open(CONFIG_PATH, encoding="utf-8") as f:
+            name = json.load(f)["executionArgs"]["projectName"]
+    except (OSError, KeyError, ValueError):
+        name = "backend"
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, "testsprite:" + name))
+
+
+def case_uuid(case):
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, "testsprite:" + os.path.basename(case.path) + ":" + case.func_name))
+
+
+def make_result(case, status, error, created, modified, project_id=None):
+    return {
+        "projectId": project_id or _project_id(),
+        "testId": case_uuid(case),
+        "userId": os.getenv("TESTSPRITE_USER_ID", "local"),
+        "title": case.title,
+        "description": case.description,
+        "code": case.code,
+        "testStatus": status,
+        "testError": error,
+        "testType": "BACKEND",
+        "createFrom": "local",
+        "created": created,
+        "modified": modified,
+    }
+
+
+def _repeat_for(case, repeat):
+    if repeat:
+        return repeat
+    return (case.performance or {}).get("repeat", 1)
+
+
+async def _run_one(case, semaphore, locks, project_id, repeat):
+    # Cases that share a fixture serialize on it; locks are taken in sorted order to avoid deadlock
+    held = [locks[key] for key in sorted(case.fixtures)]
+    async with semaphore:
+        for lock in held:
+            await lock.acquire()
+        try:
+            created = _now()
+            with sampler.phase(case.title):
+                status, error, durations = await asyncio.to_thread(run_case, case, _repeat_for(case, repeat))
+            return make_result(case, status, error, created, _now(), project_id), durations
+        finally:
+            for lock in reversed(held):
+                lock.release()
+
+
+async def run_cases(cases, concurrency=CONCURRENCY, repeat=None):
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="testsprite"))
+    semaphore = asyncio.Semaphore(concurrency)
+    locks = {key: asyncio.Lock() for case in cases for key in case.fixtures}
+    project_id = _project_id()
+    checker = client.add_listener(contracts.Checker())
+    try:
+        with client.collecting():
+            outcomes = await asyncio.gather(*(_run_one(case, semaphore, locks, project_id, repeat) for case in cases))
+    finally:
+        client.remove_listener(checker)
+        with sampler.phase("teardown"):
+            await asyncio.to_thread(fixtures.products.teardown)
+    results = [result for result, _ in outcomes]
+    routes = attach_latency(results, client.drain_timings())
+    for case, (result, durations) in zip(cases, outcomes):
+        enforce_contracts(case, result, checker)
+        enforce_performance(case, result, durations, routes[result["title"]])
+    return results
+
+
+def attach_latency(results, timings):
+    """Add per-route DNS/connect/TTFB/total histograms to each result, keyed by case title."""
+    by_case = {}
+    for timing in timings:
+        by_case.setdefault(timing.tag, []).append(timing)
+    routes = {}
+    for result in results:
+        routes[result["title"]] = latency.histograms_from_timings(by_case.get(result["title"], []))
+        result["latency"] = latency.routes_to_dict(routes[result["title"]])
+    return routes
+
+
+def attach_resources(results, report):
+    """Add the backend CPU/RSS/fd/event-loop figures sampled while each case ran."""
+    for result in results:
+        if result["title"] in report["phases"]:
+            result["resources"] = report["phases"][result["title"]]
+
+
+def enforce_contracts(case, result, checker):
+    """Fail a functionally passing case that broke a response contract or skipped a route its plan entry lists."""
+    checked, violations = checker.results(case.title)
+    violations += [f"{route}: no response checked against a contract" for route in case.contracts if not checked.get(route)]
+    if checked or violations:
+        result["contracts"] = {"checked": checked, "violations": violations}
+    if violations and result["testStatus"] == "PASSED":
+        result["testStatus"] = "FAILED"
+        result["testError"] = "Response contract violated:\n" + "\n".join(violations)
+
+
+def enforce_performance(case, result, durations, routes):
+    """Fail a functionally passing case whose plan entry declares budgets it did not meet."""
+    if not case.performance:
+        return
+    measurements, violations = slo.check(case.performance, durations, routes)
+    result["performance"] = dict(measurements, violations=violations)
+    if violations and result["testStatus"] == "PASSED":
+        result["testStatus"] = "FAILED"
+        result["testError"] = "Performance budget exceeded:\n" + "\n".join(violations)
+
+
+def write_results(results, path=RESULTS_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+def plan_shards(cases, workers):
+    """Split cases into at most `workers` shards; cases sharing a fixture or singleton stay together."""
+    parent = list(range(len(cases)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    first_owner = {}
+    for i, case in enumerate(cases):
+        for key in case.affinity:
+            if key in first_owner:
+                parent[find(i)] = find(first_owner[key])
+            else:
+                first_owner[key] = i
+    groups = defaultdict(list)
+    for i in range(len(cases)):
+        groups[find(i)].append(i)
+
+    shards = [[] for _ in range(max(1, workers))]
+    for group in sorted(groups.values(), key=lambda g: (-len(g), g[0])):
+        min(shards, key=len).extend(group)
+    return [[cases[i] for i in sorted(shard)] for shard in shards if shard]
+
+
+def start_stub():
+    """Start the stub backend and a private mail sink in this process and point the client at it."""
+    import auth
+    import mail_sink
+    from stub_server import StubBackend, StubServer
+
+    sink = mail_sink.get_sink(smtp_port=0, api_port=0)
+    client.BASE_URL = StubServer(StubBackend(mailer=sink.deliver)).start_in_thread().url
+    # Stub tokens die with the stub, so there is nothing worth caching on disk
+    auth.users.cache_path = None
+    return client.BASE_URL
+
+
+def fault_rules(cases, path=None):
+    """Rules from the plan entries' "faults" (pinned to their case) followed by those in `path`."""
+    rules = [rule for case in cases for rule in faultproxy.parse_rules(case.faults, case=case.title)]
+    return rules + (faultproxy.load_rules(path) if path else [])
+
+
+def _run_shard(cases, concurrency, repeat, base_url, stub, capture=None, faults=None):
+    # Runs in a worker process: it gets its own connection pool, stub, mail sink and fault proxy
+    if stub:
+        start_stub()
+    elif base_url:
+        client.BASE_URL = base_url
+    if capture:
+        traffic.Recorder(capture).install()
+    if faults is not None:
+        faultproxy.install(faults)
+    return asyncio.run(run_cases(cases, concurrency, repeat))
+
+
+def run_sharded(cases, workers, concurrency=CONCURRENCY, repeat=None, stub=False, capture=None, faults=None):
+    """Run shards in a process pool and merge their results into one deterministic list."""
+    shards = plan_shards(cases, workers)
+    with ProcessPoolExecutor(max_workers=len(shards), mp_context=get_context("spawn")) as pool:
+        futures = [pool.submit(_run_shard, shard, concurrency, repeat, client.BASE_URL, stub, capture, faults)
+                   for shard in shards]
+        results = [result for future in futures for result in future.result()]
+    return sorted(results, key=lambda result: (result["title"], result["testId"]))
+
+
+def reuse_cached(cases, result_cache, repeat=None):
+    """Split cases into ({testId: cached result}, cases that must run), saying why each one runs."""
+    cached, pending = {}, []
+    for case in cases:
+        result, reason = result_cache.lookup(case_uuid(case), case, repeat)
+        if result is None:
+            print(f"run     {case.title} ({reason})")
+            pending.append(case)
+        else:
+            cached[case_uuid(case)] = dict(result, cache={"hit": True, "cachedAt": result["modified"]})
+    return cached, pending
+
+
+def select(cases, only):
+    if not only:
+        return cases
+    return [case for case in cases if case.test_id in only or case.title in only]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the testsprite backend cases concurrently.")
+    parser.add_argument("only", nargs="*", help="test ids (TC001) or full titles to run; default all")
+    parser.add_argument("-c", "--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("-o", "--output", default=RESULTS_PATH)
+    parser.add_argument("--pattern", default=CASE_PATTERN)
+    parser.add_argument("--repeat", type=int, help="run each case N times (default: plan \"repeat\" or 1)")
+    parser.add_argument("--stub", action="store_true", help="run against the in-process stub backend")
+    parser.add_argument("-w", "--workers", type=int, default=WORKERS, help="worker processes; 0 = one per CPU")
+    parser.add_argument("--capture", metavar="LOG", help="append every request to LOG for traffic.py replay")
+    parser.add_argument("--sample-pid", type=sampler.parse_pid, metavar="PID",
+                        help="sample this backend process (\"self\" with --stub) and attribute it per case")
+    parser.add_argument("--sample-interval", type=float, default=sampler.INTERVAL, help="seconds between samples")
+    parser.add_argument("--incremental", action="store_true",
+                        help="reuse cached passing results of cases whose code, plan entry and backend files are unchanged")
+    parser.add_argument("--no-history", action="store_true", help="do not append this run to the history store")
+    parser.add_argument("--faults", nargs="?", const="", metavar="RULES",
+                        help="route through faultproxy with the plan's per-case faults plus the rules in RULES")
+    args = parser.parse_args(argv)
+    if args.incremental and args.faults is not None:
+        parser.error("--incremental results are only valid without injected faults; drop one of them")
+
+    selected = cases = select(discover(pattern=args.pattern), args.only)
+    target = "stub" if args.stub else client.BASE_URL
+    result_cache, cached = None, {}
+    if args.incremental:
+        result_cache = cache.ResultCache(target=target)
+        cached, cases = reuse_cached(cases, result_cache, args.repeat)
+    faults = None
+    if args.faults is not None:
+        try:
+            faults = fault_rules(cases, args.faults)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+    workers = args.workers or os.cpu_count() or 1
+    if args.sample_pid and workers > 1:
+        parser.error("--sample-pid needs --workers 1: cases are tagged in the process that runs them")
+    monitor = proxy = None
+    if not cases:
+        results = []
+    elif workers > 1:
+        results = run_sharded(cases, workers, args.concurrency, args.repeat, args.stub, args.capture, faults)
+    else:
+        if args.stub:
+            start_stub()
+        if args.capture:
+            traffic.Recorder(args.capture).install()
+        if faults is not None:
+            proxy = faultproxy.install(faults)
+        if args.sample_pid:
+            monitor = sampler.Sampler(args.sample_pid, args.sample_interval)
+            try:
+                monitor.start()
+            except RuntimeError as e:
+                parser.error(str(e))
+        try:
+            results = asyncio.run(run_cases(cases, args.concurrency, args.repeat))
+        finally:
+            if monitor:
+                monitor.stop()
+    if monitor:
+        report = monitor.report()
+        attach_resources(results, report)
+        sampler.write_report(report)
+    if result_cache:
+        by_id = {result["testId"]: result for result in results}
+        for case in cases:
+            result_cache.store(case_uuid(case), case, by_id[case_uuid(case)], args.repeat)
+        result_cache.save()
+        results = [cached.get(case_uuid(case)) or by_id[case_uuid(case)] for case in selected]
+    write_results(results, args.output)
+    # Injected faults are in the histograms; such runs would read as regressions against clean ones
+    if not args.no_history and faults is None:
+        config = {"concurrency": args.concurrency, "workers": workers, "repeat": args.repeat, "pattern": args.pattern}
+        history.record_run(results, target, config)
+
+    failed = 0
+    for result in results:
+        print(f"{result['testStatus']:<7} {result['title']}" + (" (cached)" if "cache" in result else ""))
+        failed += result["testStatus"] != "PASSED"
+    print(f"{len(results) - failed}/{len(results)} passed")
+    if monitor:
+        sampler.print_report(report)
+    if proxy:
+        faultproxy.print_report(proxy.report())
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict, namedtuple
+from contextlib import contextmanager
+
+import client
+import latency
+
+REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tmp", "resource_report.json")
+INTERVAL = float(os.getenv("TESTSPRITE_SAMPLE_INTERVAL", "0.05"))
+PROBE_INTERVAL = float(os.getenv("TESTSPRITE_PROBE_INTERVAL", "0.25"))
+# Served by server.js from perf_hooks.monitorEventLoopDelay when started with ENABLE_LOOP_PROBE=true;
+# admin-only, and each read returns the last closed window. Without it, probe RTT is the only lag signal
+PROBE_PATH = "/health/loop"
+ADMIN_TOKEN = os.getenv("TESTSPRITE_ADMIN_TOKEN")
+PROBE_TIMEOUT = 10
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+MB = 1024 * 1024
+# A phase is flagged when it grows RSS by this much, delays the event loop this long, or keeps
+# the process at this CPU share for at least half of its samples
+RSS_GROWTH_MB = 16
+LOOP_LAG_MS = 100
+CPU_SATURATED_PCT = 90
+
+Sample = namedtuple("Sample", ["t", "cpu_pct", "rss", "fds", "sockets", "threads", "phases"])
+Probe = namedtuple("Probe", ["t", "rtt", "delay_mean_ms", "delay_max_ms", "heap_used", "phases"])
+
+_phases = Counter()
+_phases_lock = threading.Lock()
+
+
+@contextmanager
+def phase(name):
+    """Tag every sample taken while the block runs with `name`; phases may overlap and nest.
+
+    A process-wide set rather than client.current_tag, because the sampler threads cannot see
+    the context variables of the threads running the cases.
+    """
+    with _phases_lock:
+        _phases[name] += 1
+    try:
+        yield
+    finally:
+        with _phases_lock:
+            _phases[name] -= 1
+            if not _phases[name]:
+                del _phases[name]
+
+
+def active_phases():
+    with _phases_lock:
+        return tuple(sorted(_phases))
+
+
+def read_proc(pid):
+    """(CPU ticks, RSS bytes, open fds, sockets, threads) of `pid`, or None once it has exited."""
+    try:
+        with open(f"/proc/{pid}/stat", encoding="ascii", errors="replace") as f:
+            # comm may contain spaces and parentheses; the fields after the last ")" are fixed
+            fields = f.read().rsplit(")", 1)[1].split()
+        rss = 0
+        with open(f"/proc/{pid}/status", encoding="ascii", errors="replace") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    rss = int(line.split()[1]) * 1024
+                    break
+        fds = sockets = 0
+        for fd in os.listdir(f"/proc/{pid}/fd"):
+            fds += 1
+            try:
+                sockets += os.readlink(f"/proc/{pid}/fd/{fd}").startswith("socket:")
+            except OSError:
+                pass  # closed between listdir and readlink
+    except (OSError, IndexError, ValueError):
+        return None
+    # utime and stime are fields 14 and 15 of stat, num_threads is field 20
+    return int(fields[11]) + int(fields[12]), rss, fds, sockets, int(fields[17])
+
+
+class Sampler:
+    """Poll a backend process's /proc entries and event-loop probe on background threads.
+
+    CPU is derived from utime+stime deltas, so at the default 50ms interval it moves in steps
+    of 100 / (CLOCK_TICKS * interval) percent; it can exceed 100 when libuv's pool is busy.
+    """
+
+    def __init__(self, pid, interval=INTERVAL, probe_path=PROBE_PATH, probe_interval=PROBE_INTERVAL,
+                 token=ADMIN_TOKEN):
+        self.pid = pid
+        self.headers = {"Authorization": f"Bearer {token}"} if token else {}
+        self.interval = interval
+        self.probe_path = probe_path
+        self.probe_interval = probe_interval
+        self.samples = []
+        self.probes = []
+        self.probe_errors = 0
+        self.exited_at = None
+        self._stop = threading.Event()
+        self._threads = []
+        self._start = None
+
+    def start(self):
+        if read_proc(self.pid) is None:
+            raise RuntimeError(f"cannot read /proc/{self.pid}; is the backend running under that PID?")
+        self._start = time.monotonic()
+        loops = [self._sample_loop] + ([self._probe_loop] if self.probe_path else [])
+        for loop in loops:
+            thread = threading.Thread(target=loop, name=f"sampler-{loop.__name__.strip('_')}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _sample_loop(self):
+        previous = None
+        due = time.monotonic()
+        while not self._stop.is_set():
+            now = time.monotonic()
+            stats = read_proc(self.pid)
+            if stats is None:
+                self.exited_at = now - self._start
+                return
+            ticks, rss, fds, sockets, threads = stats
+            if previous is not None:
+                cpu = (ticks - previous[1]) / CLOCK_TICKS / (now - previous[0]) * 100
+                self.samples.append(Sample(now - self._start, cpu, rss, fds, sockets, threads, active_phases()))
+            previous = now, ticks
+            due += self.interval
+            self._stop.wait(max(0.0, due - time.monotonic()))
+
+    def _probe_loop(self):
+        # Straight through the session so probes stay out of the case timings and traffic captures
+        session = client.get_session()
+        url = client.url_for(self.probe_path)
+        while not self._stop.wait(self.probe_interval):
+            phases = active_phases()
+            sent = time.monotonic()
+            try:
+                response = session.get(url, headers=self.headers, timeout=PROBE_TIMEOUT)
+                body = response.json() if response.status_code == 200 else {}
+            except Exception:
+                self.probe_errors += 1
+                continue
+            self.probes.append(Probe(sent - self._start, time.monotonic() - sent, body.get("meanMs"),
+                                     body.get("maxMs"), body.get("heapUsed"), phases))
+
+    def attribute(self):
+        """{phase: figures} from the samples and probes taken while each phase was running."""
+        samples, probes = defaultdict(list), defaultdict(list)
+        for sample in self.samples:
+            for name in sample.phases:
+                samples[name].append(sample)
+        for probe in self.probes:
+            for name in probe.phases:
+                probes[name].append(probe)
+        return {name: summarize(rows, probes.get(name, [])) for name, rows in sorted(samples.items())}
+
+    def report(self):
+        overall = summarize(self.samples, self.probes)
+        overall.update(pid=self.pid, interval_s=self.interval, probe_path=self.probe_path,
+                       probe_errors=self.probe_errors, exited_at_s=self.exited_at)
+        return {
+            "overall": overall,
+            "phases": self.attribute(),
+            "samples": [sample._asdict() for sample in self.samples],
+            "probes": [probe._asdict() for probe in self.probes],
+        }
+
+
+def summarize(samples, probes):
+    if not samples:
+        return {"samples": 0, "flags": []}
+    cpu = [sample.cpu_pct for sample in samples]
+    first, last = samples[0], samples[-1]
+    rtt = latency.Histogram()
+    for probe in probes:
+        rtt.record(probe.rtt)
+    delays = [probe.delay_max_ms for probe in probes if probe.delay_max_ms is not None]
+    heap = [probe.heap_used for probe in probes if probe.heap_used is not None]
+    figures = {
+        "samples": len(samples),
+        # Samples in which nothing else was tagged; attribution is only exact for those
+        "solo_samples": sum(len(sample.phases) == 1 for sample in samples),
+        "seconds": last.t - first.t,
+        "cpu_mean_pct": sum(cpu) / len(cpu),
+        "cpu_peak_pct": max(cpu),
+        "rss_start_mb": first.rss / MB,
+        "rss_end_mb": last.rss / MB,
+        "rss_peak_mb": max(sample.rss for sample in samples) / MB,
+        "rss_growth_mb": (last.rss - first.rss) / MB,
+        "fds_peak": max(sample.fds for sample in samples),
+        "fds_growth": last.fds - first.fds,
+        "sockets_peak": max(sample.sockets for sample in samples),
+        "sockets_growth": last.sockets - first.sockets,
+        "threads_peak": max(sample.threads for sample in samples),
+        "probe_ms": rtt.summary(),
+        "loop_delay_max_ms": max(delays) if delays else None,
+        "heap_growth_mb": (heap[-1] - heap[0]) / MB if len(heap) > 1 else None,
+    }
+    flags = []
+    if figures["rss_growth_mb"] >= RSS_GROWTH_MB:
+        flags.append(f"RSS grew {figures['rss_growth_mb']:.1f} MB")
+    lag = max(figures["loop_delay_max_ms"] or 0, rtt.max / 1e3 if rtt.count else 0)
+    if lag >= LOOP_LAG_MS:
+        flags.append(f"event loop blocked up to {lag:.0f} ms")
+    busy = sum(value >= CPU_SATURATED_PCT for value in cpu)
+    if busy * 2 >= len(cpu):
+        flags.append(f"CPU at {CPU_SATURATED_PCT}%+ in {busy}/{len(cpu)} samples")
+    figures["flags"] = flags
+    return figures
+
+
+def print_report(report, limit=None):
+    overall = report["overall"]
+    print(f"pid {overall['pid']}: {overall['samples']} samples, {len(report['probes'])} probes "
+          f"({overall['probe_errors']} failed)" + (f", exited at {overall['exited_at_s']:.1f}s" if overall['exited_at_s'] else ""))
+    if not overall["samples"]:
+        return
+    print(f"{'phase':<48}{'secs':>7}{'cpu avg':>9}{'cpu max':>9}{'rss Δ MB':>10}{'fds Δ':>7}{'socks':>7}{'lag ms':>8}")
+    rows = sorted(report["phases"].items(), key=lambda item: -item[1]["rss_growth_mb"])
+    for name, row in rows[:limit] if limit else rows:
+        lag = row["loop_delay_max_ms"] if row["loop_delay_max_ms"] is not None else row["probe_ms"].get("max_ms", 0)
+        print(f"{name[:47]:<48}{row['seconds']:>7.1f}{row['cpu_mean_pct']:>9.0f}{row['cpu_peak_pct']:>9.0f}"
+              f"{row['rss_growth_mb']:>10.1f}{row['fds_growth']:>7}{row['sockets_peak']:>7}{lag:>8.1f}")
+        for flag in row["flags"]:
+            print(f"{'':>4}{flag}")
+
+
+def write_report(report, path=REPORT_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+
+def parse_pid(value):
+    """A PID, or "self" for this process (the --stub backend runs in-process)."""
+    return os.getpid() if value == "self" else int(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sample a backend process's CPU, RSS, fds and event-loop lag.")
+    parser.add_argument("pid", type=parse_pid, help="backend PID (e.g. pgrep -f 'node server.js')")
+    parser.add_argument("-d", "--duration", type=float, default=60.0, help="seconds")
+    parser.add_argument("-i", "--interval", type=float, default=INTERVAL, help="seconds between /proc samples")
+    parser.add_argument("--probe", default=PROBE_PATH, help="event-loop probe path; empty to skip probing")
+    parser.add_argument("--admin-token", default=ADMIN_TOKEN, help="JWT with the admin role for the probe")
+    parser.add_argument("-o", "--output", default=REPORT_PATH)
+    args = parser.parse_args(argv)
+
+    monitor = Sampler(args.pid, args.interval, args.probe or None, token=args.admin_token)
+    try:
+        monitor.start()
+    except RuntimeError as e:
+        parser.error(str(e))
+    with phase("watch"):
+        time.sleep(args.duration)
+    report = monitor.stop().report()
+    print_report(report)
+    write_report(report, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
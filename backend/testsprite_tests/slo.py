@@ -0,0 +1,46 @@
+import latency
+
+# Budget keys accepted in a plan entry's "performance" block, per case and per endpoint:
+#   {"repeat": 10, "p95_ms": 800, "max_ms": 3000, "min_rps": 1,
+#    "endpoints": {"GET /products/{id}": {"p95_ms": 300, "max_ms": 1000, "min_rps": 2}}}
+PERCENTILE_BUDGETS = {"p50_ms": 50, "p90_ms": 90, "p95_ms": 95, "p99_ms": 99}
+
+
+def _measure(label, histogram, window, budget, violations):
+    measured = {"samples": histogram.count}
+    if not histogram.count:
+        violations.append(f"{label}: no samples collected")
+        return measured
+    for key, pct in PERCENTILE_BUDGETS.items():
+        if key in budget:
+            measured[key] = histogram.percentile(pct) * 1e3
+            if measured[key] > budget[key]:
+                violations.append(f"{label}: {key[:-3]} {measured[key]:.1f}ms exceeds budget {budget[key]}ms")
+    if "max_ms" in budget:
+        measured["max_ms"] = histogram.max / 1e3
+        if measured["max_ms"] > budget["max_ms"]:
+            violations.append(f"{label}: max {measured['max_ms']:.1f}ms exceeds budget {budget['max_ms']}ms")
+    if "min_rps" in budget:
+        measured["rps"] = histogram.count / window if window else 0.0
+        if measured["rps"] < budget["min_rps"]:
+            violations.append(f"{label}: {measured['rps']:.2f} req/s below floor {budget['min_rps']} req/s")
+    return measured
+
+
+def check(performance, durations, routes):
+    """Evaluate a plan "performance" block against case durations and route histograms.
+
+    Returns (measurements, violations); violations is a list of human readable strings.
+    """
+    violations = []
+    window = sum(durations)
+    case_histogram = latency.Histogram()
+    for duration in durations:
+        case_histogram.record(duration)
+    measurements = {"repeat": len(durations), "case": _measure("case", case_histogram, window, performance, violations)}
+    endpoints = {}
+    for route, budget in performance.get("endpoints", {}).items():
+        histogram = routes.get(route, {}).get("total", latency.Histogram())
+        endpoints[route] = _measure(route, histogram, window, budget, violations)
+    measurements["endpoints"] = endpoints
+    return measurements, violations
@@ -0,0 +1,319 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+import uuid
+
+import client
+import latency
+from loadgen import Pacer
+
+try:
+    import socketio
+except ImportError:  # the swarm is optional tooling; the test cases never need it
+    socketio = None
+
+REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tmp", "socket_report.json")
+STATUSES = ("Processing", "Shipped", "Out for Delivery", "Delivered")
+# The admin status route fans a change out as ORDER_LIVE_UPDATE to the order_<id> room and to
+# admin-monitor; PUT /api/order/:id/status only notifies the owner's user room
+STATUS_METHOD, STATUS_PATH = "PATCH", "/api/admin/orders/{id}/status"
+EVENT = "ORDER_LIVE_UPDATE"
+# Notes are swarm-<run>-<seq>; every status change also leaves a Notification with that note
+NOTE_PREFIX = "swarm-"
+ORDER_PATH = "/api/order/{id}"
+NOTIFICATIONS_PATH = "/api/notifications"
+
+
+def rss_bytes(pid="self"):
+    """Resident set size of a process from /proc, or None where /proc is unavailable."""
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+class Swarm:
+    """Many authenticated Socket.IO clients sharing one event loop.
+
+    Every client joins the order room it is assigned; monitors also join admin-monitor. A
+    delivery is matched to the REST call that caused it by the unique note echoed in the event.
+    """
+
+    def __init__(self, url, event=EVENT, path="socket.io", note_prefix=NOTE_PREFIX):
+        self.url = url
+        self.event = event
+        self.path = path
+        self.note_prefix = note_prefix
+        self.clients = []
+        self.connect_errors = {}
+        self.connect_latency = latency.Histogram()
+        self.sent = {}  # note -> perf_counter() just before the REST call
+        self.deliveries = {}  # note -> [perf_counter() per receiving client]
+
+    def _on_event(self, payload):
+        received = time.perf_counter()
+        note = payload.get("note", "") if isinstance(payload, dict) else ""
+        if note.startswith(self.note_prefix):
+            self.deliveries.setdefault(note, []).append(received)
+
+    async def _connect(self, token, order_id, monitor, semaphore):
+        sio = socketio.AsyncClient(reconnection=False)
+        sio.on(self.event, self._on_event)
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await sio.connect(self.url, auth={"token": token}, transports=["websocket"], socketio_path=self.path)
+            except Exception as e:
+                reason = str(e) or type(e).__name__
+                self.connect_errors[reason] = self.connect_errors.get(reason, 0) + 1
+                return
+            self.connect_latency.record(time.perf_counter() - start)
+        if order_id is not None:
+            await sio.emit("JOIN_ORDER_ROOM", order_id)
+        if monitor:
+            await sio.emit("join_monitor")
+        self.clients.append((sio, order_id, monitor))
+
+    async def connect(self, count, tokens, orders, monitors=0, monitor_token=None, concurrency=100):
+        """Open `count` clients (tokens and order rooms assigned round-robin) plus `monitors`."""
+        semaphore = asyncio.Semaphore(concurrency)
+        token_cycle, order_cycle = itertools.cycle(tokens), itertools.cycle(orders)
+        jobs = [self._connect(next(token_cycle), next(order_cycle), False, semaphore) for _ in range(count)]
+        jobs += [self._connect(monitor_token or tokens[0], None, True, semaphore) for _ in range(monitors)]
+        start = time.perf_counter()
+        await asyncio.gather(*jobs)
+        return time.perf_counter() - start
+
+    def expected(self, order_id):
+        return sum(1 for _, joined, monitor in self.clients if joined == order_id or monitor)
+
+    async def disconnect(self):
+        await asyncio.gather(*(sio.disconnect() for sio, _, _ in self.clients), return_exceptions=True)
+
+
+async def _trigger(swarm, order_id, status, note, headers, rest, statuses):
+    swarm.sent[note] = start = time.perf_counter()
+    try:
+        response = await asyncio.to_thread(client.request, STATUS_METHOD, STATUS_PATH.format(id=order_id),
+                                           json={"status": status, "note": note}, headers=headers)
+        code = response.status_code
+    except Exception:
+        code = None
+    rest.record(time.perf_counter() - start)
+    statuses[str(code)] = statuses.get(str(code), 0) + 1
+
+
+def snapshot_statuses(orders, headers):
+    """{order id: status} before the swarm touches them; raises if an order cannot be read."""
+    statuses = {}
+    for order_id in dict.fromkeys(orders):
+        response = client.get(ORDER_PATH.format(id=order_id), headers=headers)
+        if response.status_code != 200:
+            raise RuntimeError(f"cannot read order {order_id} to restore it later: HTTP {response.status_code}")
+        statuses[order_id] = response.json().get("status")
+    return statuses
+
+
+def restore_statuses(statuses, headers, note):
+    """Put every order back in its snapshotted status; returns the ids that could not be restored."""
+    failed = []
+    for order_id, status in statuses.items():
+        try:
+            response = client.request(STATUS_METHOD, STATUS_PATH.format(id=order_id),
+                                      json={"status": status, "note": note}, headers=headers)
+            ok = response.status_code == 200
+        except Exception:
+            ok = False
+        if not ok:
+            failed.append(order_id)
+    return failed
+
+
+def delete_notes(tokens, prefix):
+    """Delete notifications whose note starts with `prefix` from each token's inbox.
+
+    Only the recipient may delete a notification and the list returns the newest 20, so each
+    inbox is paged until no matching note is left. Owners without a token keep theirs.
+    """
+    deleted = 0
+    for token in dict.fromkeys(tokens):
+        headers = {"Authorization": f"Bearer {token}"}
+        while True:
+            response = client.get(NOTIFICATIONS_PATH, headers=headers)
+            if response.status_code != 200:
+                break
+            ours = [n["_id"] for n in response.json() if str(n.get("note", "")).startswith(prefix)]
+            removed = sum(client.delete(f"{NOTIFICATIONS_PATH}/{note_id}", headers=headers).status_code == 200
+                          for note_id in ours)
+            deleted += removed
+            if not removed:
+                break
+    return deleted
+
+
+async def run_swarm(connections, tokens, orders, admin_token, updates=100, rate=10.0, monitors=1,
+                    connect_concurrency=100, grace=5.0, server_pid=None):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    prefix = f"{NOTE_PREFIX}{uuid.uuid4().hex[:12]}-"
+    original = await asyncio.to_thread(snapshot_statuses, orders, headers)
+    try:
+        report = await _swarm(connections, tokens, orders, admin_token, updates, rate, monitors,
+                              connect_concurrency, grace, server_pid, prefix)
+    finally:
+        failed = await asyncio.to_thread(restore_statuses, original, headers, f"{prefix}restore")
+        deleted = await asyncio.to_thread(delete_notes, tokens, prefix)
+    report["cleanup"] = {
+        "note_prefix": prefix,
+        "orders_restored": len(original) - len(failed),
+        "restore_failed": failed,
+        # One per status change, including the restores
+        "notes_created": updates + len(original),
+        "notes_deleted": deleted,
+    }
+    return report
+
+
+async def _swarm(connections, tokens, orders, admin_token, updates, rate, monitors, connect_concurrency, grace,
+                 server_pid, prefix):
+    swarm = Swarm(client.BASE_URL, note_prefix=prefix)
+    client_rss, server_rss = rss_bytes(), rss_bytes(server_pid) if server_pid else None
+    connect_seconds = await swarm.connect(connections, tokens, orders, monitors, admin_token, connect_concurrency)
+    connected = len(swarm.clients)
+    client_rss_after = rss_bytes()
+    server_rss_after = rss_bytes(server_pid) if server_pid else None
+
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    pacer, rest, rest_statuses, jobs = Pacer(rate), latency.Histogram(), {}, []
+    status_cycle, order_cycle = itertools.cycle(STATUSES), itertools.cycle(orders)
+    for seq in range(updates):
+        await pacer.wait()
+        note = f"{prefix}{seq}"
+        jobs.append(asyncio.create_task(
+            _trigger(swarm, next(order_cycle), next(status_cycle), note, headers, rest, rest_statuses)))
+    await asyncio.gather(*jobs)
+    await asyncio.sleep(grace)
+
+    delivery = latency.Histogram()
+    expected = delivered = 0
+    for seq, order_id in zip(range(updates), itertools.cycle(orders)):
+        note = f"{prefix}{seq}"
+        expected += swarm.expected(order_id)
+        for received in swarm.deliveries.get(note, []):
+            delivery.record(received - swarm.sent[note])
+            delivered += 1
+    await swarm.disconnect()
+
+    def per_connection(before, after):
+        if before is None or after is None or not connected:
+            return None
+        return (after - before) / connected
+
+    return {
+        "event": swarm.event,
+        "connections": {
+            "requested": connections + monitors,
+            "connected": connected,
+            "errors": swarm.connect_errors,
+            "setup_s": connect_seconds,
+            "setup_per_s": connected / connect_seconds if connect_seconds else 0.0,
+            "handshake_ms": swarm.connect_latency.summary(),
+        },
+        "memory": {
+            "client_bytes_per_connection": per_connection(client_rss, client_rss_after),
+            "server_bytes_per_connection": per_connection(server_rss, server_rss_after),
+            "server_rss_after_connect": server_rss_after,
+        },
+        "updates": {"sent": updates, "statuses": rest_statuses, "rest_ms": rest.summary()},
+        "delivery": {
+            "expected": expected,
+            "delivered": delivered,
+            "ratio": delivered / expected if expected else None,
+            "latency_ms": delivery.summary(),
+        },
+    }
+
+
+def print_report(report):
+    conn, mem, upd, dlv = report["connections"], report["memory"], report["updates"], report["delivery"]
+    print(f"connected {conn['connected']}/{conn['requested']} in {conn['setup_s']:.1f}s "
+          f"({conn['setup_per_s']:.0f}/s, handshake p95 {conn['handshake_ms'].get('p95_ms', 0):.1f}ms)")
+    for reason, count in conn["errors"].items():
+        print(f"  connect error x{count}: {reason}")
+    for side in ("client", "server"):
+        value = mem[f"{side}_bytes_per_connection"]
+        if value is not None:
+            print(f"{side} memory per connection: {value / 1024:.1f} KiB")
+    print(f"{upd['sent']} status updates, statuses {upd['statuses']}, "
+          f"REST p95 {upd['rest_ms'].get('p95_ms', 0):.1f}ms")
+    ratio = dlv["ratio"]
+    print(f"{dlv['delivered']}/{dlv['expected']} {report['event']} deliveries"
+          f"{f' ({ratio:.1%})' if ratio is not None else ''}")
+    ms = dlv["latency_ms"]
+    if ms["count"]:
+        print(f"REST -> socket latency: p50 {ms['p50_ms']:.1f}ms  p95 {ms['p95_ms']:.1f}ms  "
+              f"p99 {ms['p99_ms']:.1f}ms  max {ms['max_ms']:.1f}ms")
+    cleanup = report["cleanup"]
+    print(f"restored {cleanup['orders_restored']} orders, deleted {cleanup['notes_deleted']}/"
+          f"{cleanup['notes_created']} {cleanup['note_prefix']}* notifications")
+    if cleanup["restore_failed"]:
+        print(f"  could not restore: {', '.join(cleanup['restore_failed'])}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Open many authenticated Socket.IO clients and time order update fan-out.")
+    parser.add_argument("-n", "--connections", type=int, default=1000)
+    parser.add_argument("--tokens", required=True, help="file with one user JWT per line, reused round-robin")
+    parser.add_argument("--orders", required=True, help="file with one order id per line; clients join their rooms")
+    parser.add_argument("--admin-token", default=os.getenv("TESTSPRITE_ADMIN_TOKEN"),
+                        help="JWT allowed to change order status (and used for monitor clients)")
+    parser.add_argument("-u", "--updates", type=int, default=100, help="status changes to trigger")
+    parser.add_argument("-r", "--rate", type=float, default=10.0, help="status changes per second; 0 = unthrottled")
+    parser.add_argument("--monitors", type=int, default=1, help="extra clients that join admin-monitor")
+    parser.add_argument("--connect-concurrency", type=int, default=100, help="handshakes in flight")
+    parser.add_argument("--grace", type=float, default=5.0, help="seconds to wait for late deliveries")
+    parser.add_argument("--server-pid", type=int, help="backend PID, to report server memory per connection")
+    parser.add_argument("--throwaway-orders", action="store_true",
+                        help="confirm the orders may be changed: statuses and notifications are restored "
+                             "afterwards, but each order keeps the swarm's statusHistory entries")
+    parser.add_argument("-o", "--output", default=REPORT_PATH)
+    args = parser.parse_args(argv)
+
+    if socketio is None:
+        parser.error("the socket swarm needs python-socketio with its asyncio client: "
+                     "pip install \"python-socketio[asyncio_client]\"")
+    if not args.admin_token:
+        parser.error("--admin-token (or TESTSPRITE_ADMIN_TOKEN) is required to trigger status changes")
+    if not args.throwaway_orders:
+        parser.error("the swarm changes the listed orders' status and history; pass --throwaway-orders "
+                     "to confirm they are test orders")
+
+    client.configure(pool_size=max(client.POOL_SIZE, 64), retries=0)
+    try:
+        report = asyncio.run(run_swarm(
+            args.connections, read_lines(args.tokens), read_lines(args.orders), args.admin_token, args.updates,
+            args.rate, args.monitors, args.connect_concurrency, args.grace, args.server_pid,
+        ))
+    except RuntimeError as e:
+        parser.error(str(e))
+    print_report(report)
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,823 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.sax.saxutils import escape
+
+RAZORPAY_KEY_SECRET = os.getenv("RAZORPAY_KEY_SECRET", "test_secret")
+JWT_SECRET = os.getenv("JWT_SECRET", "stub_jwt_secret")
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+REASONS = {200: "OK", 201: "Created", 204: "No Content", 400: "Bad Request", 401: "Unauthorized",
+           403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+MAX_HEADER_BYTES = 64 * 1024
+# Mirrors the backend's express.json / express.urlencoded "200mb" limit
+MAX_BODY_BYTES = int(os.getenv("TESTSPRITE_STUB_MAX_BODY", str(200 * 1024 * 1024)))
+
+
+SITE_URL = "https://fzokart.com"
+# models/Product.js defaults for the fields the catalog reads and SEO feeds look at
+PRODUCT_DEFAULTS = {"countInStock": 100, "rating": 0, "reviewsCount": 0, "totalOrders": 0,
+                    "isDeleted": False, "isActive": True, "status": "approved", "published": True}
+XML_ENTITIES = {"'": "&apos;", '"': "&quot;"}
+
+# A non-JSON response body, e.g. the XML feeds
+Raw = namedtuple("Raw", ["body", "content_type"])
+
+
+class PayloadTooLarge(Exception):
+    pass
+
+
+class Request:
+    def __init__(self, method, target, headers, body):
+        parts = urlsplit(target)
+        self.method = method
+        self.path = parts.path
+        self.query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        self.headers = headers
+        self.body = body
+        self.params = {}
+
+    def json(self):
+        if not self.body:
+            return {}
+        return json.loads(self.body)
+
+    def form(self):
+        """Return (fields, files) for urlencoded, multipart or JSON bodies."""
+        content_type = self.headers.get("content-type", "")
+        if content_type.startswith("multipart/form-data"):
+            boundary = content_type.split("boundary=", 1)[1].strip('"')
+            return parse_multipart(self.body, boundary)
+        if content_type.startswith("application/x-www-form-urlencoded"):
+            return {k: v[-1] for k, v in parse_qs(self.body.decode()).items()}, []
+        return self.json(), []
+
+
+def parse_multipart(body, boundary):
+    fields, files = {}, []
+    delimiter = b"--" + boundary.encode()
+    for part in body.split(delimiter)[1:]:
+        if part.startswith(b"--"):
+            break
+        head, _, content = part.partition(b"\r\n\r\n")
+        content = content[:-2] if content.endswith(b"\r\n") else content
+        disposition = {}
+        for line in head.decode("utf-8", "replace").split("\r\n"):
+            if line.lower().startswith("content-disposition:"):
+                disposition = dict(re.findall(r'(\w+)="([^"]*)"', line))
+        if "filename" in disposition:
+            files.append({"field": disposition.get("name"), "filename": disposition["filename"], "size": len(content)})
+        elif "name" in disposition:
+            fields[disposition["name"]] = content.decode("utf-8", "replace")
+    return fields, files
+
+
+def _b64decode(segment):
+    return base64.urlsafe_b64decode(segment + b"=" * (-len(segment) % 4))
+
+
+def sign_jwt(payload, secret=JWT_SECRET):
+    def encode(data):
+        return base64.urlsafe_b64encode(json.dumps(data, separators=(",", ":")).encode()).rstrip(b"=")
+
+    signing_input = encode({"alg": "HS256", "typ": "JWT"}) + b"." + encode(payload)
+    signature = base64.urlsafe_b64encode(hmac.new(secret.encode(), signing_input, hashlib.sha256).digest()).rstrip(b"=")
+    return (signing_input + b"." + signature).decode()
+
+
+def verify_jwt(token, secret=JWT_SECRET):
+    """Payload of an HS256 token signed by sign_jwt, or None if it is malformed, forged or expired."""
+    try:
+        header, payload, signature = token.encode().split(b".")
+        expected = hmac.new(secret.encode(), header + b"." + payload, hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, _b64decode(signature)):
+            return None
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        return None
+    if claims.get("exp", float("inf")) < time.time():
+        return None
+    return claims
+
+
+class StubBackend:
+    """In-memory implementation of the endpoints the testsprite cases exercise."""
+
+    def __init__(self, fixed_otp=None, mailer=None):
+        self.fixed_otp = fixed_otp
+        self.mailer = mailer
+        self.products = {}
+        self.otps = {}
+        self.users = {}
+        self.outbox = []
+        self.carts = {}
+        self.coupons = {}
+        self.coupon_usages = []
+        self.orders = {}
+        self.banners = {}
+        self.home_categories = {}
+        self.routes = []
+        route = self.route
+        route("GET", "/health", self.health)
+        route("GET", "/health/loop", self.loop_delay)
+        route("POST", "/products", self.create_product)
+        route("POST", "/products/bulk", self.bulk_create_products)
+        route("POST", "/products/bulk-delete", self.bulk_delete_products)
+        route("GET", "/products/{id}", self.get_product)
+        route("PUT", "/products/{id}", self.update_product)
+        route("DELETE", "/products/{id}", self.delete_product)
+        route("POST", "/api/products", self.create_catalog_product)
+        route("DELETE", "/api/products/{id}", self.delete_product)
+        route("GET", "/api/products/catalog/summary", self.catalog_summary)
+        route("GET", "/api/products/random", self.random_products)
+        route("GET", "/api/products/suggested", self.suggested_products)
+        route("GET", "/api/products/trending/global", self.trending_products)
+        route("GET", "/api/products/trending/category/{category}/{days}", self.trending_products)
+        route("GET", "/api/products/trending/{gender}/{days}", self.trending_products)
+        route("GET", "/api/reviews/latest", self.latest_reviews)
+        route("GET", "/sitemap.xml", self.sitemap)
+        route("GET", "/image-sitemap.xml", self.image_sitemap)
+        route("GET", "/product-feed.xml", self.product_feed)
+        route("POST", "/api/auth/send-email-otp", self.send_email_otp)
+        route("POST", "/api/auth/verify-email-otp", self.verify_email_otp)
+        route("POST", "/auth/generate-otp", self.send_email_otp)
+        route("POST", "/auth/request-otp", self.send_email_otp)
+        route("POST", "/auth/verify-otp", self.verify_email_otp)
+        route("GET", "/auth/get-latest-otp", self.get_latest_otp)
+        route("PUT", "/api/cart", self.update_cart)
+        route("POST", "/api/coupons/apply", self.apply_coupon)
+        route("POST", "/api/coupons", self.create_coupon)
+        route("GET", "/api/coupons", self.list_coupons)
+        route("GET", "/api/coupons/stats", self.coupon_stats)
+        route("DELETE", "/api/coupons/{id}", self.delete_coupon)
+        route("POST", "/api/order/create", self.create_order)
+        route("POST", "/api/order/verify-payment", self.verify_payment)
+        route("POST", "/email/send", self.send_email)
+        route("GET", "/api/content/admin/export", self.export_content)
+        route("POST", "/api/content/admin/import", self.import_content)
+        route("DELETE", "/api/content/admin/banners/{id}", self.delete_banner)
+        route("DELETE", "/api/content/admin/home-categories/{id}", self.delete_home_category)
+
+    def route(self, method, template, handler):
+        pattern = re.sub(r"\{(\w+)\}", r"(?P<\1>[^/]+)", template)
+        self.routes.append((method, re.compile(f"^{pattern}$"), handler))
+
+    def dispatch(self, request):
+        allowed = False
+        for method, pattern, handler in self.routes:
+            match = pattern.match(request.path)
+            if not match:
+                continue
+            allowed = True
+            if method == request.method:
+                request.params = {key: unquote(value) for key, value in match.groupdict().items()}
+                try:
+                    return handler(request)
+                except json.JSONDecodeError:
+                    return 400, {"message": "Malformed JSON body"}
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    return 500, {"message": str(e)}
+        if allowed:
+            return 405, {"message": "Method not allowed"}
+        return 404, {"message": f"Cannot {request.method} {request.path}"}
+
+    def health(self, request):
+        return 200, {"status": "ok"}
+
+    def loop_delay(self, request):
+        # The stub has no event loop to measure; the probe's round trip is all sampler.py sees
+        return 200, {"meanMs": None, "p99Ms": None, "maxMs": None, "heapUsed": None}
+
+    # Products
+
+    def _apply_product_fields(self, product, fields, files):
+        for key in ("name", "description", "category", "stock"):
+            if key in fields:
+                product[key] = fields[key]
+        if "price" in fields:
+            product["price"] = float(fields["price"])
+        if files:
+            product["images"] = [
+                {"id": uuid.uuid4().hex, "url": f"/uploads/{f['filename']}", "filename": f["filename"],
+                 "altText": product.get("name", ""), "size": f["size"]}
+                for f in files
+            ]
+        elif isinstance(fields.get("images"), list):
+            product["images"] = [
+                dict({"id": uuid.uuid4().hex, "altText": ""}, **image) if isinstance(image, dict)
+                else {"id": uuid.uuid4().hex, "url": image, "altText": ""}
+                for image in fields["images"]
+            ]
+        product["updatedAt"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+    def _new_product(self, fields, files):
+        product_id = uuid.uuid4().hex[:24]
+        product = {"_id": product_id, "id": product_id, "stock": 0, "images": []}
+        self._apply_product_fields(product, fields, files)
+        product["createdAt"] = product["updatedAt"]
+        self.products[product_id] = product
+        return product
+
+    def create_product(self, request):
+        fields, files = request.form()
+        if not fields.get("name"):
+            return 400, {"message": "Product name is required"}
+        return 201, self._new_product(fields, files)
+
+    def create_catalog_product(self, request):
+        # productRoutes.js saves the body as a Product document; a failed validation is a 500 there
+        body = request.json()
+        if not body.get("name"):
+            return 500, {"message": "Product validation failed: name: Path `name` is required."}
+        now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        product = dict(PRODUCT_DEFAULTS, _id=uuid.uuid4().hex[:24], images=[], createdAt=now, updatedAt=now)
+        product.update(body)
+        self.products[product["_id"]] = product
+        return 201, {"success": True, "data": {"product": product}}
+
+    def bulk_create_products(self, request):
+        items = request.json().get("products")
+        if not isinstance(items, list) or not all(isinstance(item, dict) and item.get("name") for item in items):
+            return 400, {"message": "products must be a list of products with a name"}
+        return 201, {"success": True, "products": [self._new_product(fields, []) for fields in items]}
+
+    def bulk_delete_products(self, request):
+        ids = request.json().get("ids")
+        if not isinstance(ids, list):
+            return 400, {"message": "ids must be a list"}
+        deleted = sum(self.products.pop(product_id, None) is not None for product_id in ids)
+        return 200, {"success": True, "deleted": deleted}
+
+    def get_product(self, request):
+        product = self.products.get(request.params["id"])
+        if product is None:
+            return 404, {"message": "Product not found"}
+        return 200, product
+
+    def update_product(self, request):
+        product = self.products.get(request.params["id"])
+        if product is None:
+            return 404, {"message": "Product not found"}
+        fields, files = request.form()
+        self._apply_product_fields(product, fields, files)
+        return 200, product
+
+    def delete_product(self, request):
+        if self.products.pop(request.params["id"], None) is None:
+            return 404, {"message": "Product not found"}
+        return 200, {"success": True, "message": "Product deleted successfully"}
+
+    # Catalog reads (no orders are modelled, so trending is by insertion order)
+
+    def _limit(self, request, default):
+        try:
+            return int(request.query.get("limit", default))
+        except ValueError:
+            return default
+
+    def catalog_summary(self, request):
+        groups = {}
+        for product in self.products.values():
+            # $sum over countInStock, so products from the /products routes (which keep `stock`) add nothing
+            price, stock = float(product.get("price", 0)), int(product.get("countInStock", 0))
+            group = groups.setdefault(product.get("category"), {"_id": product.get("category"), "count": 0, "prices": [],
+                                                                "totalStock": 0})
+            group["count"] += 1
+            group["prices"].append(price)
+            group["totalStock"] += stock
+        summary = []
+        for group in sorted(groups.values(), key=lambda g: -g["count"]):
+            prices = group.pop("prices")
+            summary.append(dict(group, avgPrice=sum(prices) / len(prices), minPrice=min(prices), maxPrice=max(prices)))
+        return 200, {
+            "success": True,
+            "summary": summary,
+            "totalProducts": len(self.products),
+            "totalInventoryValue": sum(float(p.get("price", 0)) * int(p.get("countInStock", 0))
+                                       for p in self.products.values()),
+            "lastUpdated": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+
+    def random_products(self, request):
+        products = list(self.products.values())
+        return 200, random.sample(products, min(self._limit(request, 20), len(products)))
+
+    def suggested_products(self, request):
+        return 200, list(self.products.values())[:self._limit(request, 20)]
+
+    def trending_products(self, request):
+        gender, category, days = (request.params.get(key) for key in ("gender", "category", "days"))
+        if days is not None and days not in ("7", "15", "30"):
+            return 400, {"message": "Invalid days. Must be 7, 15, or 30."}
+        if gender is not None and gender not in ("Men", "Women", "Kids"):
+            return 400, {"message": "Invalid gender. Must be Men, Women, or Kids."}
+        products = [
+            p for p in self.products.values()
+            if (category is None or p.get("category") == category) and (gender is None or p.get("gender") in (None, gender))
+        ]
+        limit = self._limit(request, 24 if gender is None and category is None else 16 if category else 10)
+        return 200, [dict(p, totalSold=0, rank=n + 1, showRankBadge=n < 5) for n, p in enumerate(products[:limit])]
+
+    def latest_reviews(self, request):
+        return 200, []
+
+    # SEO feeds, built in one response like seoRoutes.js from Product documents (see create_catalog_product)
+
+    def _listed(self):
+        # Product.find({ isActive: true, published: true }); the /products routes store neither field
+        return [p for p in self.products.values() if p.get("isActive") is True and p.get("published") is True]
+
+    @staticmethod
+    def _site_url(path):
+        return path if path.startswith("http") else SITE_URL + path
+
+    @staticmethod
+    def _lastmod(product):
+        # new Date(updatedAt).toISOString()
+        updated = product.get("updatedAt")
+        moment = datetime.fromisoformat(updated.replace("Z", "+00:00")) if updated else datetime.now(timezone.utc)
+        return moment.astimezone(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+    def sitemap(self, request):
+        parts = ['<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+        for page in ("", "/shop", "/about", "/contact"):
+            parts.append(f"\n  <url>\n    <loc>{SITE_URL}{page}</loc>\n    <changefreq>weekly</changefreq>\n"
+                         f"    <priority>{'1.0' if page == '' else '0.8'}</priority>\n  </url>")
+        for product in self._listed():
+            parts.append(f"\n  <url>\n    <loc>{SITE_URL}/product/{product['_id']}</loc>\n"
+                         f"    <lastmod>{self._lastmod(product)}</lastmod>\n"
+                         f"    <changefreq>daily</changefreq>\n    <priority>0.9</priority>\n  </url>")
+        parts.append("\n</urlset>")
+        return 200, Raw("".join(parts).encode(), "application/xml")
+
+    def image_sitemap(self, request):
+        parts = ['<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"\n'
+                 '        xmlns:image="http://www.google.com/schemas/sitemap-image/1.1">']
+        for product in self._listed():
+            name, images = escape(str(product.get("name", "")), XML_ENTITIES), ""
+            if product.get("image"):
+                images += (f"\n    <image:image>\n      <image:loc>{escape(self._site_url(product['image']), XML_ENTITIES)}"
+                           f"</image:loc>\n      <image:title>{name}</image:title>\n    </image:image>")
+            for image in product.get("images") or []:
+                # Gallery entries are strings in the schema; anything else fails here as img.startsWith does there
+                if image != product.get("image"):
+                    images += (f"\n    <image:image>\n      <image:loc>{escape(self._site_url(image), XML_ENTITIES)}"
+                               f"</image:loc>\n    </image:image>")
+            if images:
+                parts.append(f"\n  <url>\n    <loc>{SITE_URL}/product/{product['_id']}</loc>{images}\n  </url>")
+        parts.append("\n</urlset>")
+        return 200, Raw("".join(parts).encode(), "application/xml")
+
+    def product_feed(self, request):
+        parts = ['<?xml version="1.0" encoding="UTF-8"?>\n<rss version="2.0" xmlns:g="http://base.google.com/ns/1.0">\n'
+                 f"<channel>\n  <title>Flipzokart Products</title>\n  <link>{SITE_URL}</link>\n"
+                 "  <description>Best Online Shopping Site for Fashion, Electronics, Home &amp; More</description>"]
+        for product in self._listed():
+            image = self._site_url(product["image"]) if product.get("image") else ""
+            name = escape(str(product.get("name", "")), XML_ENTITIES)
+            parts.append(
+                f"\n  <item>\n    <g:id>{product['_id']}</g:id>\n    <g:title>{name}</g:title>\n"
+                f"    <g:description>{escape(str(product.get('description') or product.get('name', '')), XML_ENTITIES)}</g:description>\n"
+                f"    <g:link>{SITE_URL}/product/{product['_id']}</g:link>\n"
+                f"    <g:image_link>{escape(image, XML_ENTITIES)}</g:image_link>\n"
+                f"    <g:condition>new</g:condition>\n"
+                f"    <g:availability>{'in_stock' if (product.get('countInStock') or 0) > 0 else 'out_of_stock'}</g:availability>\n"
+                f"    <g:price>{product.get('price', 0)} INR</g:price>\n    <g:brand>Flipzokart</g:brand>\n"
+                f"    <g:google_product_category>{escape(str(product.get('category') or 'General'), XML_ENTITIES)}"
+                f"</g:google_product_category>\n  </item>"
+            )
+        parts.append("\n</channel>\n</rss>")
+        return 200, Raw("".join(parts).encode(), "application/xml")
+
+    # Auth
+
+    def send_email_otp(self, request):
+        email = request.json().get("email")
+        if not email:
+            return 400, {"message": "Email is required"}
+        otp = self.fixed_otp or f"{random.randint(100000, 999999)}"
+        self.otps[email] = otp
+        self.outbox.append({"to": email, "subject": "Your Login OTP for Fzokart", "otp": otp})
+        if self.mailer is not None:
+            self.mailer([email], "Your Login OTP for Fzokart", f"<p>Your One-Time Password (OTP) for login is:</p><div>{otp}</div>")
+        return 200, {"success": True, "message": "OTP sent successfully to your email"}
+
+    def verify_email_otp(self, request):
+        body = request.json()
+        email, otp = body.get("email"), body.get("otp")
+        if not email or not otp:
+            return 400, {"message": "Email and OTP are required"}
+        if self.otps.get(email) != otp:
+            return 400, {"success": False, "message": "Invalid or expired OTP", "error": "Invalid OTP"}
+        del self.otps[email]
+        user = self.users.setdefault(email, {
+            "id": uuid.uuid4().hex[:24], "email": email, "name": body.get("name") or email.split("@")[0], "role": "user",
+        })
+        token = sign_jwt({"id": user["id"], "role": user["role"], "iat": int(time.time()),
+                          "exp": int(time.time()) + 30 * 24 * 3600})
+        return 200, {"success": True, "message": "OTP verified successfully", "token": token, "user": user}
+
+    def get_latest_otp(self, request):
+        otp = self.otps.get(request.query.get("email", ""))
+        if otp is None:
+            return 404, {"message": "No OTP issued for this email"}
+        return 200, {"otp": otp}
+
+    # Cart, coupons and orders; handlers run one at a time on the event loop, so unlike the
+    # backend the usage check and the usage increment can never interleave here
+
+    def _user(self, request):
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        return verify_jwt(token) if scheme.lower() == "bearer" else None
+
+    def _admin(self, request):
+        user = self._user(request)
+        if user is None:
+            return 401, {"message": "Not authorized, no token"}
+        if user.get("role") != "admin":
+            return 403, {"message": "Access denied"}
+        return None
+
+    def update_cart(self, request):
+        user = self._user(request)
+        if user is None:
+            return 401, {"message": "Not authorized, no token"}
+        cart = [{"productId": item.get("productId") or item.get("id"), "quantity": item.get("quantity", 1)}
+                for item in request.json().get("cart", [])]
+        self.carts[user["id"]] = cart
+        return 200, {"message": "Cart updated", "cart": cart}
+
+    def create_coupon(self, request):
+        denied = self._admin(request)
+        if denied:
+            return denied
+        body = request.json()
+        if not body.get("code"):
+            return 400, {"success": False, "message": "Coupon code is required"}
+        code = str(body["code"]).upper()
+        if any(coupon["code"] == code for coupon in self.coupons.values()):
+            return 400, {"success": False, "message": "Coupon code already exists"}
+        coupon_id = uuid.uuid4().hex[:24]
+        coupon = {"minCartValue": 0, "usageLimitPerUser": 1, "status": "ACTIVE", "conditions": {}}
+        coupon.update(body, _id=coupon_id, code=code, usageCount=0)
+        self.coupons[coupon_id] = coupon
+        return 201, {"success": True, "data": coupon}
+
+    def list_coupons(self, request):
+        denied = self._admin(request)
+        if denied:
+            return denied
+        return 200, {"success": True, "data": list(reversed(self.coupons.values()))}
+
+    def coupon_stats(self, request):
+        denied = self._admin(request)
+        if denied:
+            return denied
+        coupons = self.coupons.values()
+        return 200, {"success": True, "data": {
+            "totalCoupons": len(coupons),
+            "activeCoupons": sum(1 for coupon in coupons if coupon["status"] == "ACTIVE"),
+            "totalUsages": sum(coupon["usageCount"] for coupon in coupons),
+        }}
+
+    def delete_coupon(self, request):
+        denied = self._admin(request)
+        if denied:
+            return denied
+        self.coupons.pop(request.params["id"], None)
+        return 200, {"success": True, "message": "Coupon deleted successfully"}
+
+    def _discount(self, user_id, items, code):
+        """Only FLAT and PERCENTAGE coupons; raises ValueError with the backend's messages."""
+        coupon = next((c for c in self.coupons.values() if c["code"] == str(code).upper()), None)
+        if coupon is None:
+            raise ValueError("Invalid coupon code")
+        if coupon["status"] != "ACTIVE":
+            raise ValueError("This coupon is currently inactive")
+        if coupon.get("usageLimit") and coupon["usageCount"] >= coupon["usageLimit"]:
+            raise ValueError("Coupon usage limit reached")
+        used = sum(1 for usage in self.coupon_usages if usage["coupon"] == coupon["_id"] and usage["user"] == user_id)
+        if coupon.get("usageLimitPerUser") and used >= coupon["usageLimitPerUser"]:
+            raise ValueError("You have already used this coupon maximum allowed times")
+        total = sum(float(item["price"]) * int(item.get("quantity") or 1) for item in items)
+        if total < coupon.get("minCartValue", 0):
+            raise ValueError(f"Minimum cart value of ₹{coupon['minCartValue']} is required")
+        value = float(coupon["discountValue"])
+        discount = min(total * value / 100 if coupon["type"] == "PERCENTAGE" else value,
+                       coupon.get("maxDiscount") or float("inf"), total)
+        return coupon, {"isValid": True, "couponCode": coupon["code"], "type": coupon["type"],
+                        "discountAmount": int(discount), "finalCartTotal": int(total - discount),
+                        "cartTotal": int(total), "couponId": coupon["_id"]}
+
+    def apply_coupon(self, request):
+        user = self._user(request)
+        if user is None:
+            return 401, {"message": "Not authorized, no token"}
+        code = request.json().get("couponCode")
+        if not code:
+            return 400, {"success": False, "message": "Coupon code is required"}
+        items = [dict(item, price=self.products[item["productId"]].get("price", 0))
+                 for item in self.carts.get(user["id"], []) if item["productId"] in self.products]
+        if not items:
+            return 400, {"success": False, "message": "Your cart is empty"}
+        try:
+            _, result = self._discount(user["id"], items, code)
+        except ValueError as e:
+            return 400, {"success": False, "message": str(e)}
+        return 200, {"success": True, "result": result}
+
+    def create_order(self, request):
+        user = self._user(request)
+        if user is None:
+            return 401, {"message": "Not authorized, no token"}
+        body = request.json()
+        items = []
+        for item in body.get("products") or []:
+            product = self.products.get(item.get("productId"))
+            if product is None:
+                return 400, {"message": f"Product with ID {item.get('productId')} not found (likely deleted)."}
+            items.append({"productId": product["_id"], "quantity": int(item.get("quantity") or 1),
+                          "price": float(item["price"]) if item.get("price") is not None else product.get("price", 0)})
+        if not items or not body.get("address"):
+            return 400, {"message": "Missing required fields: products, address"}
+        coupon = None
+        if body.get("couponCode"):
+            try:
+                coupon, result = self._discount(user["id"], items, body["couponCode"])
+            except ValueError as e:
+                return 400, {"message": str(e), "errorCode": "INVALID_COUPON"}
+        order_id = uuid.uuid4().hex[:24]
+        subtotal = sum(item["price"] * item["quantity"] for item in items)
+        discount = result["discountAmount"] if coupon else 0
+        self.orders[order_id] = {"_id": order_id, "user": user["id"], "products": items, "discount": discount,
+                                 "total": subtotal - discount}
+        if coupon:
+            self.coupon_usages.append({"coupon": coupon["_id"], "user": user["id"], "order": order_id})
+            coupon["usageCount"] += 1
+        return 201, {"message": "Order created successfully",
+                     "order": {"id": order_id, "orderId": order_id, "total": subtotal - discount}}
+
+    # Homepage content export/import, with contentController.js's duplicate checks
+
+    def export_content(self, request):
+        denied = self._admin(request)
+        if denied:
+            return denied
+        kind = request.query.get("type")
+        data = {}
+        if kind in ("banners", "all"):
+            data["banners"] = sorted(self.banners.values(), key=lambda banner: banner["position"])
+        if kind in ("home-categories", "all"):
+            data["homeCategories"] = sorted(self.home_categories.values(), key=lambda category: category["position"])
+        return 200, data
+
+    def import_content(self, request):
+        denied = self._admin(request)
+        if denied:
+            return denied
+        body = request.json()
+        results = {"banners": 0, "homeCategories": 0, "errors": []}
+        banners, categories = body.get("banners"), body.get("homeCategories")
+        if isinstance(banners, list):
+            seen = {key for banner in self.banners.values() for key in (banner["title"], banner["imageUrl"])}
+            for banner in banners:
+                if banner.get("title") in seen or banner.get("imageUrl") in seen:
+                    continue
+                banner_id = uuid.uuid4().hex[:24]
+                self.banners[banner_id] = {
+                    "_id": banner_id,
+                    **{key: banner.get(key) for key in ("title", "subtitle", "imageUrl", "mobileImageUrl",
+                                                         "redirectUrl", "ctaText")},
+                    "isActive": banner.get("isActive", True),
+                    "position": banner.get("position") or 0,
+                }
+                seen.update((banner.get("title"), banner.get("imageUrl")))
+                results["banners"] += 1
+        if isinstance(categories, list):
+            seen = {category["categoryName"] for category in self.home_categories.values()}
+            for category in categories:
+                if category.get("categoryName") in seen:
+                    continue
+                category_id = uuid.uuid4().hex[:24]
+                self.home_categories[category_id] = {
+                    "_id": category_id,
+                    **{key: category.get(key) for key in ("categoryName", "iconUrl", "redirectUrl")},
+                    "isActive": category.get("isActive", True),
+                    "position": category.get("position") or 0,
+                }
+                seen.add(category.get("categoryName"))
+                results["homeCategories"] += 1
+        return 200, {"message": "Import completed", "results": results}
+
+    def delete_banner(self, request):
+        denied = self._admin(request)
+        if denied:
+            return denied
+        if self.banners.pop(request.params["id"], None) is None:
+            return 404, {"message": "Banner not found"}
+        return 200, {"message": "Banner removed"}
+
+    def delete_home_category(self, request):
+        denied = self._admin(request)
+        if denied:
+            return denied
+        if self.home_categories.pop(request.params["id"], None) is None:
+            return 404, {"message": "Icon not found"}
+        return 200, {"message": "Icon removed"}
+
+    # Payments
+
+    def verify_payment(self, request):
+        body = request.json()
+        order_id = body["razorpay_order_id"]
+        payment_id = body["razorpay_payment_id"]
+        signature = body["razorpay_signature"]
+        if order_id is None or payment_id is None or signature is None:
+            return 500, {"message": "Payment verification failed"}
+        expected = hmac.new(RAZORPAY_KEY_SECRET.encode(), f"{order_id}|{payment_id}".encode(), hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(expected, str(signature)):
+            return 400, {"success": False, "message": "Invalid payment signature"}
+        return 200, {"success": True, "message": "Payment verified successfully"}
+
+    # Email
+
+    def send_email(self, request):
+        body = request.json()
+        to = body.get("to", "")
+        if not EMAIL_RE.match(to) or not body.get("subject"):
+            return 400, {"success": False, "error": "Invalid recipient address or missing subject"}
+        self.outbox.append({"to": to, "subject": body["subject"]})
+        return 200, {
+            "success": True,
+            "message": "Email sent",
+            "zohoResponse": {"status": 200, "errors": [], "data": {"messageId": uuid.uuid4().hex}},
+        }
+
+
+async def read_request(reader):
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError:
+        return None
+    lines = head.decode("latin-1").split("\r\n")
+    method, target, _ = lines[0].split(" ", 2)
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        chunks, received = [], 0
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                await reader.readuntil(b"\r\n")
+                break
+            received += size
+            if received > MAX_BODY_BYTES:
+                raise PayloadTooLarge(received)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+        body = b"".join(chunks)
+    else:
+        length = int(headers.get("content-length", 0))
+        if length > MAX_BODY_BYTES:
+            raise PayloadTooLarge(length)
+        body = await reader.readexactly(length)
+    return Request(method, target, headers, body)
+
+
+def render_response(status, payload, keep_alive):
+    if isinstance(payload, Raw):
+        body, content_type = payload
+    else:
+        body, content_type = json.dumps(payload).encode(), "application/json; charset=utf-8"
+    head = (
+        f"HTTP/1.1 {status} {REASONS.get(status, 'Unknown')}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode() + body
+
+
+class LoopThread:
+    """start_in_thread()/stop_thread() for a server with async start() and stop() methods."""
+
+    thread_name = "server"
+    _loop = None
+    _thread = None
+
+    def start_in_thread(self):
+        """Run the server on a private event loop so synchronous test code can call it."""
+        ready = threading.Event()
+        failure = []
+
+        def serve():
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._loop.run_until_complete(self.start())
+            except BaseException as e:  # e.g. the port is taken; re-raised in the caller below
+                failure.append(e)
+                self._loop.close()
+                self._loop = None
+                return
+            finally:
+                ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=serve, name=self.thread_name, daemon=True)
+        self._thread.start()
+        ready.wait()
+        if failure:
+            self._thread.join()
+            raise failure[0]
+        return self
+
+    def stop_thread(self):
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop = None
+
+
+class StubServer(LoopThread):
+    thread_name = "stub-server"
+
+    def __init__(self, backend=None, host="127.0.0.1", port=0):
+        self.backend = backend or StubBackend()
+        self.host = host
+        self.port = port
+        self.server = None
+        self._loop = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                status, payload = self.backend.dispatch(request)
+                keep_alive = request.headers.get("connection", "").lower() != "close"
+                writer.write(render_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except PayloadTooLarge:
+            writer.write(render_response(413, {"message": "request entity too large"}, False))
+            await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, self.host, self.port, limit=MAX_HEADER_BYTES, backlog=1024)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+
+async def _serve_forever(host, port, fixed_otp):
+    server = await StubServer(StubBackend(fixed_otp), host, port).start()
+    print(f"Stub backend listening on {server.url}")
+    async with server.server:
+        await server.server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="In-process stand-in for the Express backend.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--otp", help="issue this OTP instead of a random one")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_serve_forever(args.host, args.port, args.otp))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import client
+import latency
+
+LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tmp", "traffic.jsonl")
+REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tmp", "replay_report.json")
+SPEEDS = {"1x": 1.0, "10x": 10.0, "max": 0.0}
+# Threads for a replay; at high speed-ups the recorded overlap times the speed can be huge
+MAX_WORKERS = 512
+
+
+def bodies_dir_for(log_path):
+    return log_path + ".bodies"
+
+
+class Recorder:
+    """Appends one JSON line per request the client makes; bodies are stored once by SHA-256.
+
+    Lines are written with a single O_APPEND write, so several processes (sharded runs) can
+    share one log. Bodies live next to the log so it stays compact and repeated payloads
+    cost nothing; streamed bodies are logged with their size but cannot be replayed.
+    """
+
+    def __init__(self, path=LOG_PATH, bodies_dir=None):
+        self.path = path
+        self.bodies_dir = bodies_dir or bodies_dir_for(path)
+        os.makedirs(self.bodies_dir, exist_ok=True)
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._lock = threading.Lock()
+
+    def _store(self, body):
+        digest = hashlib.sha256(body).hexdigest()
+        blob = os.path.join(self.bodies_dir, digest)
+        if not os.path.exists(blob):
+            partial = f"{blob}.{os.getpid()}.{threading.get_ident()}"
+            with open(partial, "wb") as f:
+                f.write(body)
+            os.replace(partial, blob)
+        return digest
+
+    def __call__(self, timing, response):
+        request = response.request if response is not None else None
+        body = request.body if request is not None else None
+        if isinstance(body, str):
+            body = body.encode()
+        digest, size = None, 0
+        if isinstance(body, bytes):
+            digest, size = self._store(body), len(body)
+        elif body is not None:
+            size = len(body) if hasattr(body, "__len__") else None
+        parts = urlsplit(timing.url)
+        entry = {
+            "started": timing.started,
+            "method": timing.method,
+            "path": parts.path + (f"?{parts.query}" if parts.query else ""),
+            "route": latency.route_template(timing.method, timing.url),
+            "body": digest,
+            "bytes": size,
+            "content_type": request.headers.get("Content-Type") if request is not None else None,
+            "status": timing.status,
+            "elapsed": timing.elapsed,
+            "ttfb": timing.ttfb,
+            "tag": timing.tag,
+        }
+        line = (json.dumps(entry, separators=(",", ":")) + "\n").encode()
+        with self._lock:
+            os.write(self._fd, line)
+
+    def install(self):
+        client.add_listener(self)
+        return self
+
+    def close(self):
+        client.remove_listener(self)
+        os.close(self._fd)
+
+
+def load_log(path=LOG_PATH):
+    with open(path, encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    return sorted(entries, key=lambda entry: entry["started"])
+
+
+def peak_concurrency(entries):
+    """Most requests that were in flight at once in the recording."""
+    edges = []
+    for entry in entries:
+        edges.append((entry["started"], 1))
+        edges.append((entry["started"] + (entry["elapsed"] or 0.0), -1))
+    peak = current = 0
+    for _, step in sorted(edges):
+        current += step
+        peak = max(peak, current)
+    return peak
+
+
+def replay_workers(peak, speed):
+    """Threads (and pooled connections) a replay needs to keep its schedule."""
+    # Compressing time by `speed` multiplies how many recorded requests overlap
+    return min(MAX_WORKERS, max(8, math.ceil(peak * speed))) if speed else peak
+
+
+class Replayer:
+    """Re-issues a recorded log against client.BASE_URL.
+
+    At a finite speed every request starts at its recorded offset divided by the speed, so
+    inter-arrival times (and with them concurrency) keep their shape; at max speed requests
+    go out back to back, capped at the recording's peak concurrency.
+    """
+
+    def __init__(self, entries, bodies_dir, token=None):
+        self.entries = entries
+        self.bodies_dir = bodies_dir
+        self.headers = {"Authorization": f"Bearer {token}"} if token else {}
+        self.routes = defaultdict(latency.Histogram)
+        self.recorded = defaultdict(latency.Histogram)
+        self.lag = latency.Histogram()
+        self.statuses = defaultdict(int)
+        self.mismatches = defaultdict(int)
+        self.skipped = 0
+
+    def _body(self, entry):
+        if not entry["body"]:
+            return None
+        with open(os.path.join(self.bodies_dir, entry["body"]), "rb") as f:
+            return f.read()
+
+    def _request(self, entry, headers):
+        # Runs in the worker: the start is taken here, so waiting for a free thread counts as lag
+        start = time.perf_counter()
+        try:
+            status = client.request(entry["method"], entry["path"], data=self._body(entry), headers=headers).status_code
+        except Exception:
+            status = None
+        return status, start, time.perf_counter()
+
+    async def _send(self, entry, due):
+        headers = dict(self.headers)
+        if entry["content_type"]:
+            headers["Content-Type"] = entry["content_type"]
+        status, start, done = await asyncio.to_thread(self._request, entry, headers)
+        self.lag.record(max(0.0, start - due))
+        self.routes[entry["route"]].record(done - start)
+        if entry["elapsed"] is not None:
+            self.recorded[entry["route"]].record(entry["elapsed"])
+        self.statuses[str(status)] += 1
+        if status != entry["status"]:
+            self.mismatches[f"{entry['route']} {entry['status']} -> {status}"] += 1
+
+    async def run(self, speed=1.0):
+        replayable = [entry for entry in self.entries if entry["body"] or entry["bytes"] == 0]
+        self.skipped = len(self.entries) - len(replayable)
+        peak = max(1, peak_concurrency(replayable))
+        loop = asyncio.get_running_loop()
+        workers = replay_workers(peak, speed)
+        # One connection per thread: the pool blocks when it runs dry, and that wait would be
+        # counted as service time rather than schedule lag
+        client.configure(pool_size=max(client.POOL_SIZE, workers), retries=0)
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=workers, thread_name_prefix="replay"))
+        start = time.perf_counter()
+        if speed:
+            origin, tasks = replayable[0]["started"] if replayable else 0.0, []
+            for entry in replayable:
+                due = start + (entry["started"] - origin) / speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(self._send(entry, due)))
+            await asyncio.gather(*tasks)
+        else:
+            semaphore = asyncio.Semaphore(peak)
+
+            async def bounded(entry):
+                async with semaphore:
+                    await self._send(entry, time.perf_counter())
+
+            await asyncio.gather(*(bounded(entry) for entry in replayable))
+        return self.report(time.perf_counter() - start, speed, peak)
+
+    def report(self, duration, speed, peak):
+        sent = sum(self.statuses.values())
+        return {
+            "speed": speed or "max",
+            "requests": sent,
+            "skipped_streamed": self.skipped,
+            "duration_s": duration,
+            "throughput_rps": sent / duration if duration else 0.0,
+            "peak_concurrency": peak,
+            "schedule_lag_ms": self.lag.summary(),
+            "statuses": dict(self.statuses),
+            "status_mismatches": dict(self.mismatches),
+            "routes": {
+                route: {"replay_ms": histogram.summary(), "recorded_ms": self.recorded[route].summary()}
+                for route, histogram in sorted(self.routes.items())
+            },
+        }
+
+
+def print_report(report):
+    print(f"replayed {report['requests']} requests at {report['speed']}{'x' if report['speed'] != 'max' else ''} "
+          f"in {report['duration_s']:.1f}s ({report['throughput_rps']:.1f} req/s, peak {report['peak_concurrency']} "
+          f"in flight, schedule lag p99 {report['schedule_lag_ms'].get('p99_ms', 0):.1f}ms)")
+    if report["skipped_streamed"]:
+        print(f"skipped {report['skipped_streamed']} streamed bodies")
+    print(f"{'route':<36}{'reqs':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'rec p95':>9}")
+    for route, row in report["routes"].items():
+        replay, recorded = row["replay_ms"], row["recorded_ms"]
+        print(f"{route:<36}{replay['count']:>7}{replay['p50_ms']:>9.1f}{replay['p95_ms']:>9.1f}"
+              f"{replay['p99_ms']:>9.1f}{recorded.get('p95_ms', 0):>9.1f}")
+    for mismatch, count in report["status_mismatches"].items():
+        print(f"status changed x{count}: {mismatch}")
+
+
+def parse_speed(value):
+    if value in SPEEDS:
+        return SPEEDS[value]
+    return float(value.rstrip("x"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay traffic recorded with runner.py/loadgen.py --capture.")
+    parser.add_argument("log", nargs="?", default=LOG_PATH)
+    parser.add_argument("-s", "--speed", type=parse_speed, default=1.0, help="1x, 10x, any factor, or max")
+    parser.add_argument("--bodies", help="body store (default: <log>.bodies)")
+    parser.add_argument("--token", default=os.getenv("TESTSPRITE_TOKEN"), help="bearer token added to every request")
+    parser.add_argument("-o", "--output", default=REPORT_PATH)
+    parser.add_argument("--stub", action="store_true", help="replay against the in-process stub backend")
+    args = parser.parse_args(argv)
+
+    if args.stub:
+        from stub_server import StubServer
+
+        client.BASE_URL = StubServer().start_in_thread().url
+
+    entries = load_log(args.log)
+    replayer = Replayer(entries, args.bodies or bodies_dir_for(args.log), args.token)
+    report = asyncio.run(replayer.run(args.speed))
+    print_report(report)
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
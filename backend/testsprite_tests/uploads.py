@@ -0,0 +1,278 @@
+import argparse
+import base64
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+import uuid
+
+import client
+import latency
+from fixtures import product_id
+from loadgen import percentile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPORT_PATH = os.path.join(HERE, "tmp", "upload_report.json")
+MB = 1024 * 1024
+DEFAULT_SIZES_MB = (1, 5, 10, 25, 50, 100, 200)
+# A multiple of 3 so every chunk but the last base64-encodes without padding
+CHUNK_SIZE = 3 * 64 * 1024
+PNG_HEADER = b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR"
+# Random bytes so neither side can cheat with compression; generated once and reused per chunk
+_FILLER = random.Random(0).randbytes(CHUNK_SIZE)
+
+
+def synthetic_image(size, chunk_size=CHUNK_SIZE):
+    """Yield `size` bytes of PNG-looking data in chunk_size pieces without materialising the file."""
+    filler = _FILLER if chunk_size == CHUNK_SIZE else random.Random(0).randbytes(chunk_size)
+    first = (PNG_HEADER + filler)[:min(size, chunk_size)]
+    yield first
+    remaining = size - len(first)
+    while remaining > 0:
+        chunk = filler[:min(remaining, chunk_size)]
+        remaining -= len(chunk)
+        yield chunk
+
+
+def _base64_chunks(size, chunk_size=CHUNK_SIZE):
+    for chunk in synthetic_image(size, chunk_size):
+        yield base64.b64encode(chunk)
+
+
+class StreamedBody:
+    """Request body assembled lazily from literal segments and synthetic image data.
+
+    len() is exact, so requests sends a Content-Length header and streams the iterator; it can
+    be iterated again when urllib3 retries. `finished` is the perf_counter() when the last byte
+    was handed to the socket, which separates upload time from server processing time.
+    """
+
+    content_type = "application/octet-stream"
+
+    def __init__(self, chunk_size=CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.finished = None
+
+    def _layout(self):
+        """List of bytes segments and ("raw" | "base64", size) placeholders for image data."""
+        raise NotImplementedError
+
+    def __len__(self):
+        total = 0
+        for item in self._layout():
+            if isinstance(item, bytes):
+                total += len(item)
+            else:
+                encoding, size = item
+                total += size if encoding == "raw" else 4 * -(-size // 3)
+        return total
+
+    def __iter__(self):
+        self.finished = None
+        for item in self._layout():
+            if isinstance(item, bytes):
+                yield item
+            elif item[0] == "raw":
+                yield from synthetic_image(item[1], self.chunk_size)
+            else:
+                yield from _base64_chunks(item[1], self.chunk_size)
+        self.finished = time.perf_counter()
+
+
+class MultipartBody(StreamedBody):
+    """multipart/form-data with text fields and synthetic files given as (field, filename, size, mime)."""
+
+    def __init__(self, fields, files, boundary=None, chunk_size=CHUNK_SIZE):
+        super().__init__(chunk_size)
+        self.fields = fields
+        self.files = files
+        self.boundary = boundary or uuid.uuid4().hex
+
+    @property
+    def content_type(self):
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def _layout(self):
+        delimiter = f"--{self.boundary}\r\n"
+        layout = []
+        for name, value in self.fields.items():
+            layout.append(f'{delimiter}Content-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+        for field, filename, size, mime in self.files:
+            layout.append(
+                f'{delimiter}Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+                f"Content-Type: {mime}\r\n\r\n".encode()
+            )
+            layout.append(("raw", size))
+            layout.append(b"\r\n")
+        layout.append(f"--{self.boundary}--\r\n".encode())
+        return layout
+
+
+class DataUriJsonBody(StreamedBody):
+    """JSON product payload whose images are base64 data URIs, the way the admin panel posts them."""
+
+    content_type = "application/json"
+
+    def __init__(self, fields, images, chunk_size=CHUNK_SIZE):
+        super().__init__(chunk_size)
+        self.fields = fields
+        self.images = images  # [(size, mime)]
+
+    def _layout(self):
+        head = json.dumps(self.fields)[:-1]
+        layout = [(head + (", " if self.fields else "") + '"images": [').encode()]
+        for n, (size, mime) in enumerate(self.images):
+            layout.append(f'{", " if n else ""}{{"url": "data:{mime};base64,'.encode())
+            layout.append(("base64", size))
+            layout.append(f'", "altText": "Synthetic image {n + 1}"}}'.encode())
+        layout.append(b"]}")
+        return layout
+
+
+def product_body(mode, size):
+    fields = {
+        "name": f"Upload Benchmark {size // MB}MB",
+        "description": "Synthetic product created by the upload benchmark.",
+        "price": "19.99",
+        "category": "Test Category",
+    }
+    if mode == "json":
+        return DataUriJsonBody(dict(fields, price=19.99, stock=1), [(size, "image/png")])
+    return MultipartBody(fields, [("image", f"synthetic_{size // MB}mb.png", size, "image/png")])
+
+
+def upload_once(endpoint, body):
+    start = time.perf_counter()
+    try:
+        response = client.post(endpoint, data=body, headers={"Content-Type": body.content_type})
+    except Exception as e:
+        return {"status": None, "error": f"{type(e).__name__}: {e}"}
+    end = time.perf_counter()
+    finished = body.finished or end
+    outcome = {"status": response.status_code, "elapsed": end - start, "upload": finished - start, "server": end - finished}
+    if response.status_code in (200, 201):
+        try:
+            created = product_id(response.json())
+        except ValueError:
+            created = None
+        if created:
+            client.delete(f"{endpoint.rstrip('/')}/{created}")
+    return outcome
+
+
+def start_stub_process():
+    """Stub backend in a child process, so the bodies it buffers stay out of this process's RSS."""
+    process = subprocess.Popen(
+        [sys.executable, "-u", os.path.join(HERE, "stub_server.py"), "--port", "0"],
+        stdout=subprocess.PIPE, text=True,
+    )
+    # The stub prints "Stub backend listening on <url>" once it is accepting connections
+    line = process.stdout.readline()
+    if not line.startswith("Stub backend listening on "):
+        process.kill()
+        raise RuntimeError(f"stub backend did not start (exit code {process.wait()})")
+    return process, line.rsplit(" ", 1)[1].strip()
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_benchmark(sizes_mb, repeat, mode, endpoint):
+    buckets = {}
+    for size_mb in sizes_mb:
+        size = int(size_mb * MB)
+        label = f"{size_mb:g}MB"
+        token = client.current_tag.set(f"upload {label}")
+        upload, server, total = latency.Histogram(), latency.Histogram(), latency.Histogram()
+        rates, statuses, errors = [], {}, []
+        try:
+            for _ in range(repeat):
+                body = product_body(mode, size)
+                outcome = upload_once(endpoint, body)
+                key = str(outcome["status"])
+                statuses[key] = statuses.get(key, 0) + 1
+                if outcome["status"] is None:
+                    errors.append(outcome["error"])
+                if outcome["status"] not in (200, 201):
+                    # A rejected body may be cut short, so its timings say nothing about throughput
+                    continue
+                upload.record(outcome["upload"])
+                server.record(outcome["server"])
+                total.record(outcome["elapsed"])
+                rates.append(len(body) / MB / outcome["upload"] if outcome["upload"] else 0.0)
+        finally:
+            client.current_tag.reset(token)
+        rates.sort()
+        buckets[label] = {
+            "size_bytes": size,
+            "uploads": repeat,
+            "statuses": statuses,
+            "errors": errors,
+            "mb_per_s": {
+                "min": rates[0] if rates else None,
+                "p50": percentile(rates, 50),
+                "max": rates[-1] if rates else None,
+            },
+            "upload_ms": upload.summary(),
+            "server_ms": server.summary(),
+            "total_ms": total.summary(),
+            "client_peak_rss_mb": peak_rss_mb(),
+        }
+    return {"mode": mode, "endpoint": endpoint, "chunk_size": CHUNK_SIZE, "buckets": buckets}
+
+
+def parse_sizes(value):
+    return tuple(float(size) for size in value.split(",") if size.strip())
+
+
+def print_report(report):
+    print(f"{report['mode']} uploads to {report['endpoint']}")
+    print(f"{'size':<8}{'ok':>6}{'MB/s p50':>10}{'srv p50':>10}{'srv p95':>10}{'rss MB':>9}  statuses")
+    for label, row in report["buckets"].items():
+        ok = sum(count for status, count in row["statuses"].items() if status in ("200", "201"))
+        rate = row["mb_per_s"]["p50"]
+        server = row["server_ms"]
+        print(f"{label:<8}{ok:>6}{rate if rate is not None else 0:>10.1f}"
+              f"{server.get('p50_ms', 0):>10.1f}{server.get('p95_ms', 0):>10.1f}"
+              f"{row['client_peak_rss_mb']:>9.0f}  {row['statuses']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream synthetic product images of increasing size to the backend.")
+    parser.add_argument("-s", "--sizes", type=parse_sizes, default=DEFAULT_SIZES_MB, help="MB per image, e.g. 1,10,200")
+    parser.add_argument("-n", "--repeat", type=int, default=3, help="uploads per size")
+    parser.add_argument("--mode", choices=("multipart", "json"), default="multipart",
+                        help="multipart file field, or base64 data URIs in a JSON body")
+    parser.add_argument("--endpoint", default="/products")
+    parser.add_argument("-o", "--output", default=REPORT_PATH)
+    parser.add_argument("--stub", action="store_true",
+                        help="run against the stub backend, in a child process so it does not inflate client RSS")
+    args = parser.parse_args(argv)
+
+    stub = None
+    if args.stub:
+        stub, client.BASE_URL = start_stub_process()
+
+    # Large bodies take far longer than the default timeout, and retrying them hides failures
+    client.TIMEOUT = max(client.TIMEOUT, 600)
+    client.configure(pool_size=1, retries=0)
+    try:
+        report = run_benchmark(args.sizes, args.repeat, args.mode, args.endpoint)
+    finally:
+        if stub is not None:
+            stub.terminate()
+            stub.wait()
+    print_report(report)
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())